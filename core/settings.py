@@ -39,7 +39,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-
+    # SearchVectorField / GIN search index (posts/search.py)
+    'django.contrib.postgres',
 ]
 INSTALLED_APPS +=[
  'rest_framework',
@@ -64,8 +65,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 }
+
+# Post list pagination (keyset on created_at, id). Clients may override with
+# ?page_size= up to POSTS_MAX_PAGE_SIZE.
+POSTS_PAGE_SIZE = 20
+POSTS_MAX_PAGE_SIZE = 100
+# Most posts accepted by one POST /api/posts-bulk/ request
+POSTS_BULK_CREATE_MAX = 1000
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # Must be at the top
+    'posts.middleware.CompressionMiddleware',
     # 'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -100,6 +109,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 # Database
@@ -117,6 +127,100 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# LocMemCache is per-process; point this at Redis/Memcached in production so
+# every worker shares the post detail cache and its invalidations.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a rendered PostDetailView payload stays cached (signals invalidate it on change)
+POST_DETAIL_CACHE_TIMEOUT = 60 * 15
+
+# Seconds a built category/tag tree stays cached (signals switch to a new version on change)
+TAXONOMY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Related posts (posts/related.py): neighbours kept per post, terms kept per post
+# vector, vocabulary size, and the lowest cosine similarity worth listing.
+# Publishing or editing a post queues its lists for `manage.py
+# update_related_posts` (run it from cron or with --interval; UPDATE_ON_SAVE =
+# False stops the queueing); `manage.py build_related_posts` refits the
+# vocabulary and rebuilds everything.
+RELATED_POSTS_COUNT = 5
+RELATED_POSTS_TERMS_PER_POST = 64
+RELATED_POSTS_MAX_FEATURES = 50000
+RELATED_POSTS_MIN_SCORE = 0.05
+RELATED_POSTS_UPDATE_ON_SAVE = True
+
+# Taxonomy files `manage.py setup_blog_data` syncs categories and tags from (posts/taxonomy.py)
+TAXONOMY_FILES = [BASE_DIR / 'posts' / 'taxonomies' / 'blog.json']
+
+# Post view counting is write-behind: views are buffered per worker and flushed
+# in bulk after this many seconds or this many buffered views, whichever first.
+VIEW_COUNT_FLUSH_INTERVAL = 10
+VIEW_COUNT_FLUSH_THRESHOLD = 500
+
+# Trending feed (posts/trending.py): flushed views are also counted per post in
+# buckets of this many seconds; `manage.py update_trending` scores the buckets
+# from the last WINDOW hours, halving a view's weight every HALF_LIFE hours,
+# and keeps the best SIZE posts.
+TRENDING_BUCKET_SECONDS = 60 * 60
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_HOURS = 24 * 7
+TRENDING_SIZE = 200
+
+# AI completion cache (posts/ai_cache.py): identical requests (same model,
+# temperature and messages) are answered from the database for TTL seconds;
+# the least recently used entries beyond MAX_ENTRIES are evicted.
+AI_CACHE_ENABLED = True
+AI_CACHE_TTL = 60 * 60 * 24 * 7
+AI_CACHE_MAX_ENTRIES = 5000
+
+# Background AI jobs (posts/ai_jobs.py, `manage.py run_ai_worker`): threads per
+# worker process; seconds before a job claimed by a worker that died is run
+# again (keep it above the AI client's 600 s timeout); attempts per job
+# (rate-limited jobs are retried later); days finished jobs are kept.
+AI_JOB_WORKERS = 4
+AI_JOB_LEASE_SECONDS = 15 * 60
+AI_JOB_MAX_ATTEMPTS = 3
+AI_JOB_RETENTION_DAYS = 7
+
+# Client-side AI API rate limiting (posts/ai_ratelimit.py): requests and tokens
+# per minute (Groq free tier for llama-3.3-70b-versatile; the token budget is
+# also learned from the API's x-ratelimit-* headers); seconds a call may wait
+# for budget before it is refused with a retry-after; tokens reserved for a
+# reply before its real usage is known. SHARED keeps one budget for all
+# processes in the default cache (needs Redis/Memcached, not LocMemCache).
+AI_RATE_LIMIT_ENABLED = True
+AI_RATE_LIMIT_RPM = 30
+AI_RATE_LIMIT_TPM = 12000
+AI_RATE_LIMIT_MAX_WAIT = 10
+AI_RATE_LIMIT_COMPLETION_TOKENS = 1024
+AI_RATE_LIMIT_SHARED = False
+
+# Text search configuration for the PostgreSQL full-text search index
+SEARCH_CONFIG = 'english'
+
+# Post.content / graphical_content are stored zlib-compressed (posts/compression.py).
+# Workers re-check for a newly trained dictionary every TTL seconds.
+POST_COMPRESSION_LEVEL = 6
+POST_COMPRESSION_DICTIONARY_TTL = 300
+
+# HTTP response compression (posts/middleware.py): bodies under MIN_SIZE bytes are
+# sent as-is; per encoding, the level of the last row whose size threshold the
+# body reaches is used (streamed responses use the last row).
+RESPONSE_COMPRESSION_MIN_SIZE = 512
+RESPONSE_COMPRESSION_LEVELS = {
+    'br': [(0, 5), (256 * 1024, 4), (2 * 1024 * 1024, 1)],
+    'gzip': [(0, 6), (256 * 1024, 4), (2 * 1024 * 1024, 1)],
+}
+# Never compressed (BREACH): responses that may hold secrets, i.e. the admin and the
+# auth endpoints. Cookie-carrying and cookie-setting requests are skipped as well.
+RESPONSE_COMPRESSION_EXCLUDED_PATHS = ('/admin/', '/api/auth/')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Category, Tag, Author
+from .models import Post, Category, Tag, Author, CompressionDictionary, AICompletion, AIJob
 
 
 @admin.register(Category)
@@ -26,3 +26,21 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('status', 'category')
     search_fields = ('title',)
     prepopulated_fields = {'slug': ('title',)}
+
+
+@admin.register(CompressionDictionary)
+class CompressionDictionaryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sample_size', 'created_at')
+    exclude = ('data',)
+
+
+@admin.register(AICompletion)
+class AICompletionAdmin(admin.ModelAdmin):
+    list_display = ('key', 'model', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('model',)
+
+
+@admin.register(AIJob)
+class AIJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
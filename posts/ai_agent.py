@@ -1,8 +1,13 @@
 # posts/ai_agent.py
+import asyncio
+import math
 import os
 import re
-from openai import OpenAI
+import time
+import weakref
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI, RateLimitError
 from dotenv import load_dotenv
+from . import ai_cache, ai_ratelimit, metrics
 from .prompts import (
     BLOG_SYSTEM_INSTRUCTION,
     GRAPHICAL_SYSTEM_INSTRUCTION,
@@ -17,7 +22,15 @@ load_dotenv()
 
 
 class AIAgentRateLimitError(Exception):
-    """Raised when the upstream AI API responds with a rate limit (429)."""
+    """
+    Raised when the AI API rate limits us (429), or when our own budget
+    (posts/ai_ratelimit.py) would make the call wait too long. retry_after is
+    the number of whole seconds to wait, or None if unknown.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class AIAgentError(Exception):
@@ -25,34 +38,143 @@ class AIAgentError(Exception):
 
 
 def _is_rate_limit_error(exc):
-    code = getattr(exc, "code", None)
-    status_code = getattr(exc, "status_code", None)
-    status = getattr(exc, "status", None)
-    message = str(exc).upper()
+    return isinstance(exc, RateLimitError) or getattr(exc, "status_code", None) == 429
 
-    if code == 429 or status_code == 429 or status == "RESOURCE_EXHAUSTED":
-        return True
 
-    return "429" in message or "RATE LIMIT" in message or "RESOURCE_EXHAUSTED" in message
+def _seconds(value):
+    return math.ceil(value) if value is not None else None
 
 
-def _extract_retry_after_seconds(exc_message):
-    match = re.search(r"retry in\s+([0-9]+(?:\.[0-9]+)?)s", exc_message, re.IGNORECASE)
-    if not match:
-        return None
-    try:
-        return int(float(match.group(1)))
-    except (TypeError, ValueError):
-        return None
+# Every response the AI API sends (429s included) updates the rate-limit
+# buckets from its x-ratelimit-* headers.
+def _observe_rate_limits(response):
+    ai_ratelimit.limiter.observe(response.headers)
+
+
+async def _aobserve_rate_limits(response):
+    await ai_ratelimit.limiter.aobserve(response.headers)
 
 
-# Initialize the client (Groq — free, OpenAI-compatible)
+# Initialize the clients (Groq — free, OpenAI-compatible). The async client
+# backs the async AI views: under ASGI (core/asgi.py) a completion that takes
+# a minute no longer holds a worker thread while it waits.
+#
+# An AsyncOpenAI client's connection pool belongs to the event loop it was
+# first used on. Under WSGI every async view runs in a fresh loop
+# (async_to_sync), so one module-level client would hand later requests
+# connections from a closed loop. async_client() keeps one client per loop.
 api_key = os.getenv("GROQ_API_KEY")
 model_name = os.getenv("AI_MODEL", "llama-3.3-70b-versatile")
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
 client = OpenAI(
     api_key=api_key,
-    base_url="https://api.groq.com/openai/v1",
+    base_url=GROQ_BASE_URL,
+    http_client=DefaultHttpxClient(event_hooks={"response": [_observe_rate_limits]}),
 )
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def async_client():
+    """The AsyncOpenAI client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    loop_client = _async_clients.get(loop)
+    if loop_client is None:
+        loop_client = _async_clients[loop] = AsyncOpenAI(
+            api_key=api_key,
+            base_url=GROQ_BASE_URL,
+            http_client=DefaultAsyncHttpxClient(event_hooks={"response": [_aobserve_rate_limits]}),
+        )
+    return loop_client
+
+
+def _ai_error(exc):
+    """Translate an exception from the AI call into AIAgentRateLimitError / AIAgentError."""
+    if _is_rate_limit_error(exc):
+        print(f"AI Rate Limit: {exc}")
+        metrics.incr("ai_ratelimit.upstream_429")
+        response = getattr(exc, "response", None)
+        retry_after = ai_ratelimit.retry_after_from_headers(response.headers) if response is not None else None
+        return AIAgentRateLimitError(str(exc), retry_after=_seconds(retry_after))
+    print(f"AI Error: {exc}")
+    return AIAgentError(str(exc))
+
+
+def _over_budget(wait):
+    return AIAgentRateLimitError(
+        f"Request budget for the AI API is used up; next call possible in {wait:.1f}s",
+        retry_after=_seconds(wait),
+    )
+
+
+def _usage_tokens(response):
+    return getattr(getattr(response, "usage", None), "total_tokens", None)
+
+
+def _check_api_key():
+    if not api_key:
+        raise AIAgentError("Missing GROQ_API_KEY in environment. Get one free at https://console.groq.com")
+
+
+def _cache_key(temperature, messages, cache):
+    if cache and ai_cache.enabled():
+        return ai_cache.completion_key(model_name, temperature, messages)
+    return None
+
+
+def _complete(temperature, messages, cache=True):
+    """Run one chat completion (blocking) and return the reply text, using the completion cache."""
+    key = _cache_key(temperature, messages, cache)
+    if key:
+        cached = ai_cache.get_completion(key)
+        if cached is not None:
+            return cached
+    _check_api_key()
+    tokens = ai_ratelimit.estimate_tokens(messages)
+    wait = ai_ratelimit.limiter.acquire(tokens)
+    if wait:
+        raise _over_budget(wait)
+    started = time.time()
+    try:
+        response = client.chat.completions.create(
+            model=model_name,
+            temperature=temperature,
+            messages=messages,
+        )
+    except Exception as exc:
+        raise _ai_error(exc)
+    ai_ratelimit.limiter.settle(tokens, _usage_tokens(response), started)
+    content = response.choices[0].message.content or ""
+    if key and content:
+        ai_cache.set_completion(key, model_name, content)
+    return content
+
+
+async def _acomplete(temperature, messages, cache=True):
+    """Async twin of _complete(), on AsyncOpenAI."""
+    key = _cache_key(temperature, messages, cache)
+    if key:
+        cached = await ai_cache.aget_completion(key)
+        if cached is not None:
+            return cached
+    _check_api_key()
+    tokens = ai_ratelimit.estimate_tokens(messages)
+    wait = await ai_ratelimit.limiter.aacquire(tokens)
+    if wait:
+        raise _over_budget(wait)
+    started = time.time()
+    try:
+        response = await async_client().chat.completions.create(
+            model=model_name,
+            temperature=temperature,
+            messages=messages,
+        )
+    except Exception as exc:
+        raise _ai_error(exc)
+    await ai_ratelimit.limiter.asettle(tokens, _usage_tokens(response), started)
+    content = response.choices[0].message.content or ""
+    if key and content:
+        await ai_cache.aset_completion(key, model_name, content)
+    return content
 
 
 # ── Post-processing sanitizer ──────────────────────────────────────────────
@@ -109,252 +231,307 @@ def _sanitize_blog_html(html):
     return html
 
 
-def generate_blog_content(user_requirement):
-    system_instruction = BLOG_SYSTEM_INSTRUCTION
-    
-    try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment. Get one free at https://console.groq.com")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.5,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": user_requirement},
-            ],
-        )
-        raw = response.choices[0].message.content or ""
-        # Post-process: extract HTML then sanitize
-        html_match = re.search(r'CODE:\s*(.+)', raw, re.DOTALL)
-        if html_match:
-            prefix = raw[:html_match.start()]
-            cleaned_html = _sanitize_blog_html(html_match.group(1).strip())
-            return prefix + "CODE: " + cleaned_html
-        # Fallback: sanitize the whole thing if no CODE: marker
-        return _sanitize_blog_html(raw)
-    except Exception as exc:
-        if _is_rate_limit_error(exc):
-            print(f"AI Rate Limit: {exc}")
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        print(f"AI Error: {exc}")
-        raise AIAgentError(str(exc))
+# ── Prompts and post-processing ────────────────────────────────────────────
+# Each operation is a (temperature, messages) request plus a function that
+# cleans the reply, shared by the blocking and the async (a-prefixed) entry
+# points below.
+def sanitize_code_reply(raw):
+    """Sanitize the HTML after a CODE: marker (or the whole reply if there is none)."""
+    html_match = re.search(r'CODE:\s*(.+)', raw, re.DOTALL)
+    if html_match:
+        prefix = raw[:html_match.start()]
+        cleaned_html = _sanitize_blog_html(html_match.group(1).strip())
+        return prefix + "CODE: " + cleaned_html
+    # Fallback: sanitize the whole thing if no CODE: marker
+    return _sanitize_blog_html(raw)
+
+
+def extract_html(text):
+    """Extract HTML from AI response, handling missing markers."""
+    text = text.replace("```html", "").replace("```", "").strip()
+    # Try to find the HTML document
+    match = re.search(r'(<!DOCTYPE html[\s\S]*</html>)', text, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    # Fallback: find any block starting with <html or <body or <div
+    match = re.search(r'(<(?:html|body|div|section)[\s\S]*)', text, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    return text
+
+
+def parse_blog_response(raw_ai_response):
+    """Split a generate_blog_content() reply into (title, excerpt, html_code)."""
+    title = ""
+    excerpt = ""
+    html_code = ""
+
+    # Extract Title
+    if "TITLE:" in raw_ai_response:
+        title_block = raw_ai_response.split("TITLE:")[1]
+        if "EXCERPT:" in title_block:
+            title = title_block.split("EXCERPT:")[0].strip()
+        elif "CODE:" in title_block:
+            title = title_block.split("CODE:")[0].strip()
+        else:
+            # Title goes up to first newline or HTML tag
+            title = re.split(r'\n|<', title_block)[0].strip()
+
+    # Extract Excerpt
+    if "EXCERPT:" in raw_ai_response:
+        excerpt_block = raw_ai_response.split("EXCERPT:")[1]
+        if "CODE:" in excerpt_block:
+            excerpt = excerpt_block.split("CODE:")[0].strip()
+        else:
+            excerpt = re.split(r'\n\n|<', excerpt_block)[0].strip()
+
+    if "CODE:" in raw_ai_response:
+        html_code = raw_ai_response.split("CODE:")[1].strip()
+
+    # Fallback: if no html_code was extracted, detect HTML in full response
+    if not html_code:
+        html_code = extract_html(raw_ai_response)
+        # If title grabbed the HTML, clean it
+        if title and '<!DOCTYPE' in title:
+            title = re.split(r'\n|<!', title)[0].strip()
+
+    html_code = html_code.replace("```html", "").replace("```", "").strip()
+    return title, excerpt, html_code
+
+
+def parse_graphical_response(raw_ai_response):
+    """Split a generate_graphical_content() reply into (title, html_code)."""
+    title = ""
+    html_code = ""
+
+    if "TITLE:" in raw_ai_response:
+        title_block = raw_ai_response.split("TITLE:")[1]
+        if "CODE:" in title_block:
+            title = title_block.split("CODE:")[0].strip()
+        else:
+            title = re.split(r'\n|<', title_block)[0].strip()
+
+    if "CODE:" in raw_ai_response:
+        html_code = raw_ai_response.split("CODE:")[1].strip()
+
+    # Fallback: if no html_code was extracted, detect HTML in full response
+    if not html_code:
+        html_code = extract_html(raw_ai_response)
+        if title and '<!DOCTYPE' in title:
+            title = re.split(r'\n|<!', title)[0].strip()
+
+    html_code = html_code.replace("```html", "").replace("```", "").strip()
+    return title, html_code
+
+
+def _full_page(result):
+    """Extract just the HTML document from a reply."""
+    result = result.replace("```html", "").replace("```", "").strip()
+    match = re.search(r'(<!DOCTYPE html[\s\S]*</html>)', result, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    return result
+
+
+def _strip_page_wrapper(result):
+    """Strip any accidental full-page wrapper the AI may have added around a fragment."""
+    result = result.replace("```html", "").replace("```", "").strip()
+    result = re.sub(r'<!DOCTYPE[^>]*>', '', result, flags=re.IGNORECASE).strip()
+    result = re.sub(r'</?html[^>]*>', '', result, flags=re.IGNORECASE).strip()
+    result = re.sub(r'<head[\s\S]*?</head>', '', result, flags=re.IGNORECASE).strip()
+    return result
+
+
+def _clean_section(result):
+    result = _strip_page_wrapper(result)
+    result = re.sub(r'</?head[^>]*>', '', result, flags=re.IGNORECASE).strip()
+    result = re.sub(r'</?body[^>]*>', '', result, flags=re.IGNORECASE).strip()
+    # Remove stray <script src="...cdn..."> and <link href="..."> tags the AI may include
+    result = re.sub(r'<script\s+src=[\'"][^\'"]*cdn[^\'"]*[\'"][^>]*>\s*</script>', '', result, flags=re.IGNORECASE).strip()
+    result = re.sub(r'<link\s+[^>]*href=[\'"][^\'"]*(?:fonts\.googleapis|cdn\.tailwindcss)[^\'"]*[\'"][^>]*/?\s*>', '', result, flags=re.IGNORECASE).strip()
+    return result
+
+
+def _clean_graphical_section(result):
+    result = _strip_page_wrapper(result)
+    return re.sub(r'</?body[^>]*>', '', result, flags=re.IGNORECASE).strip()
+
+
+def _blog_request(user_requirement):
+    return 0.5, [
+        {"role": "system", "content": BLOG_SYSTEM_INSTRUCTION},
+        {"role": "user", "content": user_requirement},
+    ]
 
 
-def generate_graphical_content(user_requirement):
-    """Generate an interactive graphical/infographic HTML explanation using AI."""
-    system_instruction = GRAPHICAL_SYSTEM_INSTRUCTION
+def _graphical_request(user_requirement):
+    return 0.5, [
+        {"role": "system", "content": GRAPHICAL_SYSTEM_INSTRUCTION},
+        {
+            "role": "user",
+            "content": (
+                f"Create an infographic about: {user_requirement}\n\n"
+                "IMPORTANT: All chart data, stat numbers, labels, titles, and table content "
+                "must be specifically about the topic above. Do NOT use placeholder or unrelated data."
+            ),
+        },
+    ]
 
-    try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment. Get one free at https://console.groq.com")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.5,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {
-                    "role": "user",
-                    "content": (
-                        f"Create an infographic about: {user_requirement}\n\n"
-                        "IMPORTANT: All chart data, stat numbers, labels, titles, and table content "
-                        "must be specifically about the topic above. Do NOT use placeholder or unrelated data."
-                    ),
-                },
-            ],
-        )
-        raw = response.choices[0].message.content or ""
-        # Post-process: sanitize the HTML portion
-        html_match = re.search(r'CODE:\s*(.+)', raw, re.DOTALL)
-        if html_match:
-            prefix = raw[:html_match.start()]
-            cleaned_html = _sanitize_blog_html(html_match.group(1).strip())
-            return prefix + "CODE: " + cleaned_html
-        return _sanitize_blog_html(raw)
-    except Exception as exc:
-        if _is_rate_limit_error(exc):
-            print(f"AI Rate Limit: {exc}")
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        print(f"AI Error: {exc}")
-        raise AIAgentError(str(exc))
 
+def _enhance_blog_request(html_content):
+    return 0.5, [
+        {"role": "system", "content": ENHANCE_BLOG_SYSTEM_INSTRUCTION},
+        {"role": "user", "content": html_content},
+    ]
 
-# REFINE_COMMANDS imported from prompts.py
 
+def _enhance_section_request(html_section, instructions):
+    # Strip any <body> wrapper from the input fragment
+    html_section = re.sub(r'</?body[^>]*>', '', html_section, flags=re.IGNORECASE).strip()
+    return 0.7, [
+        {"role": "system", "content": ENHANCE_SECTION_SYSTEM_INSTRUCTION},
+        {"role": "user", "content": (
+            f"ENHANCE THIS HTML SECTION — make it look dramatically better:\n\n{html_section}"
+            + (f"\n\nUSER INSTRUCTIONS (follow these closely):\n{instructions}" if instructions else "")
+        )},
+    ]
 
-def enhance_blog_design(html_content, content_type="blog"):
-    """Take full HTML content and return an enhanced version with improved visual design."""
-    if content_type == "graphical":
-        return enhance_graphical_design(html_content)
 
-    system_instruction = ENHANCE_BLOG_SYSTEM_INSTRUCTION
+def _enhance_graphical_request(html_content):
+    return 0.6, [
+        {"role": "system", "content": ENHANCE_GRAPHICAL_SYSTEM_INSTRUCTION},
+        {"role": "user", "content": f"ENHANCE this infographic/dashboard HTML to look stunning and premium:\n\n{html_content}"},
+    ]
 
-    try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment.")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.5,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": html_content},
-            ],
-        )
-        result = response.choices[0].message.content or ""
-        # Extract just the HTML
-        result = result.replace("```html", "").replace("```", "").strip()
-        match = re.search(r'(<!DOCTYPE html[\s\S]*</html>)', result, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-        return result
-    except Exception as exc:
-        if _is_rate_limit_error(exc):
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        raise AIAgentError(str(exc))
+
+def _enhance_graphical_section_request(html_section, instructions):
+    return 0.7, [
+        {"role": "system", "content": ENHANCE_GRAPHICAL_SECTION_SYSTEM_INSTRUCTION},
+        {"role": "user", "content": (
+            f"ENHANCE this infographic/dashboard section — make it look stunning:\n\n{html_section}"
+            + (f"\n\nUSER INSTRUCTIONS (follow these closely):\n{instructions}" if instructions else "")
+        )},
+    ]
+
+
+def _refine_request(text_snippet, command):
+    system_instruction = REFINE_COMMANDS.get(command)
+    if not system_instruction:
+        raise AIAgentError(f"Unknown refine command: '{command}'. Valid commands: {', '.join(REFINE_COMMANDS.keys())}")
+    return 0.4, [
+        {"role": "system", "content": system_instruction},
+        {"role": "user", "content": text_snippet},
+    ]
 
 
-def enhance_section_design(html_section, instructions=None, content_type="blog"):
+# ── Blocking API ───────────────────────────────────────────────────────────
+# cache=False skips the completion cache (posts/ai_cache.py) for one call.
+def generate_blog_content(user_requirement, cache=True):
+    return sanitize_code_reply(_complete(*_blog_request(user_requirement), cache=cache))
+
+
+def generate_graphical_content(user_requirement, cache=True):
+    """Generate an interactive graphical/infographic HTML explanation using AI."""
+    return sanitize_code_reply(_complete(*_graphical_request(user_requirement), cache=cache))
+
+
+def enhance_blog_design(html_content, content_type="blog", cache=True):
+    """Take full HTML content and return an enhanced version with improved visual design."""
+    if content_type == "graphical":
+        return enhance_graphical_design(html_content, cache=cache)
+    return _full_page(_complete(*_enhance_blog_request(html_content), cache=cache))
+
+
+def enhance_section_design(html_section, instructions=None, content_type="blog", cache=True):
     """Take an HTML SECTION/FRAGMENT (not a full page) and return an enhanced version."""
     if content_type == "graphical":
-        return enhance_graphical_section_design(html_section, instructions=instructions)
+        return enhance_graphical_section_design(html_section, instructions=instructions, cache=cache)
+    return _clean_section(_complete(*_enhance_section_request(html_section, instructions), cache=cache))
 
-    # Strip any <body> wrapper from the input fragment
-    html_section = re.sub(r'</?body[^>]*>', '', html_section, flags=re.IGNORECASE).strip()
 
-    system_instruction = ENHANCE_SECTION_SYSTEM_INSTRUCTION
+def enhance_graphical_design(html_content, cache=True):
+    """Take full HTML graphical/infographic content and return an enhanced version."""
+    return _full_page(_complete(*_enhance_graphical_request(html_content), cache=cache))
 
-    try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment.")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.7,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": (
-                    f"ENHANCE THIS HTML SECTION — make it look dramatically better:\n\n{html_section}"
-                    + (f"\n\nUSER INSTRUCTIONS (follow these closely):\n{instructions}" if instructions else "")
-                )},
-            ],
-        )
-        result = response.choices[0].message.content or ""
-        result = result.replace("```html", "").replace("```", "").strip()
-        # Strip any accidental full-page wrapper the AI may have added
-        result = re.sub(r'<!DOCTYPE[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'</?html[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'<head[\s\S]*?</head>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'</?head[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'</?body[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        # Remove stray <script src="...cdn..."> and <link href="..."> tags the AI may include
-        result = re.sub(r'<script\s+src=[\'"][^\'"]*cdn[^\'"]*[\'"][^>]*>\s*</script>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'<link\s+[^>]*href=[\'"][^\'"]*(?:fonts\.googleapis|cdn\.tailwindcss)[^\'"]*[\'"][^>]*/?\s*>', '', result, flags=re.IGNORECASE).strip()
-        return result
-    except Exception as exc:
-        if _is_rate_limit_error(exc):
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        raise AIAgentError(str(exc))
 
+def enhance_graphical_section_design(html_section, instructions=None, cache=True):
+    """Take a graphical/infographic HTML FRAGMENT and return an enhanced version."""
+    return _clean_graphical_section(
+        _complete(*_enhance_graphical_section_request(html_section, instructions), cache=cache)
+    )
 
-def enhance_graphical_design(html_content):
-    """Take full HTML graphical/infographic content and return an enhanced version."""
-    system_instruction = ENHANCE_GRAPHICAL_SYSTEM_INSTRUCTION
 
+def refine_text_snippet(text_snippet, command, cache=True):
+    """Refine a text snippet using an AI command (simplify, professional, translate, etc.)."""
+    return _complete(*_refine_request(text_snippet, command), cache=cache)
+
+
+# ── Async API (used by the views) ──────────────────────────────────────────
+async def agenerate_blog_content(user_requirement, cache=True):
+    return sanitize_code_reply(await _acomplete(*_blog_request(user_requirement), cache=cache))
+
+
+async def astream_blog_content(user_requirement, cache=True):
+    """Yield the raw text of a generate_blog_content() reply as it is generated (stream=True)."""
+    temperature, messages = _blog_request(user_requirement)
+    key = _cache_key(temperature, messages, cache)
+    if key:
+        cached = await ai_cache.aget_completion(key)
+        if cached is not None:
+            yield cached
+            return
+    _check_api_key()
+    # A streamed reply has no usage figures, so the estimate stands
+    wait = await ai_ratelimit.limiter.aacquire(ai_ratelimit.estimate_tokens(messages))
+    if wait:
+        raise _over_budget(wait)
+    parts = []
     try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment.")
-        response = client.chat.completions.create(
+        stream = await async_client().chat.completions.create(
             model=model_name,
-            temperature=0.6,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": f"ENHANCE this infographic/dashboard HTML to look stunning and premium:\n\n{html_content}"},
-            ],
+            temperature=temperature,
+            messages=messages,
+            stream=True,
         )
-        result = response.choices[0].message.content or ""
-        result = result.replace("```html", "").replace("```", "").strip()
-        match = re.search(r'(<!DOCTYPE html[\s\S]*</html>)', result, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-        return result
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
     except Exception as exc:
-        if _is_rate_limit_error(exc):
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        raise AIAgentError(str(exc))
+        raise _ai_error(exc)
+    # Only a reply that streamed to the end is cached
+    if key and parts:
+        await ai_cache.aset_completion(key, model_name, "".join(parts))
 
 
-def enhance_graphical_section_design(html_section, instructions=None):
-    """Take a graphical/infographic HTML FRAGMENT and return an enhanced version."""
-    system_instruction = ENHANCE_GRAPHICAL_SECTION_SYSTEM_INSTRUCTION
+async def agenerate_graphical_content(user_requirement, cache=True):
+    return sanitize_code_reply(await _acomplete(*_graphical_request(user_requirement), cache=cache))
 
-    try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment.")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.7,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": (
-                    f"ENHANCE this infographic/dashboard section — make it look stunning:\n\n{html_section}"
-                    + (f"\n\nUSER INSTRUCTIONS (follow these closely):\n{instructions}" if instructions else "")
-                )},
-            ],
-        )
-        result = response.choices[0].message.content or ""
-        result = result.replace("```html", "").replace("```", "").strip()
-        result = re.sub(r'<!DOCTYPE[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'</?html[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'<head[\s\S]*?</head>', '', result, flags=re.IGNORECASE).strip()
-        result = re.sub(r'</?body[^>]*>', '', result, flags=re.IGNORECASE).strip()
-        return result
-    except Exception as exc:
-        if _is_rate_limit_error(exc):
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        raise AIAgentError(str(exc))
 
+async def aenhance_blog_design(html_content, content_type="blog", cache=True):
+    if content_type == "graphical":
+        return await aenhance_graphical_design(html_content, cache=cache)
+    return _full_page(await _acomplete(*_enhance_blog_request(html_content), cache=cache))
 
-def refine_text_snippet(text_snippet, command):
-    """Refine a text snippet using an AI command (simplify, professional, translate, etc.)."""
-    system_instruction = REFINE_COMMANDS.get(command)
-    if not system_instruction:
-        raise AIAgentError(f"Unknown refine command: '{command}'. Valid commands: {', '.join(REFINE_COMMANDS.keys())}")
 
-    try:
-        if not api_key:
-            raise AIAgentError("Missing GROQ_API_KEY in environment.")
-        response = client.chat.completions.create(
-            model=model_name,
-            temperature=0.4,
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": text_snippet},
-            ],
-        )
-        return response.choices[0].message.content or ""
-    except Exception as exc:
-        if _is_rate_limit_error(exc):
-            retry_after = _extract_retry_after_seconds(str(exc))
-            if retry_after is not None:
-                raise AIAgentRateLimitError(f"{exc}||retry_after={retry_after}")
-            raise AIAgentRateLimitError(str(exc))
-        raise AIAgentError(str(exc))
+async def aenhance_section_design(html_section, instructions=None, content_type="blog", cache=True):
+    if content_type == "graphical":
+        return await aenhance_graphical_section_design(html_section, instructions=instructions, cache=cache)
+    return _clean_section(await _acomplete(*_enhance_section_request(html_section, instructions), cache=cache))
+
+
+async def aenhance_graphical_design(html_content, cache=True):
+    return _full_page(await _acomplete(*_enhance_graphical_request(html_content), cache=cache))
+
+
+async def aenhance_graphical_section_design(html_section, instructions=None, cache=True):
+    return _clean_graphical_section(
+        await _acomplete(*_enhance_graphical_section_request(html_section, instructions), cache=cache)
+    )
+
+
+async def arefine_text_snippet(text_snippet, command, cache=True):
+    return await _acomplete(*_refine_request(text_snippet, command), cache=cache)
 
 
 if __name__ == "__main__":
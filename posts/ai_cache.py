@@ -0,0 +1,87 @@
+# posts/ai_cache.py
+# Content-addressed cache of AI completions (AICompletion rows).
+#
+# The key is a SHA-256 of everything that determines the reply: model,
+# temperature and the full message list (system instruction + user message).
+# A repeated refine of the same text, or a retried generation, is then one
+# indexed lookup instead of a call that takes seconds and uses rate-limit
+# quota. The cache lives in the database so every worker shares it and it
+# survives restarts.
+#
+# Entries older than AI_CACHE_TTL are never served. Each write also drops
+# expired rows and the least recently used ones beyond AI_CACHE_MAX_ENTRIES
+# (a hit refreshes last_used_at). Callers opt out per call with cache=False;
+# AI_CACHE_ENABLED = False turns the cache off everywhere.
+import datetime
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import AICompletion
+
+DEFAULT_TTL = 60 * 60 * 24 * 7
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def enabled():
+    return getattr(settings, 'AI_CACHE_ENABLED', True)
+
+
+def _ttl():
+    return datetime.timedelta(seconds=getattr(settings, 'AI_CACHE_TTL', DEFAULT_TTL))
+
+
+def completion_key(model, temperature, messages):
+    """Hex SHA-256 identifying one completion request."""
+    payload = json.dumps([model, temperature, messages], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_completion(key):
+    """The cached reply for `key`, or None on a miss."""
+    started = time.perf_counter()
+    now = timezone.now()
+    content = (
+        AICompletion.objects.filter(key=key, created_at__gte=now - _ttl())
+        .values_list('content', flat=True).first()
+    )
+    if content is None:
+        metrics.incr('ai_cache.misses')
+        return None
+    AICompletion.objects.filter(key=key).update(last_used_at=now, hits=F('hits') + 1)
+    metrics.incr('ai_cache.hits')
+    metrics.observe('ai_cache.hit_seconds', time.perf_counter() - started)
+    return content
+
+
+def set_completion(key, model, content):
+    now = timezone.now()
+    AICompletion.objects.update_or_create(
+        key=key, defaults={'model': model, 'content': content, 'hits': 0, 'created_at': now, 'last_used_at': now},
+    )
+    evict(now)
+
+
+def evict(now=None):
+    """Delete expired entries and the least recently used beyond AI_CACHE_MAX_ENTRIES."""
+    now = now or timezone.now()
+    deleted, _ = AICompletion.objects.filter(created_at__lt=now - _ttl()).delete()
+    max_entries = getattr(settings, 'AI_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    cutoff = list(
+        AICompletion.objects.order_by('-last_used_at').values_list('last_used_at', flat=True)[max_entries:max_entries + 1]
+    )
+    if cutoff:
+        deleted += AICompletion.objects.filter(last_used_at__lte=cutoff[0]).delete()[0]
+    if deleted:
+        metrics.incr('ai_cache.evictions', deleted)
+    return deleted
+
+
+aget_completion = sync_to_async(get_completion)
+aset_completion = sync_to_async(set_completion)
@@ -0,0 +1,182 @@
+# posts/ai_jobs.py
+# Background AI jobs: a queue in the AIJob table, no broker needed.
+#
+# POST ai-jobs/ stores the request and returns at once; `manage.py
+# run_ai_worker` runs it and saves the result, and the client polls
+# ai-jobs/<id>/. A proxy timeout or a closed tab no longer throws the
+# generation away. A client-chosen request_key (body field or
+# Idempotency-Key header) makes submission idempotent: resubmitting returns
+# the existing job.
+#
+# Workers claim a job with a conditional UPDATE (status and lease checked in
+# the WHERE clause), so any number of worker threads and processes can share
+# the table on PostgreSQL and SQLite alike. A claim is a lease: a job still
+# 'running' AI_JOB_LEASE_SECONDS after it was claimed belongs to a worker
+# that died, and is claimed again. Jobs therefore survive worker and server
+# restarts. Rate-limited jobs are requeued for later (the API's retry-after
+# or exponential backoff) until AI_JOB_MAX_ATTEMPTS; other errors fail the
+# job.
+import datetime
+import time
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import metrics
+from .ai_agent import (
+    AIAgentRateLimitError,
+    enhance_blog_design,
+    enhance_section_design,
+    generate_blog_content,
+    generate_graphical_content,
+    parse_blog_response,
+    parse_graphical_response,
+    refine_text_snippet,
+)
+from .models import AIJob
+
+DEFAULT_LEASE_SECONDS = 15 * 60
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETENTION_DAYS = 7
+# Candidates fetched per claim attempt; losing a race for one moves on to the next
+CLAIM_BATCH = 10
+
+
+def _generate(params, cache):
+    title, excerpt, html_code = parse_blog_response(generate_blog_content(params['requirement'], cache=cache))
+    return {'title': title, 'excerpt': excerpt, 'generated_code': html_code}
+
+
+def _graphical(params, cache):
+    title, html_code = parse_graphical_response(generate_graphical_content(params['requirement'], cache=cache))
+    return {'title': title, 'generated_code': html_code}
+
+
+def _enhance_design(params, cache):
+    enhanced = enhance_blog_design(params['html_content'], content_type=params.get('content_type', 'blog'), cache=cache)
+    return {'enhanced_code': enhanced}
+
+
+def _enhance_section(params, cache):
+    enhanced = enhance_section_design(
+        params['html_content'], instructions=params.get('instructions') or None,
+        content_type=params.get('content_type', 'blog'), cache=cache,
+    )
+    return {'enhanced_code': enhanced}
+
+
+def _refine(params, cache):
+    refined = refine_text_snippet(params['text_snippet'], params['command'], cache=cache)
+    return {'original': params['text_snippet'], 'command': params['command'], 'refined_text': refined.strip()}
+
+
+# kind -> (required fields, optional fields, runner); results match the synchronous endpoints
+JOB_KINDS = {
+    'generate': (('requirement',), (), _generate),
+    'graphical': (('requirement',), (), _graphical),
+    'enhance-design': (('html_content',), ('content_type',), _enhance_design),
+    'enhance-section': (('html_content',), ('instructions', 'content_type'), _enhance_section),
+    'refine': (('text_snippet', 'command'), (), _refine),
+}
+
+
+def job_params(kind, data):
+    """Validate submitted fields for `kind`; returns (params, error message)."""
+    if not isinstance(kind, str) or kind not in JOB_KINDS:
+        return None, f"kind must be one of: {', '.join(JOB_KINDS)}"
+    required, optional, _ = JOB_KINDS[kind]
+    params = {}
+    for field in required:
+        value = data.get(field)
+        # Text fields only: a list or object here would reach the AI prompt as its repr
+        value = value.strip() if isinstance(value, str) else None
+        if not value:
+            return None, f"{field} is required"
+        params[field] = value
+    for field in optional:
+        if isinstance(data.get(field), str) and data[field].strip():
+            params[field] = data[field].strip()
+    return params, None
+
+
+def submit_job(user, kind, params, request_key=None):
+    """Queue a job; returns (job, created). An existing request_key returns that job instead."""
+    if not request_key:
+        return AIJob.objects.create(user=user, kind=kind, params=params), True
+    # get_or_create retries the lookup if a concurrent submit wins the unique constraint
+    return AIJob.objects.get_or_create(
+        user=user, request_key=request_key, defaults={'kind': kind, 'params': params},
+    )
+
+
+def _lease():
+    return datetime.timedelta(seconds=getattr(settings, 'AI_JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+
+
+def claim_job(worker_id, now=None):
+    """Take the oldest runnable job (queued and due, or abandoned by a dead worker); None if there is none."""
+    now = now or timezone.now()
+    runnable = (
+        Q(status='queued', run_after__lte=now)
+        | Q(status='running', locked_at__lt=now - _lease())
+    )
+    candidates = AIJob.objects.filter(runnable).order_by('run_after').values_list('id', flat=True)[:CLAIM_BATCH]
+    for job_id in candidates:
+        claimed = AIJob.objects.filter(runnable, id=job_id).update(
+            status='running', locked_by=worker_id, locked_at=now, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return AIJob.objects.get(id=job_id)
+    return None
+
+
+def _finish(job, **fields):
+    # Only the worker that still holds the lease may record the outcome
+    fields.setdefault('locked_by', '')
+    fields.setdefault('locked_at', None)
+    return AIJob.objects.filter(id=job.id, status='running', locked_by=job.locked_by).update(**fields)
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome."""
+    max_attempts = getattr(settings, 'AI_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    now = timezone.now()
+    if job.attempts == 1:
+        metrics.observe('ai_jobs.wait_seconds', (now - job.created_at).total_seconds())
+    if job.attempts > max_attempts:
+        # Abandoned by workers that died while running it, max_attempts times
+        _finish(job, status='failed', error='Job did not complete after repeated attempts', finished_at=now)
+        metrics.incr('ai_jobs.failed')
+        return
+
+    _, _, runner = JOB_KINDS[job.kind]
+    started = time.perf_counter()
+    try:
+        result = runner(job.params, cache=job.params.get('cache', True))
+    except AIAgentRateLimitError as exc:
+        detail = str(exc)
+        if job.attempts < max_attempts:
+            delay = exc.retry_after if exc.retry_after is not None else 2 ** job.attempts * 15
+            _finish(job, status='queued', error=detail, run_after=timezone.now() + datetime.timedelta(seconds=delay))
+            metrics.incr('ai_jobs.retried')
+            return
+        _finish(job, status='failed', error=detail, finished_at=timezone.now())
+        metrics.incr('ai_jobs.failed')
+        return
+    except Exception as exc:
+        # AIAgentError, or a bug; either way the job must not sit in 'running' until its lease expires
+        _finish(job, status='failed', error=str(exc) or repr(exc), finished_at=timezone.now())
+        metrics.incr('ai_jobs.failed')
+        return
+    _finish(job, status='succeeded', result=result, error='', finished_at=timezone.now())
+    metrics.incr('ai_jobs.succeeded')
+    metrics.observe('ai_jobs.run_seconds', time.perf_counter() - started)
+
+
+def prune_jobs(now=None):
+    """Delete finished jobs older than AI_JOB_RETENTION_DAYS; returns how many."""
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(days=getattr(settings, 'AI_JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+    deleted, _ = AIJob.objects.filter(status__in=['succeeded', 'failed'], finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,314 @@
+# posts/ai_ratelimit.py
+# Client-side token buckets for the AI API: requests and tokens per minute.
+#
+# Without them we learn about a rate limit only when the API answers 429,
+# after the call has already used quota. Every completion now first takes one
+# request and its estimated tokens (prompt characters / 4 plus
+# AI_RATE_LIMIT_COMPLETION_TOKENS for the reply) from two buckets that refill
+# at AI_RATE_LIMIT_RPM and AI_RATE_LIMIT_TPM per minute. A call that does not
+# fit waits for the buckets to refill, up to AI_RATE_LIMIT_MAX_WAIT seconds;
+# one that would wait longer is refused at once with the wait it needs, so
+# the view answers 429 with an accurate Retry-After instead of calling the
+# API. Once a reply arrives its real token usage replaces the estimate.
+#
+# The buckets also learn from the API's response headers:
+# x-ratelimit-limit-tokens lowers the token budget to the account's real
+# limit, x-ratelimit-remaining-* caps what is left, and a remaining count of
+# 0 (or a 429's retry-after) pauses every caller until the reset. The
+# request limit header is not used as a budget: Groq reports requests per
+# day there, OpenAI requests per minute.
+#
+# The buckets are per process. AI_RATE_LIMIT_SHARED = True keeps them in the
+# default cache instead (guarded by a cache lock), so every worker process
+# shares one budget; that needs a shared backend such as Redis or Memcached.
+import asyncio
+import contextlib
+import math
+import re
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+DEFAULT_RPM = 30
+DEFAULT_TPM = 12000
+DEFAULT_MAX_WAIT = 10
+DEFAULT_COMPLETION_TOKENS = 1024
+CHARS_PER_TOKEN = 4
+
+STATE_CACHE_KEY = 'posts:ai_ratelimit:state'
+LOCK_CACHE_KEY = 'posts:ai_ratelimit:lock'
+# Seconds a cache lock is held at most (a process that dies holding it) / waited for
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 1
+
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Seconds in a rate-limit header: a number, or a duration such as '7.66s', '2m59.5s', '120ms'."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after_header(headers):
+    milliseconds = _number(headers.get('retry-after-ms'))
+    if milliseconds is not None:
+        return milliseconds / 1000
+    return parse_duration(headers.get('retry-after'))
+
+
+def retry_after_from_headers(headers):
+    """Seconds a 429 response asks us to wait (retry-after, else the exhausted limit's reset), or None."""
+    retry_after = _retry_after_header(headers)
+    if retry_after is not None:
+        return retry_after
+    resets = [
+        parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+        for kind in ('requests', 'tokens')
+        if _number(headers.get(f'x-ratelimit-remaining-{kind}')) == 0
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def estimate_tokens(messages):
+    """Tokens a completion is expected to use: its prompt plus AI_RATE_LIMIT_COMPLETION_TOKENS."""
+    characters = sum(len(message.get('content') or '') for message in messages)
+    completion = getattr(settings, 'AI_RATE_LIMIT_COMPLETION_TOKENS', DEFAULT_COMPLETION_TOKENS)
+    return math.ceil(characters / CHARS_PER_TOKEN) + completion
+
+
+def _shared():
+    return getattr(settings, 'AI_RATE_LIMIT_SHARED', False)
+
+
+@contextlib.contextmanager
+def _cache_lock():
+    # Best effort: after LOCK_WAIT seconds carry on without it rather than stall every AI call
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_WAIT
+    acquired = cache.add(LOCK_CACHE_KEY, token, LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.005)
+        acquired = cache.add(LOCK_CACHE_KEY, token, LOCK_TIMEOUT)
+    if not acquired:
+        metrics.incr('ai_ratelimit.lock_timeouts')
+    try:
+        yield
+    finally:
+        if acquired and cache.get(LOCK_CACHE_KEY) == token:
+            cache.delete(LOCK_CACHE_KEY)
+
+
+class TokenBucketLimiter:
+    """Requests-per-minute and tokens-per-minute budgets shared by every AI call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def enabled(self):
+        return getattr(settings, 'AI_RATE_LIMIT_ENABLED', True)
+
+    # ── State ───────────────────────────────────────────────────────────────
+    # {'requests': level, 'tokens': level, 'at': time of last refill,
+    #  'blocked_until': time, 'learned_tpm': limit from the API or None,
+    #  'tokens_observed_at': time of the last remaining-tokens header}
+    def _fresh(self, now):
+        rpm, tpm = self._limits({})
+        return {'requests': rpm or 0, 'tokens': tpm or 0, 'at': now, 'blocked_until': 0, 'learned_tpm': None}
+
+    def _limits(self, state):
+        """(requests, tokens) per minute; None means unlimited."""
+        rpm = getattr(settings, 'AI_RATE_LIMIT_RPM', DEFAULT_RPM)
+        tpm = getattr(settings, 'AI_RATE_LIMIT_TPM', DEFAULT_TPM)
+        learned = state.get('learned_tpm')
+        if learned:
+            tpm = min(tpm, learned) if tpm else learned
+        return rpm, tpm
+
+    def _refill(self, state, now):
+        rpm, tpm = self._limits(state)
+        elapsed = max(now - state['at'], 0)
+        for bucket, per_minute in (('requests', rpm), ('tokens', tpm)):
+            if per_minute:
+                state[bucket] = min(per_minute, state[bucket] + elapsed * per_minute / 60)
+        state['at'] = now
+
+    def _update(self, change):
+        """Apply change(state, now) atomically and return its result."""
+        # time.time(), not monotonic: shared state is compared across processes
+        with self._lock:
+            if not _shared():
+                if self._state is None:
+                    self._state = self._fresh(time.time())
+                return change(self._state, time.time())
+            with _cache_lock():
+                now = time.time()
+                state = cache.get(STATE_CACHE_KEY) or self._fresh(now)
+                result = change(state, now)
+                cache.set(STATE_CACHE_KEY, state, None)
+                return result
+
+    async def _aupdate(self, change):
+        if _shared():
+            return await sync_to_async(self._update)(change)
+        # In-process the update is a few arithmetic operations under a lock
+        return self._update(change)
+
+    def reset(self):
+        """Forget all state (full buckets, nothing learned)."""
+        with self._lock:
+            self._state = None
+        cache.delete(STATE_CACHE_KEY)
+
+    # ── Admission ───────────────────────────────────────────────────────────
+    def _take(self, tokens):
+        def change(state, now):
+            # 0 once one request and `tokens` are taken, else the seconds until they will be there
+            self._refill(state, now)
+            rpm, tpm = self._limits(state)
+            # A request larger than the whole bucket can only ever wait for a full one
+            tokens_needed = min(tokens, tpm) if tpm else 0
+            waits = [state['blocked_until'] - now]
+            if rpm:
+                waits.append((1 - state['requests']) * 60 / rpm)
+            if tpm:
+                waits.append((tokens_needed - state['tokens']) * 60 / tpm)
+            wait = max(waits)
+            if wait > 0:
+                return wait
+            if rpm:
+                state['requests'] -= 1
+            state['tokens'] -= tokens_needed
+            return 0
+        return change
+
+    def _decide(self, wait, deadline, started):
+        """None to go ahead, 'sleep' to wait `wait` more seconds, or 'reject'."""
+        if wait <= 0:
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                metrics.incr('ai_ratelimit.waits')
+                metrics.observe('ai_ratelimit.wait_seconds', waited)
+            return None
+        if time.monotonic() + wait > deadline:
+            metrics.incr('ai_ratelimit.rejected')
+            return 'reject'
+        return 'sleep'
+
+    def acquire(self, tokens):
+        """
+        Take one request and `tokens`, waiting up to AI_RATE_LIMIT_MAX_WAIT
+        seconds for them. Returns 0, or (without waiting) the seconds the
+        caller would have to wait when that is longer.
+        """
+        if not self.enabled():
+            return 0
+        started = time.monotonic()
+        deadline = started + getattr(settings, 'AI_RATE_LIMIT_MAX_WAIT', DEFAULT_MAX_WAIT)
+        while True:
+            wait = self._update(self._take(tokens))
+            decision = self._decide(wait, deadline, started)
+            if decision is None:
+                return 0
+            if decision == 'reject':
+                return wait
+            time.sleep(wait)
+
+    async def aacquire(self, tokens):
+        """acquire() for async callers: waits without blocking the event loop."""
+        if not self.enabled():
+            return 0
+        started = time.monotonic()
+        deadline = started + getattr(settings, 'AI_RATE_LIMIT_MAX_WAIT', DEFAULT_MAX_WAIT)
+        while True:
+            wait = await self._aupdate(self._take(tokens))
+            decision = self._decide(wait, deadline, started)
+            if decision is None:
+                return 0
+            if decision == 'reject':
+                return wait
+            await asyncio.sleep(wait)
+
+    def _settle(self, estimated, used, since):
+        def change(state, now):
+            # Remaining-tokens headers seen since the call started already count its usage
+            if state.get('tokens_observed_at', 0) < since:
+                state['tokens'] += estimated - used
+        return change
+
+    def settle(self, estimated, used, since):
+        """Replace the estimated tokens of a call started at `since` (time.time()) with what it really used."""
+        if self.enabled() and used is not None:
+            self._update(self._settle(estimated, used, since))
+
+    async def asettle(self, estimated, used, since):
+        if self.enabled() and used is not None:
+            await self._aupdate(self._settle(estimated, used, since))
+
+    # ── Learning from responses ─────────────────────────────────────────────
+    def _observe(self, headers):
+        limit_tokens = _number(headers.get('x-ratelimit-limit-tokens'))
+        remaining = {
+            bucket: _number(headers.get(f'x-ratelimit-remaining-{bucket}')) for bucket in ('requests', 'tokens')
+        }
+        resets = {
+            bucket: parse_duration(headers.get(f'x-ratelimit-reset-{bucket}')) for bucket in ('requests', 'tokens')
+        }
+        retry_after = _retry_after_header(headers)
+        if limit_tokens is None and retry_after is None and all(value is None for value in remaining.values()):
+            return None
+
+        def change(state, now):
+            if limit_tokens:
+                state['learned_tpm'] = limit_tokens
+            self._refill(state, now)
+            for bucket, left in remaining.items():
+                if left is None:
+                    continue
+                state[bucket] = min(state[bucket], left)
+                if bucket == 'tokens':
+                    state['tokens_observed_at'] = now
+                if left == 0 and resets[bucket]:
+                    state['blocked_until'] = max(state['blocked_until'], now + resets[bucket])
+            if retry_after:
+                state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+        return change
+
+    def observe(self, headers):
+        """Update the buckets from an AI API response's rate-limit headers."""
+        change = self._observe(headers) if self.enabled() else None
+        if change:
+            self._update(change)
+
+    async def aobserve(self, headers):
+        change = self._observe(headers) if self.enabled() else None
+        if change:
+            await self._aupdate(change)
+
+
+limiter = TokenBucketLimiter()
@@ -0,0 +1,131 @@
+# posts/ai_stream.py
+# Server-sent events for AI blog generation (POST generate-ai-content/?stream=true).
+#
+# A full generation takes tens of seconds, so the streaming mode asks the AI
+# API for stream=True and relays the reply as it is written:
+#
+#   event: title    data: {"title": "..."}          once EXCERPT:/CODE: closes it
+#   event: excerpt  data: {"excerpt": "..."}        once CODE: closes it
+#   event: html     data: {"chunk": "..."}          raw HTML as it arrives
+#   event: done     data: {"title", "excerpt", "generated_code"}
+#   event: error    data: {"error": "..."}          the stream failed part-way
+#                   (+ "retry_after_seconds" if rate limited)
+#
+# `done` carries the same sanitized fields as the non-streaming response, and
+# clients should replace the preview built from `html` chunks with it. A
+# cached reply (posts/ai_cache.py) arrives as one delta, so its events all go
+# out at once. The view waits for the first token before it answers, so a
+# rate limit or a missing key still gets the usual JSON error and status
+# code. Serve through ASGI (core/asgi.py): under WSGI the stream is collected
+# before it is sent.
+import json
+import time
+
+from django.http import StreamingHttpResponse
+
+from . import metrics
+from .ai_agent import (
+    AIAgentError,
+    AIAgentRateLimitError,
+    astream_blog_content,
+    parse_blog_response,
+    sanitize_code_reply,
+)
+
+# field -> markers that end it
+_FIELDS = (
+    ('title', ('EXCERPT:', 'CODE:')),
+    ('excerpt', ('CODE:',)),
+)
+_CODE_MARKER = 'CODE:'
+
+
+def sse_event(event, data):
+    """Encode one server-sent event with a JSON payload."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode('utf-8')
+
+
+class BlogStreamParser:
+    """Turns reply deltas into title / excerpt / html events as soon as each part is complete."""
+
+    def __init__(self):
+        self.text = ''
+        self.sent = set()
+        self.code_start = None
+        self.code_sent = 0
+
+    def feed(self, delta):
+        """Add a delta; returns the [(event, data)] it completes."""
+        self.text += delta
+        events = []
+        for field, end_markers in _FIELDS:
+            if field in self.sent:
+                continue
+            marker = field.upper() + ':'
+            start = self.text.find(marker)
+            if start == -1:
+                continue
+            start += len(marker)
+            ends = [end for end in (self.text.find(m, start) for m in end_markers) if end != -1]
+            if ends:
+                self.sent.add(field)
+                events.append((field, {field: self.text[start:min(ends)].strip()}))
+
+        if self.code_start is None:
+            marker = self.text.find(_CODE_MARKER)
+            if marker != -1:
+                self.code_start = marker + len(_CODE_MARKER)
+        if self.code_start is not None:
+            chunk = self.text[self.code_start + self.code_sent:]
+            if not self.code_sent:
+                # Drop the whitespace after the marker, but only once there is HTML to send
+                stripped = chunk.lstrip()
+                self.code_start += len(chunk) - len(stripped)
+                chunk = stripped
+            if chunk:
+                self.code_sent += len(chunk)
+                events.append(('html', {'chunk': chunk}))
+        return events
+
+    def finish(self):
+        """The final, sanitized document (same fields as the non-streaming response)."""
+        title, excerpt, html_code = parse_blog_response(sanitize_code_reply(self.text))
+        return {'title': title, 'excerpt': excerpt, 'generated_code': html_code}
+
+
+async def stream_blog_response(requirement, cache=True):
+    """Start generating and return a text/event-stream response relaying it."""
+    started = time.perf_counter()
+    deltas = astream_blog_content(requirement, cache=cache)
+    # Raises AIAgentRateLimitError / AIAgentError before any byte is sent
+    first = await anext(deltas, '')
+    metrics.observe('ai.stream.first_token_seconds', time.perf_counter() - started)
+
+    response = StreamingHttpResponse(_events(first, deltas, started), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _events(first, deltas, started):
+    parser = BlogStreamParser()
+    try:
+        for event, data in parser.feed(first):
+            yield sse_event(event, data)
+        async for delta in deltas:
+            for event, data in parser.feed(delta):
+                yield sse_event(event, data)
+    except AIAgentRateLimitError as exc:
+        metrics.incr('ai.stream.errors')
+        data = {'error': str(exc)}
+        if exc.retry_after is not None:
+            data['retry_after_seconds'] = exc.retry_after
+        yield sse_event('error', data)
+        return
+    except AIAgentError as exc:
+        metrics.incr('ai.stream.errors')
+        yield sse_event('error', {'error': str(exc)})
+        return
+    yield sse_event('done', parser.finish())
+    metrics.observe('ai.stream.total_seconds', time.perf_counter() - started)
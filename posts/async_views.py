@@ -0,0 +1,43 @@
+# posts/async_views.py
+# Async views on top of DRF, for endpoints that spend most of their time
+# waiting on the AI API.
+#
+# DRF's APIView.dispatch is synchronous, so under ASGI a sync AI view holds a
+# thread for the whole completion, and a few dozen slow generations starve
+# every other request. AsyncAPIView keeps DRF's request/response handling but
+# awaits the handler on the event loop. Authentication, permissions and
+# throttling may hit the database, so initial() runs through sync_to_async;
+# only the await on the AI call happens outside a thread.
+#
+# Every handler on an AsyncAPIView subclass (except options) must be
+# `async def`; Django refuses to mix the two in one view.
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+
+    async def dispatch(self, request, *args, **kwargs):
+        """APIView.dispatch, awaiting the handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
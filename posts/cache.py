@@ -0,0 +1,107 @@
+# posts/cache.py
+# Rendered-payload cache for PostDetailView. Entries are keyed by slug and
+# dropped by the signal handlers in posts/signals.py whenever the post or
+# anything it embeds (author, user, category, tags) changes.
+#
+# The taxonomy tree (TaxonomyView) is cached under a version number instead:
+# signals bump the version and readers simply stop finding the old key, so
+# invalidation is one cache write however many entries exist.
+#
+# PostListView's ETag is built from a version number the same way, bumped by
+# any post, author, category or tag change, so validating a list request
+# costs one cache read rather than an aggregate over the filtered posts.
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+DETAIL_KEY_PREFIX = 'posts:detail:'
+TAXONOMY_VERSION_KEY = 'posts:taxonomy:version'
+TAXONOMY_KEY_PREFIX = 'posts:taxonomy:tree:'
+POST_LIST_VERSION_KEY = 'posts:list:version'
+
+
+def _detail_timeout():
+    return getattr(settings, 'POST_DETAIL_CACHE_TIMEOUT', 60 * 15)
+
+
+def detail_cache_key(slug):
+    return f"{DETAIL_KEY_PREFIX}{slug}"
+
+
+def get_post_detail(slug):
+    """
+    Return the cached detail entry for `slug` ({'data', 'etag', 'last_modified'}),
+    or None on a miss.
+    """
+    entry = cache.get(detail_cache_key(slug))
+    if entry is None:
+        metrics.incr('post_detail_cache.misses')
+    else:
+        metrics.incr('post_detail_cache.hits')
+    return entry
+
+
+def set_post_detail(slug, entry):
+    cache.set(detail_cache_key(slug), entry, _detail_timeout())
+
+
+def invalidate_post_details(slugs):
+    """Drop cached detail payloads for every slug in `slugs`."""
+    keys = [detail_cache_key(slug) for slug in slugs if slug]
+    if keys:
+        cache.delete_many(keys)
+        metrics.incr('post_detail_cache.invalidations', len(keys))
+
+
+# ── Taxonomy tree ───────────────────────────────────────────────────────────
+def _taxonomy_timeout():
+    return getattr(settings, 'TAXONOMY_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a lost version key can't revive old entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def get_taxonomy_version():
+    return _get_version(TAXONOMY_VERSION_KEY)
+
+
+def bump_taxonomy_version():
+    _bump_version(TAXONOMY_VERSION_KEY)
+    metrics.incr('taxonomy_cache.invalidations')
+
+
+def get_taxonomy_tree(version):
+    """Return the cached tree entry ({'data', 'etag', 'last_modified'}) for `version`, or None."""
+    entry = cache.get(f"{TAXONOMY_KEY_PREFIX}{version}")
+    metrics.incr('taxonomy_cache.misses' if entry is None else 'taxonomy_cache.hits')
+    return entry
+
+
+def set_taxonomy_tree(version, entry):
+    cache.set(f"{TAXONOMY_KEY_PREFIX}{version}", entry, _taxonomy_timeout())
+
+
+# ── Post list ───────────────────────────────────────────────────────────────
+def get_post_list_version():
+    return _get_version(POST_LIST_VERSION_KEY)
+
+
+def bump_post_list_version():
+    _bump_version(POST_LIST_VERSION_KEY)
+    metrics.incr('post_list_cache.invalidations')
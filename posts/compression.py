@@ -0,0 +1,163 @@
+# posts/compression.py
+# zlib compression for the large HTML columns on Post (see posts/fields.py).
+#
+# Stored format:
+#   b'\xff' b'z' <zlib stream>                      plain zlib
+#   b'\xff' b'd' <4-byte dictionary id> <zlib stream>  zlib with a preset dictionary
+#   anything else                                   legacy uncompressed UTF-8 text
+# 0xFF never occurs in UTF-8, so legacy rows can be told apart without a flag.
+#
+# Preset dictionaries are trained from our own posts (train_dictionary) and
+# stored in the CompressionDictionary table. A row records the id of the
+# dictionary it was written with, so older dictionaries stay decodable.
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+
+MAGIC = b'\xff'
+ZLIB = b'z'
+ZLIB_DICT = b'd'
+MAX_DICTIONARY_SIZE = 32 * 1024  # zlib's window size; larger dictionaries are truncated
+
+_lock = threading.Lock()
+_dictionaries = {}
+_current = {'value': None, 'loaded_at': None}
+
+_TAG_RE = re.compile(r'<[^<>]{1,400}>')
+_CLASS_RE = re.compile(r"""class=(['"])([^'"]{4,300})\1""")
+
+
+class CompressionError(Exception):
+    """Raised when a stored value cannot be decoded."""
+
+
+def _level():
+    return getattr(settings, 'POST_COMPRESSION_LEVEL', 6)
+
+
+def compress(text, dictionary=None):
+    """
+    Compress `text` into the stored format.
+
+    `dictionary` is an (id, bytes) pair, None to use the current trained
+    dictionary (if any), or False to compress without one.
+    """
+    if text is None:
+        return None
+    if not text:
+        return b''
+    data = text.encode('utf-8')
+    if dictionary is None:
+        dictionary = current_dictionary()
+    if dictionary:
+        dict_id, zdict = dictionary
+        compressor = zlib.compressobj(_level(), zdict=zdict)
+        return MAGIC + ZLIB_DICT + struct.pack('>I', dict_id) + compressor.compress(data) + compressor.flush()
+    return MAGIC + ZLIB + zlib.compress(data, _level())
+
+
+def decompress(value):
+    """Return the text for a stored value (compressed bytes or legacy text)."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode('utf-8')
+
+    method = value[1:2]
+    try:
+        if method == ZLIB:
+            return zlib.decompress(value[2:]).decode('utf-8')
+        if method == ZLIB_DICT:
+            (dict_id,) = struct.unpack('>I', value[2:6])
+            decompressor = zlib.decompressobj(zdict=get_dictionary(dict_id))
+            return (decompressor.decompress(value[6:]) + decompressor.flush()).decode('utf-8')
+    except zlib.error as exc:
+        raise CompressionError(f"Corrupt compressed value: {exc}")
+    raise CompressionError(f"Unknown compression method {method!r}")
+
+
+# ── Dictionaries ───────────────────────────────────────────────────────────
+def _dictionary_model():
+    from .models import CompressionDictionary
+    return CompressionDictionary
+
+
+def get_dictionary(dict_id):
+    """Return the bytes of dictionary `dict_id`; dictionaries are immutable, so cache forever."""
+    with _lock:
+        if dict_id in _dictionaries:
+            return _dictionaries[dict_id]
+    try:
+        data = bytes(_dictionary_model().objects.values_list('data', flat=True).get(pk=dict_id))
+    except _dictionary_model().DoesNotExist:
+        raise CompressionError(f"Compression dictionary {dict_id} is missing")
+    with _lock:
+        _dictionaries[dict_id] = data
+    return data
+
+
+def current_dictionary():
+    """
+    Return the newest (id, bytes) dictionary or None. Re-checked every
+    POST_COMPRESSION_DICTIONARY_TTL seconds so running workers pick up a
+    newly trained dictionary.
+    """
+    ttl = getattr(settings, 'POST_COMPRESSION_DICTIONARY_TTL', 300)
+    now = time.monotonic()
+    with _lock:
+        if _current['loaded_at'] is not None and now - _current['loaded_at'] < ttl:
+            return _current['value']
+    row = _dictionary_model().objects.order_by('-pk').values_list('pk', 'data').first()
+    value = (row[0], bytes(row[1])) if row else None
+    with _lock:
+        _current['value'] = value
+        _current['loaded_at'] = now
+        if value:
+            _dictionaries[value[0]] = value[1]
+    return value
+
+
+def clear_dictionary_cache():
+    with _lock:
+        _dictionaries.clear()
+        _current['value'] = None
+        _current['loaded_at'] = None
+
+
+def train_dictionary(samples, size=MAX_DICTIONARY_SIZE):
+    """
+    Build a zlib preset dictionary from sample HTML documents.
+
+    Tags and class attribute values are what repeat across AI-generated
+    posts (Tailwind utility strings, the shared page skeleton), so those are
+    scored by frequency x length and packed into `size` bytes. The best
+    candidates go last: zlib reaches the end of the dictionary with the
+    shortest back-references.
+    """
+    counts = Counter()
+    for sample in samples:
+        if not sample:
+            continue
+        counts.update(_TAG_RE.findall(sample))
+        counts.update(match.group(2) for match in _CLASS_RE.finditer(sample))
+
+    # Anything seen once is not worth the space
+    candidates = [(count * len(piece), piece) for piece, count in counts.items() if count > 1]
+    candidates.sort(reverse=True)
+
+    chosen = []
+    used = 0
+    for _, piece in candidates:
+        encoded = piece.encode('utf-8')
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    chosen.reverse()
+    return b''.join(chosen)
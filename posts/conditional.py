@@ -0,0 +1,60 @@
+# posts/conditional.py
+# Conditional GET support (ETag / Last-Modified -> 304 Not Modified).
+# Validators come from cheap aggregate queries, so a matching request is
+# answered before the queryset is fetched or serialized.
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_validators(*parts):
+    """
+    Build (etag, last_modified) from aggregate values.
+
+    Every part feeds the ETag hash; datetime parts also compete for
+    Last-Modified, which is the newest of them (None if there are none).
+    """
+    timestamps = [part for part in parts if hasattr(part, 'timestamp')]
+    last_modified = max(timestamps) if timestamps else None
+    digest = hashlib.md5(repr(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"', last_modified
+
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the request's validators match, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validator_headers(response, etag, last_modified)
+    return response
+
+
+def set_validator_headers(response, etag, last_modified):
+    if etag and not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    For generic views: answer GET with 304 when If-None-Match/If-Modified-Since
+    match `get_validators()`, otherwise run the normal view and attach ETag and
+    Last-Modified to the response.
+    """
+
+    def get_validators(self):
+        """Return (etag, last_modified) for the current request."""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validator_headers(response, etag, last_modified)
+        return response
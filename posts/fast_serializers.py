@@ -0,0 +1,117 @@
+# posts/fast_serializers.py
+# Read-only fast path for post representations.
+#
+# PostSerializer / PostSummarySerializer walk nested DRF fields per object,
+# which dominates CPU on list endpoints. The functions here build the same
+# dicts straight from `.values()` rows plus one bulk tag lookup, and must
+# render to exactly the same JSON bytes (see FastSerializerParityTests).
+# Keep the field lists below in sync with the serializers in serializers.py.
+from collections import defaultdict
+
+from rest_framework.fields import DateTimeField
+
+from .compression import decompress
+from .models import Author, Post
+
+# Output key order matches PostSerializer.Meta.fields minus write-only fields
+FULL_FIELDS = ('id', 'title', 'slug', 'content', 'excerpt', 'is_html', 'graphical_content',
+               'cover_image', 'created_at', 'author', 'category', 'tags', 'status')
+# ...and PostSummarySerializer.Meta.fields
+SUMMARY_FIELDS = ('id', 'title', 'slug', 'excerpt', 'is_html', 'cover_image',
+                  'created_at', 'updated_at', 'published_at',
+                  'author', 'category', 'tags', 'status')
+
+_NESTED = ('author', 'category', 'tags')
+_DATETIMES = ('created_at', 'updated_at', 'published_at')
+_COMPRESSED = ('content', 'graphical_content')
+_RELATED_COLUMNS = (
+    'author_id', 'author__profile_picture',
+    'author__user__username', 'author__user__first_name', 'author__user__last_name',
+    'category_id', 'category__name', 'category__slug',
+)
+
+_datetime_field = DateTimeField()
+_cover_storage = Post._meta.get_field('cover_image').storage
+_profile_storage = Author._meta.get_field('profile_picture').storage
+
+
+def post_values(queryset, summary=False, extra=()):
+    """Turn a Post queryset into the `.values()` rows serialize_posts() expects."""
+    fields = SUMMARY_FIELDS if summary else FULL_FIELDS
+    columns = [f for f in fields if f not in _NESTED] + list(_RELATED_COLUMNS) + list(extra)
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def _file_url(storage, name, request):
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _tags_by_post(post_ids):
+    tags = defaultdict(list)
+    rows = (
+        Post.tags.through.objects
+        .filter(post_id__in=post_ids)
+        .order_by('tag_id')
+        .values_list('post_id', 'tag_id', 'tag__name', 'tag__slug', 'tag__category_id')
+    )
+    for post_id, tag_id, name, slug, category_id in rows:
+        tags[post_id].append({'id': tag_id, 'name': name, 'slug': slug, 'category': category_id})
+    return tags
+
+
+def serialize_posts(rows, request=None, summary=False):
+    """
+    Serialize `post_values()` rows into PostSerializer (or, with summary=True,
+    PostSummarySerializer) dicts. Runs one query for all the rows' tags.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    fields = SUMMARY_FIELDS if summary else FULL_FIELDS
+    tags = _tags_by_post([row['id'] for row in rows])
+
+    results = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == 'author':
+                item['author'] = _author(row, request)
+            elif field == 'category':
+                item['category'] = _category(row)
+            elif field == 'tags':
+                item['tags'] = tags.get(row['id'], [])
+            elif field == 'cover_image':
+                item['cover_image'] = _file_url(_cover_storage, row['cover_image'], request)
+            elif field in _DATETIMES:
+                item[field] = _datetime_field.to_representation(row[field])
+            elif field in _COMPRESSED:
+                item[field] = decompress(row[field])
+            else:
+                item[field] = row[field]
+        results.append(item)
+    return results
+
+
+def _author(row, request):
+    if row['author_id'] is None:
+        return None
+    first_name = row['author__user__first_name']
+    last_name = row['author__user__last_name']
+    username = row['author__user__username']
+    return {
+        'id': row['author_id'],
+        'username': username,
+        'full_name': f"{first_name} {last_name}" if first_name and last_name else username,
+        'profile_picture': _file_url(_profile_storage, row['author__profile_picture'], request),
+    }
+
+
+def _category(row):
+    if row['category_id'] is None:
+        return None
+    return {'id': row['category_id'], 'name': row['category__name'], 'slug': row['category__slug']}
@@ -0,0 +1,70 @@
+# posts/fields.py
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from .compression import compress, decompress
+
+
+class CompressedTextAttribute(DeferredAttribute):
+    """
+    Decompress on first attribute access and keep the text on the instance.
+    Defines __set__ so it takes precedence over the instance __dict__.
+    """
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if instance is not None and isinstance(value, (bytes, memoryview)):
+            value = decompress(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """
+    A TextField stored zlib-compressed in a binary column (posts/compression.py).
+
+    Rows are loaded as compressed bytes and only decompressed when the
+    attribute is read, so querysets that never touch the body don't pay for
+    it. `.values()` returns the stored bytes; pass them through
+    `posts.compression.decompress`. Substring lookups on the column are not
+    supported.
+    """
+    descriptor_class = CompressedTextAttribute
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, memoryview):
+            return bytes(value)
+        return value
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decompress(value)
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Bypass the descriptor so a body that was never read is saved as-is,
+        # without a decompress/recompress round trip
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return super().pre_save(model_instance, add)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, memoryview)):
+            # Already in stored form (loaded but never read)
+            return value
+        return compress(str(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is not None and not isinstance(value, str):
+            return connection.Database.Binary(value)
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,124 @@
+# posts/filters.py
+# Query-parameter filtering and facet counts for PostListView.
+#
+#   ?category=<slug>                   posts in that category
+#   ?tags=<slug>,<slug>&tags_match=any posts with any (default) or all of the tags
+#   ?author=<username>                 posts by that author
+#   ?published_after=<date|datetime>   published_at >= value
+#   ?published_before=<date|datetime>  published_at <  value
+#   ?facets=true                       add per-category / per-tag counts
+#
+# Tag filters run as a `pk IN (subquery on posts_post_tags)` so a post with
+# several matching tags is never duplicated and no DISTINCT is needed.
+import datetime
+
+from django.db.models import CharField, Count, F, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Post
+
+TAG_MATCH_MODES = ('any', 'all')
+MAX_FILTER_TAGS = 20
+
+
+def _parse_moment(name, value):
+    """Accept an ISO date (midnight, current timezone) or datetime."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.datetime.combine(day, datetime.time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({"error": f"{name} must be an ISO date or datetime"})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class PostFilterBackend(BaseFilterBackend):
+    """Applies the category/tags/author/published-date filters described above."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        category = params.get('category')
+        if category:
+            queryset = queryset.filter(category__slug=category)
+
+        author = params.get('author')
+        if author:
+            queryset = queryset.filter(author__user__username=author)
+
+        tags = [slug for slug in params.get('tags', '').split(',') if slug.strip()]
+        if tags:
+            queryset = queryset.filter(pk__in=self.tagged_post_ids(tags, params.get('tags_match', 'any')))
+
+        published_after = params.get('published_after')
+        if published_after:
+            queryset = queryset.filter(published_at__gte=_parse_moment('published_after', published_after))
+        published_before = params.get('published_before')
+        if published_before:
+            queryset = queryset.filter(published_at__lt=_parse_moment('published_before', published_before))
+        return queryset
+
+    def tagged_post_ids(self, slugs, match):
+        if match not in TAG_MATCH_MODES:
+            raise ValidationError({"error": "tags_match must be 'any' or 'all'"})
+        slugs = sorted({slug.strip() for slug in slugs})
+        if len(slugs) > MAX_FILTER_TAGS:
+            raise ValidationError({"error": f"At most {MAX_FILTER_TAGS} tags can be filtered on"})
+        through = Post.tags.through.objects.filter(tag__slug__in=slugs)
+        if match == 'all':
+            # Posts linked to every requested tag (the through table is unique per pair)
+            return (
+                through.order_by().values('post_id')
+                .annotate(matched=Count('tag_id'))
+                .filter(matched=len(slugs))
+                .values('post_id')
+            )
+        return through.values('post_id')
+
+
+def facet_counts(queryset):
+    """
+    Per-category and per-tag post counts for the posts in `queryset`, from a
+    single statement (two grouped SELECTs joined with UNION ALL).
+    """
+    post_ids = queryset.order_by().values('pk')
+    by_category = (
+        Post.objects.filter(pk__in=post_ids, category__isnull=False)
+        .order_by()
+        .values('category_id')
+        .annotate(
+            facet=Value('category', output_field=CharField()),
+            key=F('category_id'), slug=F('category__slug'), name=F('category__name'),
+            count=Count('id'),
+        )
+        .values_list('facet', 'key', 'slug', 'name', 'count')
+    )
+    by_tag = (
+        Post.tags.through.objects.filter(post_id__in=post_ids)
+        .order_by()
+        .values('tag_id')
+        .annotate(
+            facet=Value('tag', output_field=CharField()),
+            key=F('tag_id'), slug=F('tag__slug'), name=F('tag__name'),
+            count=Count('post_id'),
+        )
+        .values_list('facet', 'key', 'slug', 'name', 'count')
+    )
+
+    facets = {'categories': [], 'tags': []}
+    # Clear Post.Meta.ordering on the combined query too: its columns are not in the UNION's result
+    for facet, key, slug, name, count in by_category.union(by_tag, all=True).order_by():
+        bucket = facets['categories' if facet == 'category' else 'tags']
+        bucket.append({'id': key, 'slug': slug, 'name': name, 'count': count})
+    for bucket in facets.values():
+        bucket.sort(key=lambda item: (-item['count'], item['name']))
+    return facets
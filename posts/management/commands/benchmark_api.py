@@ -0,0 +1,313 @@
+import json
+import platform
+import queue
+import resource
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+import django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from posts.models import Author, Category, Post
+
+BENCH_USERNAME_PREFIX = 'benchmark-login-'
+
+# name -> (method, path template, needs token); {slug}/{category} are filled per request
+SCENARIOS = {
+    'post-list': ('GET', '/api/posts/', False),
+    'post-list-full': ('GET', '/api/posts/?mode=full', False),
+    'post-list-category': ('GET', '/api/posts/?category={category}&facets=true', False),
+    'post-detail': ('GET', '/api/posts/{slug}/', False),
+    'my-posts': ('GET', '/api/my-posts/', True),
+    'categories': ('GET', '/api/categories/', False),
+    'tags': ('GET', '/api/tags/', False),
+    'taxonomy': ('GET', '/api/taxonomy/', False),
+    'auth-login': ('POST', '/api/auth/login/', False),
+    'auth-check': ('GET', '/api/auth/check/', True),
+    'auth-user': ('GET', '/api/auth/user/', True),
+}
+# These log in, so they only run with --create-fixtures
+AUTH_SCENARIOS = {'my-posts', 'auth-login', 'auth-check', 'auth-user'}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives the posts API with concurrent requests (in-process through the full '
+        'middleware stack, or against --base-url) and reports p50/p95/p99 latency, '
+        'throughput, queries per request and peak RSS. Results are saved as JSON and '
+        'can be compared against a baseline file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), help='Default: all')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--base-url', help='Benchmark a running server over HTTP instead of in-process '
+                                               '(queries per request are then not measured)')
+        parser.add_argument('--accept-encoding', default='gzip, br')
+        parser.add_argument('--generate', type=int, default=0, metavar='POSTS',
+                            help='First seed this many posts with generate_dataset if there are fewer')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', help='Earlier results file to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.15,
+                            help='Allowed relative p95/throughput slowdown before flagging a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--create-fixtures', action='store_true',
+                            help='Create a throwaway login user (random password) and an API token for the '
+                                 'authenticated scenarios; both are deleted when the run finishes')
+
+    def handle(self, *args, **options):
+        if options['generate'] and Post.objects.count() < options['generate']:
+            call_command(
+                'generate_dataset', posts=options['generate'] - Post.objects.count(),
+                users=max(options['generate'] // 500, 10), prefix=f'bench{int(time.time())}',
+                stdout=self.stdout,
+            )
+        names = options['scenarios'] or list(SCENARIOS)
+        if not options['create_fixtures']:
+            needs_fixtures = [name for name in names if name in AUTH_SCENARIOS]
+            if options['scenarios'] and needs_fixtures:
+                raise CommandError(f'{", ".join(needs_fixtures)} need --create-fixtures')
+            names = [name for name in names if name not in AUTH_SCENARIOS]
+        self.options = options
+        self.fixtures = self._fixtures(options['create_fixtures'])
+
+        results = {}
+        try:
+            for name in names:
+                results[name] = self._run(name)
+                self._print_row(name, results[name])
+        finally:
+            self._remove_fixtures()
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'mode': 'http' if options['base_url'] else 'in-process',
+                'base_url': options['base_url'],
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'database': connection.vendor,
+                'posts': Post.objects.count(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'scenarios': results,
+        }
+        with open(options['output'], 'w') as out:
+            json.dump(report, out, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['baseline']:
+            regressions = self._compare(options['baseline'], results, options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} performance regression(s) against {options["baseline"]}')
+
+    # ── Setup ───────────────────────────────────────────────────────────────
+    def _fixtures(self, create):
+        slugs = list(
+            Post.objects.filter(status='published').order_by('-created_at').values_list('slug', flat=True)[:500]
+        )
+        if not slugs:
+            raise CommandError('No published posts; seed some first (e.g. --generate 10000)')
+        categories = list(Category.objects.values_list('slug', flat=True)) or ['none']
+        fixtures = {'slugs': slugs, 'categories': categories, 'created': []}
+        if not create:
+            return fixtures
+
+        # my-posts runs as the most prolific author; the login scenario uses its own user.
+        # Only what is created here is removed again: an author's existing token is left alone.
+        author = Author.objects.annotate(post_count=Count('posts')).order_by('-post_count').first()
+        token, created = Token.objects.get_or_create(user=author.user)
+        if created:
+            fixtures['created'].append(token)
+        password = secrets.token_urlsafe(24)
+        login_user = User.objects.create_user(BENCH_USERNAME_PREFIX + secrets.token_hex(6), password=password)
+        fixtures['created'].append(login_user)
+        fixtures.update(token=token.key, username=login_user.username, password=password)
+        return fixtures
+
+    def _remove_fixtures(self):
+        for obj in self.fixtures['created']:
+            obj.delete()
+        self.fixtures['created'] = []
+
+    def _request_args(self, name, number):
+        method, template, needs_token = SCENARIOS[name]
+        path = template.format(
+            slug=self.fixtures['slugs'][number % len(self.fixtures['slugs'])],
+            category=self.fixtures['categories'][number % len(self.fixtures['categories'])],
+        )
+        headers = {'Accept-Encoding': self.options['accept_encoding']}
+        if needs_token:
+            headers['Authorization'] = f'Token {self.fixtures["token"]}'
+        body = None
+        if name == 'auth-login':
+            body = json.dumps({'username': self.fixtures['username'], 'password': self.fixtures['password']})
+        return method, path, headers, body
+
+    # ── Running ─────────────────────────────────────────────────────────────
+    def _run(self, name):
+        warmup, total = self.options['warmup'], self.options['requests']
+        work = queue.Queue()
+        for number in range(warmup + total):
+            work.put(number)
+
+        samples = []  # (seconds, status, queries)
+        failures = []
+        lock = threading.Lock()
+        started = [None]
+
+        def worker():
+            send = self._http_sender() if self.options['base_url'] else self._client_sender()
+            try:
+                while not failures:
+                    try:
+                        number = work.get_nowait()
+                    except queue.Empty:
+                        return
+                    if number == warmup:
+                        with lock:
+                            started[0] = started[0] or time.perf_counter()
+                    result = send(*self._request_args(name, number))
+                    if number >= warmup:
+                        with lock:
+                            samples.append(result)
+            except Exception as exc:
+                failures.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if failures:
+            raise CommandError(f'{name}: {failures[0]!r}')
+        elapsed = time.perf_counter() - (started[0] or time.perf_counter())
+
+        latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+        statuses = Counter(str(status) for _, status, _ in samples)
+        queries = [count for _, _, count in samples if count is not None]
+        return {
+            'requests': len(samples),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith(('2', '3'))),
+            'status_codes': dict(statuses),
+            'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'throughput_rps': round(len(samples) / elapsed, 1) if latencies and elapsed else None,
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    def _client_sender(self):
+        # ALLOWED_HOSTS does not include the test client's default 'testserver'
+        client = Client(SERVER_NAME='localhost')
+
+        def send(method, path, headers, body):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if method == 'POST':
+                    response = client.post(path, body, content_type='application/json', headers=headers)
+                else:
+                    response = client.get(path, headers=headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            return elapsed, response.status_code, len(captured)
+        return send
+
+    def _http_sender(self):
+        base_url = self.options['base_url'].rstrip('/')
+
+        def send(method, path, headers, body):
+            if body is not None:
+                headers = dict(headers, **{'Content-Type': 'application/json'})
+            request = urllib.request.Request(
+                base_url + path, method=method, headers=headers,
+                data=body.encode('utf-8') if body is not None else None,
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                exc.read()
+                status = exc.code
+            return time.perf_counter() - started, status, None
+        return send
+
+    # ── Reporting ───────────────────────────────────────────────────────────
+    def _print_row(self, name, result):
+        if not hasattr(self, '_header_printed'):
+            self._header_printed = True
+            self.stdout.write(
+                f"{'scenario':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'errors':>8}{'rss MB':>9}"
+            )
+        queries = result['queries_per_request']
+        self.stdout.write(
+            f"{name:<20}{result['p50_ms'] or 0:>9.1f}{result['p95_ms'] or 0:>9.1f}{result['p99_ms'] or 0:>9.1f}"
+            f"{result['throughput_rps'] or 0:>9.1f}{'-' if queries is None else queries:>9}"
+            f"{result['errors']:>8}{result['peak_rss_mb']:>9.1f}"
+        )
+
+    def _compare(self, path, results, tolerance):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)['scenarios']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared with {path}:'))
+        for name, result in results.items():
+            base = baseline.get(name)
+            # Nothing to compare when either run took no samples (e.g. --requests 0)
+            if not base or base['p95_ms'] is None or result['p95_ms'] is None:
+                continue
+            problems = []
+            if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                problems.append(f"p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+            if base['throughput_rps'] and (result['throughput_rps'] or 0) < base['throughput_rps'] * (1 - tolerance):
+                problems.append(f"throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s")
+            # Half a query of slack absorbs occasional writes such as view-count flushes
+            if (result['queries_per_request'] or 0) > (base['queries_per_request'] or 0) + 0.5:
+                problems.append(f"queries {base['queries_per_request']} -> {result['queries_per_request']}")
+            if problems:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f'  {name}: ' + '; '.join(problems)))
+            else:
+                change = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0
+                self.stdout.write(f'  {name}: ok (p95 {change:+.0f}%)')
+        return regressions
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import compression
+from posts.compression import compress, decompress, train_dictionary
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares stored size and encode/decode latency of post HTML bodies: '
+        'uncompressed, zlib, and zlib with a dictionary trained on the same posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Number of most recent posts to measure')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the best is reported')
+
+    def handle(self, *args, **options):
+        rows = Post.objects.order_by('-pk').values_list('content', 'graphical_content')[:options['limit']]
+        documents = [text for row in rows for text in map(decompress, row) if text]
+        if not documents:
+            raise CommandError('No post bodies to measure')
+
+        dictionary = train_dictionary(documents)
+        raw_size = sum(len(text.encode('utf-8')) for text in documents)
+        cases = [('zlib', False)]
+        if dictionary:
+            cases.append(('zlib+dict', (0, dictionary)))
+
+        self.stdout.write(f'{len(documents)} documents, dictionary {len(dictionary)} bytes')
+        self.stdout.write(f"{'method':<12}{'bytes':>14}{'ratio':>8}{'compress ms':>14}{'decompress ms':>16}")
+        self.stdout.write(f"{'none':<12}{raw_size:>14}{1:>8.2f}{'-':>14}{'-':>16}")
+        for name, zdict in cases:
+            compress_time, stored = self._best_of(
+                lambda: [compress(text, dictionary=zdict) for text in documents], options['repeat'],
+            )
+            # Make the trained (unsaved) dictionary resolvable as id 0 while decoding
+            compression._dictionaries[0] = dictionary
+            try:
+                decompress_time, texts = self._best_of(
+                    lambda: [decompress(value) for value in stored], options['repeat'],
+                )
+            finally:
+                compression._dictionaries.pop(0, None)
+            if texts != documents:
+                raise CommandError(f'{name} did not round-trip')
+            size = sum(len(value) for value in stored)
+            self.stdout.write(
+                f"{name:<12}{size:>14}{raw_size / size:>8.2f}"
+                f"{compress_time * 1000:>14.1f}{decompress_time * 1000:>16.1f}"
+            )
+
+    def _best_of(self, func, repeat):
+        best, output = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
@@ -0,0 +1,101 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from posts.fast_serializers import post_values, serialize_posts
+from posts.models import Category, Post, Tag
+from posts.serializers import PostSerializer, PostSummarySerializer
+
+BODY = "<section class='max-w-3xl mx-auto px-6 py-12'><p class='text-lg text-gray-700'>Lorem ipsum.</p></section>" * 40
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks PostSerializer/PostSummarySerializer against the .values() fast path '
+        '(posts/fast_serializers.py). Seeds posts in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the best is reported')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        try:
+            with transaction.atomic():
+                self._seed(max(sizes))
+                self._run(sizes, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, count):
+        user, _ = User.objects.get_or_create(
+            username='bench-author', defaults={'first_name': 'Bench', 'last_name': 'Author'},
+        )
+        category = Category.objects.create(name='Bench', slug='bench-serializers')
+        tags = [Tag(name=f'Bench {i}', slug=f'bench-serializers-{i}', category=category) for i in range(10)]
+        Tag.objects.bulk_create(tags)
+
+        posts = Post.objects.bulk_create(
+            [
+                Post(
+                    title=f'Bench post {i}', slug=f'bench-serializers-{i}', content=BODY, excerpt='Excerpt',
+                    graphical_content=BODY, author=user.author_profile, category=category,
+                    status='published', is_html=True,
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        through = Post.tags.through
+        through.objects.bulk_create(
+            [through(post_id=post.pk, tag_id=tags[(post.pk + k) % len(tags)].pk) for post in posts for k in range(3)],
+            batch_size=5000,
+        )
+        self.stdout.write(f'Seeded {count} posts')
+
+    def _run(self, sizes, repeat):
+        renderer = JSONRenderer()
+        request = APIRequestFactory().get('/api/posts/')
+        cases = [('summary', PostSummarySerializer, True), ('full', PostSerializer, False)]
+
+        self.stdout.write(f"{'mode':<8}{'posts':>8}{'drf ms':>12}{'fast ms':>12}{'speedup':>10}")
+        for size in sizes:
+            queryset = Post.objects.filter(slug__startswith='bench-serializers-').order_by('-created_at', '-id')
+            for mode, serializer_class, summary in cases:
+                drf_page = queryset.summary() if summary else queryset
+
+                def drf():
+                    rows = drf_page.with_relations()[:size]
+                    return renderer.render(serializer_class(rows, many=True, context={'request': request}).data)
+
+                def fast():
+                    rows = post_values(queryset, summary=summary)[:size]
+                    return renderer.render(serialize_posts(rows, request=request, summary=summary))
+
+                drf_time, drf_bytes = self._best_of(drf, repeat)
+                fast_time, fast_bytes = self._best_of(fast, repeat)
+                if drf_bytes != fast_bytes:
+                    raise CommandError(f'Fast path output differs from {serializer_class.__name__} ({mode}, {size})')
+                self.stdout.write(
+                    f"{mode:<8}{size:>8}{drf_time * 1000:>12.1f}{fast_time * 1000:>12.1f}"
+                    f"{drf_time / fast_time:>9.1f}x"
+                )
+
+    def _best_of(self, func, repeat):
+        best, output = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
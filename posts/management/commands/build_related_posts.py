@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Fits the TF-IDF vocabulary over all published posts and rebuilds every '
+        'precomputed related-posts list (posts/related.py)'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = rebuild_related_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Built related posts for {stats['posts']} posts ({stats['terms']} terms, "
+            f"{stats['links']} links) in {time.perf_counter() - started:.1f}s"
+        ))
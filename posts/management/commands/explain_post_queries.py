@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from posts.models import Author, Post
+from posts.pagination import PostCursorPagination
+from posts.views import PostListView, MyPostsView
+
+
+class Command(BaseCommand):
+    help = (
+        'Prints the query plan (EXPLAIN ANALYZE on PostgreSQL) for the queries behind '
+        'the post endpoints, to check index usage against a large seeded dataset'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='Username for the my-posts plan (default: the author with most posts)')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--no-analyze', action='store_true', help='Plan only; do not execute the queries')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        author = self._get_author(options['author'])
+
+        plans = [
+            ('post-list (first page)', self._page(PostListView, '/api/posts/', None, page_size, cursor_from_row=False)),
+            ('post-list (deep page)', self._page(PostListView, '/api/posts/', None, page_size, cursor_from_row=True)),
+        ]
+        category = Post.objects.filter(status='published', category__isnull=False).values_list('category__slug', flat=True).first()
+        if category:
+            plans.append(('post-list (?category=)', self._page(PostListView, f'/api/posts/?category={category}', None, page_size, cursor_from_row=False)))
+        tag = Post.tags.through.objects.values_list('tag__slug', flat=True).first()
+        if tag:
+            plans.append(('post-list (?tags=)', self._page(PostListView, f'/api/posts/?tags={tag}', None, page_size, cursor_from_row=False)))
+        if author is not None:
+            plans.append(('post-list (?author=)', self._page(PostListView, f'/api/posts/?author={author.user.username}', None, page_size, cursor_from_row=False)))
+            plans += [
+                ('my-posts (first page)', self._page(MyPostsView, '/api/my-posts/', author.user, page_size, cursor_from_row=False)),
+                ('my-posts (deep page)', self._page(MyPostsView, '/api/my-posts/', author.user, page_size, cursor_from_row=True)),
+            ]
+        slug = Post.objects.order_by('-pk').values_list('slug', flat=True).first()
+        if slug:
+            plans.append(('post-detail', Post.objects.with_relations().defer('search_vector').filter(slug=slug)))
+        plans.append(('Meta.ordering (published_at)', Post.objects.filter(status='published')[:page_size]))
+
+        explain_options = {}
+        if connection.vendor == 'postgresql':
+            explain_options = {'analyze': not options['no_analyze'], 'buffers': not options['no_analyze']}
+
+        for name, queryset in plans:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
+
+    def _get_author(self, username):
+        if username:
+            try:
+                return Author.objects.select_related('user').get(user__username=username)
+            except Author.DoesNotExist:
+                raise CommandError(f'No author with username "{username}"')
+        return (
+            Author.objects.select_related('user')
+            .annotate(post_count=Count('posts'))
+            .order_by('-post_count')
+            .first()
+        )
+
+    def _page(self, view_class, path, user, page_size, cursor_from_row):
+        """Build the exact page queryset the endpoint would run."""
+        request = APIRequestFactory().get(path)
+        if user is not None:
+            force_authenticate(request, user=user)
+        view = view_class()
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        queryset = view.filter_queryset(view.get_queryset())
+
+        paginator = PostCursorPagination()
+        cursor = None
+        if cursor_from_row:
+            # Start half-way down the list to show the boundary condition in use
+            ordered = queryset.order_by('-created_at', '-id').values('created_at', 'id')
+            middle = queryset.count() // 2
+            rows = list(ordered[middle:middle + 1])
+            if rows:
+                cursor = {'created_at': rows[0]['created_at'], 'id': rows[0]['id'], 'reverse': False}
+        return paginator.get_page_queryset(queryset, cursor, page_size)
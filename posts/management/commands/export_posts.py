@@ -0,0 +1,73 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from posts.compression import decompress
+from posts.models import Post
+from posts.transfer import POST_FIELDS, Progress, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams posts, with their author, category and tags, to a JSONL file '
+        '(see posts/transfer.py). Memory use does not grow with the table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='File to write (.gz to compress; default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--status', choices=['draft', 'published'], help='Only export posts with this status')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.objects.order_by('pk')
+        if options['status']:
+            posts = posts.filter(status=options['status'])
+        rows = posts.values(
+            'pk', *POST_FIELDS, 'author__user__username', 'category__slug', 'category__name',
+        ).iterator(chunk_size=chunk_size)
+
+        # Progress goes to stderr so it never mixes with JSONL on stdout
+        progress = Progress(self.stderr.write, 'Exported')
+        with open_stream(options['output'], 'w', self.stdout) as out:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self._write_chunk(out, chunk)
+                    progress.add(len(chunk))
+                    chunk = []
+            self._write_chunk(out, chunk)
+            progress.add(len(chunk))
+        self.stderr.write(self.style.SUCCESS(progress.summary()))
+
+    def _write_chunk(self, out, chunk):
+        if not chunk:
+            return
+        # One query for the whole chunk's tags
+        tags = defaultdict(list)
+        links = (
+            Post.tags.through.objects.filter(post_id__in=[row['pk'] for row in chunk])
+            .order_by('post_id', 'tag__slug')
+            .values_list('post_id', 'tag__slug', 'tag__name', 'tag__category__slug')
+        )
+        for post_id, slug, name, category in links:
+            tags[post_id].append({'slug': slug, 'name': name, 'category': category})
+
+        lines = []
+        for row in chunk:
+            record = {field: row[field] for field in POST_FIELDS}
+            # Full microsecond precision (DjangoJSONEncoder would round to milliseconds)
+            for field in ('created_at', 'updated_at', 'published_at'):
+                if record[field] is not None:
+                    record[field] = record[field].isoformat()
+            record['content'] = decompress(record['content'])
+            record['graphical_content'] = decompress(record['graphical_content'])
+            record['author'] = row['author__user__username']
+            record['category'] = (
+                {'slug': row['category__slug'], 'name': row['category__name']} if row['category__slug'] else None
+            )
+            record['tags'] = tags.get(row['pk'], [])
+            lines.append(json.dumps(record, ensure_ascii=False))
+        out.write('\n'.join(lines) + '\n')
@@ -0,0 +1,195 @@
+import itertools
+import random
+import datetime
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from posts.cache import bump_post_list_version, bump_taxonomy_version
+from posts.compression import compress
+from posts.models import Author, Category, Post, Tag
+from posts.search import index_rows
+from posts.transfer import Progress
+
+WORDS = (
+    'django api cache query index latency python react design system token model stream async '
+    'database postgres layout typography pattern scale deploy review testing security growth '
+    'content search prompt agent pipeline metric queue worker batch cursor render component '
+    'migration schema request response server client benchmark profile memory thread network'
+).split()
+FIRST_NAMES = ('Ada', 'Grace', 'Linus', 'Guido', 'Margaret', 'Ken', 'Barbara', 'Dennis', 'Radia', 'Alan')
+LAST_NAMES = ('Lovelace', 'Hopper', 'Torvalds', 'Rossum', 'Hamilton', 'Thompson', 'Liskov', 'Ritchie', 'Perlman', 'Kay')
+
+# Building blocks shaped like generate_blog_content / generate_graphical_content output
+SECTIONS = (
+    "<section class='max-w-3xl mx-auto px-6 py-12'><h2 class='text-3xl font-bold text-gray-900 mb-6'>{title}</h2>"
+    "<p class='text-lg leading-relaxed text-gray-700 mb-4'>{text}</p>"
+    "<p class='text-lg leading-relaxed text-gray-700 mb-4'>{text2}</p></section>",
+    "<section class='max-w-5xl mx-auto px-6 py-12'><div class='grid grid-cols-1 md:grid-cols-3 gap-6'>"
+    "<div class='rounded-2xl border border-gray-200 bg-white p-6 shadow-sm'><h3 class='text-xl font-semibold text-gray-900 mb-2'>{word}</h3>"
+    "<p class='text-gray-600'>{text}</p></div>"
+    "<div class='rounded-2xl border border-gray-200 bg-white p-6 shadow-sm'><h3 class='text-xl font-semibold text-gray-900 mb-2'>{word2}</h3>"
+    "<p class='text-gray-600'>{text2}</p></div>"
+    "<div class='rounded-2xl border border-gray-200 bg-white p-6 shadow-sm'><h3 class='text-xl font-semibold text-gray-900 mb-2'>{word3}</h3>"
+    "<p class='text-gray-600'>{text3}</p></div></div></section>",
+    "<section class='max-w-3xl mx-auto px-6 py-8'><pre class='rounded-xl bg-gray-900 text-gray-100 p-6 overflow-x-auto text-sm'>"
+    "<code>def {word}({word2}):\n    return {word3}.{word}({word2})\n</code></pre>"
+    "<p class='text-gray-700 mt-4'>{text}</p></section>",
+    "<section class='max-w-3xl mx-auto px-6 py-8'><blockquote class='border-l-4 border-indigo-500 pl-6 italic text-xl text-gray-800'>"
+    "{text}</blockquote></section>",
+    "<section class='max-w-3xl mx-auto px-6 py-8'><ul class='list-disc pl-6 space-y-2 text-gray-700'>"
+    "<li>{text}</li><li>{text2}</li><li>{text3}</li></ul></section>",
+)
+PAGE = (
+    "<!DOCTYPE html><html lang='en'><head><meta charset='UTF-8'>"
+    "<meta name='viewport' content='width=device-width, initial-scale=1.0'><title>{title}</title>"
+    "<script src='https://cdn.tailwindcss.com'></script></head>"
+    "<body class='bg-white text-gray-900 antialiased'><header class='max-w-3xl mx-auto px-6 pt-16'>"
+    "<h1 class='text-5xl font-extrabold tracking-tight text-gray-900'>{title}</h1></header>{sections}</body></html>"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a reproducible synthetic dataset (users/authors, posts with realistic HTML '
+        'bodies, tags, mixed statuses and dates) for load testing and benchmarks'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--prefix', default='synthetic', help='Prefix for generated usernames and slugs')
+        parser.add_argument('--body-kb', type=int, default=24, help='Average HTML body size in KB')
+        parser.add_argument('--distinct-bodies', type=int, default=500,
+                            help='Size of the pool of pre-rendered (and pre-compressed) bodies posts draw from')
+        parser.add_argument('--draft-ratio', type=float, default=0.1)
+        parser.add_argument('--days', type=int, default=730, help='Spread created_at over this many days')
+        parser.add_argument('--until', type=datetime.date.fromisoformat,
+                            help='Newest created_at date, YYYY-MM-DD (default: today); fix it for identical reruns')
+        parser.add_argument('--index', action='store_true', help='Also index posts for search (slower)')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Data with prefix "{prefix}" already exists; use another --prefix')
+        if not Tag.objects.exists():
+            call_command('setup_blog_data', stdout=self.stdout)
+
+        rng = random.Random(options['seed'])
+        self.rng = rng
+        until = options['until'] or timezone.localdate()
+        self.now = timezone.make_aware(datetime.datetime.combine(until, datetime.time.max))
+        authors = self._create_authors(options['users'], prefix)
+        categories = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+        tags_by_category = {}
+        for tag_id, category_id in Tag.objects.order_by('pk').values_list('pk', 'category_id'):
+            tags_by_category.setdefault(category_id, []).append(tag_id)
+        all_tags = [tag for tags in tags_by_category.values() for tag in tags]
+
+        bodies = self._body_pool(options['distinct_bodies'], options['body_kb'] * 1024)
+        graphics = self._body_pool(max(options['distinct_bodies'] // 5, 1), options['body_kb'] * 512)
+        # Zipf-ish: a few prolific authors, a long tail of occasional ones
+        author_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(authors))))
+
+        progress = Progress(self.stdout.write, 'Generated')
+        total, batch_size = options['posts'], options['batch_size']
+        for start in range(0, total, batch_size):
+            posts, links = [], []
+            for number in range(start, min(start + batch_size, total)):
+                category = rng.choice(categories) if categories and rng.random() < 0.9 else None
+                post = self._post(
+                    number, prefix, rng.choices(authors, cum_weights=author_weights)[0], category,
+                    bodies, graphics, options,
+                )
+                pool = tags_by_category.get(category) or all_tags
+                posts.append(post)
+                links.append(rng.sample(pool, min(len(pool), rng.randint(0, 4))))
+            stamps = [(post.created_at, post.updated_at) for post in posts]
+
+            with transaction.atomic():
+                posts = Post.objects.bulk_create(posts)
+                # bulk_create stamps created_at/updated_at with now(); put the generated values back
+                for post, (created_at, updated_at) in zip(posts, stamps):
+                    post.created_at, post.updated_at = created_at, updated_at
+                Post.objects.bulk_update(posts, ['created_at', 'updated_at'])
+                through = Post.tags.through
+                through.objects.bulk_create(
+                    [through(post_id=post.pk, tag_id=tag_id) for post, tag_ids in zip(posts, links) for tag_id in tag_ids]
+                )
+                if options['index']:
+                    index_rows([(post.pk, post.title, post.excerpt, post.content) for post in posts])
+            progress.add(len(posts))
+
+        bump_taxonomy_version()
+        bump_post_list_version()
+        self.stdout.write(self.style.SUCCESS(progress.summary()))
+        if not options['index']:
+            self.stdout.write('Search index not built; run `manage.py rebuild_search_index` if you need it.')
+        self.stdout.write('Related posts not updated; run `manage.py build_related_posts` if you need them.')
+
+    def _create_authors(self, count, prefix):
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'{prefix}-user-{i}', password=password, email=f'{prefix}-user-{i}@example.com',
+                    first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        # bulk_create skips the post_save signal that normally creates the Author
+        authors = Author.objects.bulk_create([Author(user_id=user.pk) for user in users], batch_size=1000)
+        self.stdout.write(f'Created {len(authors)} authors')
+        return [author.pk for author in authors]
+
+    def _sentence(self, words):
+        text = ' '.join(self.rng.choice(WORDS) for _ in range(words))
+        return text[:1].upper() + text[1:] + '.'
+
+    def _body_pool(self, count, target_size):
+        """Render `count` pages around `target_size` bytes and compress each once."""
+        pool = []
+        for _ in range(count):
+            title = self._sentence(6)
+            size = int(self.rng.uniform(0.5, 1.5) * target_size)
+            sections, length = [], 0
+            while length < size:
+                words = {key: self.rng.choice(WORDS) for key in ('word', 'word2', 'word3')}
+                texts = {key: self._sentence(self.rng.randint(12, 40)) for key in ('text', 'text2', 'text3')}
+                section = self.rng.choice(SECTIONS).format(title=self._sentence(5), **words, **texts)
+                sections.append(section)
+                length += len(section)
+            html = PAGE.format(title=title, sections=''.join(sections))
+            # Stored bytes pass straight through CompressedTextField, so each body is compressed once
+            pool.append(compress(html))
+        return pool
+
+    def _post(self, number, prefix, author_id, category_id, bodies, graphics, options):
+        rng = self.rng
+        created_at = self.now - timedelta(seconds=rng.randint(0, options['days'] * 86400))
+        status = 'draft' if rng.random() < options['draft_ratio'] else 'published'
+        title = self._sentence(rng.randint(4, 9))[:-1]
+        return Post(
+            title=title,
+            slug=f'{prefix}-{number}',
+            content=rng.choice(bodies),
+            excerpt=self._sentence(rng.randint(20, 40)),
+            is_html=True,
+            graphical_content=rng.choice(graphics) if rng.random() < 0.3 else '',
+            author_id=author_id,
+            category_id=category_id,
+            status=status,
+            created_at=created_at,
+            updated_at=created_at + timedelta(seconds=rng.randint(0, 86400)),
+            published_at=created_at + timedelta(seconds=rng.randint(0, 3600)) if status == 'published' else None,
+            view_count=int(rng.paretovariate(1.2)) if status == 'published' else 0,
+        )
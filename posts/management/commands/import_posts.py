@@ -0,0 +1,138 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from posts.cache import bump_post_list_version, bump_taxonomy_version
+from posts.models import Author, Category, Post, Tag
+from posts.related import schedule_update
+from posts.search import index_rows
+from posts.signals import drop_post_details_on_commit
+from posts.transfer import POST_FIELDS, Progress, open_stream
+
+# Overwritten when a post with the same slug already exists
+UPSERT_FIELDS = [
+    'title', 'content', 'excerpt', 'is_html', 'graphical_content', 'cover_image',
+    'status', 'published_at', 'view_count', 'author', 'category',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports posts from an export_posts JSONL file in batches, creating or updating '
+        'them by slug. Missing categories and tags are created; unknown authors are left empty.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-', help='File to read (.gz supported; default: stdin)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        progress = Progress(self.stdout.write, 'Imported')
+        self.missing_authors = set()
+
+        with open_stream(options['input'], 'r', sys.stdin) as lines:
+            batch = []
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except json.JSONDecodeError as exc:
+                    raise CommandError(f'Line {number}: invalid JSON ({exc})')
+                if len(batch) >= batch_size:
+                    self._import_batch(batch)
+                    progress.add(len(batch))
+                    batch = []
+            self._import_batch(batch)
+            progress.add(len(batch))
+
+        bump_taxonomy_version()
+        bump_post_list_version()
+        if self.missing_authors:
+            self.stdout.write(self.style.WARNING(
+                f'{len(self.missing_authors)} unknown author(s), posts imported without one: '
+                + ', '.join(sorted(self.missing_authors))
+            ))
+        self.stdout.write(self.style.SUCCESS(progress.summary()))
+
+    def _import_batch(self, records):
+        if not records:
+            return
+        with transaction.atomic():
+            categories = self._categories(records)
+            tags = self._tags(records, categories)
+            authors = dict(
+                Author.objects.filter(user__username__in={r['author'] for r in records if r.get('author')})
+                .values_list('user__username', 'pk')
+            )
+
+            posts = []
+            for record in records:
+                author = record.get('author')
+                if author and author not in authors:
+                    self.missing_authors.add(author)
+                post = Post(**{field: record.get(field) for field in POST_FIELDS if field in record})
+                post.content = post.content or ''
+                post.graphical_content = post.graphical_content or ''
+                post.author_id = authors.get(author)
+                post.category_id = categories.get((record.get('category') or {}).get('slug'))
+                posts.append(post)
+            Post.objects.bulk_create(
+                posts, update_conflicts=True, unique_fields=['slug'], update_fields=UPSERT_FIELDS,
+            )
+
+            slugs = [record['slug'] for record in records]
+            ids = dict(Post.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+            # bulk_create stamps created_at/updated_at with now(); put the exported values back
+            for post, record in zip(posts, records):
+                post.pk = ids[record['slug']]
+                post.created_at = parse_datetime(record['created_at'])
+                post.updated_at = parse_datetime(record['updated_at'])
+            Post.objects.bulk_update(posts, ['created_at', 'updated_at'])
+
+            through = Post.tags.through
+            through.objects.filter(post_id__in=ids.values()).delete()
+            through.objects.bulk_create([
+                through(post_id=ids[record['slug']], tag_id=tags[tag['slug']])
+                for record in records for tag in record.get('tags', [])
+            ], ignore_conflicts=True)
+
+            # No post_save/m2m_changed signals fire for bulk writes
+            index_rows([(post.pk, post.title, post.excerpt, post.content) for post in posts])
+            schedule_update(ids.values())
+            drop_post_details_on_commit(slugs)
+
+    def _categories(self, records):
+        """Return {slug: id} for every category the records mention, creating missing ones."""
+        wanted = {}
+        for record in records:
+            if record.get('category'):
+                wanted[record['category']['slug']] = record['category']['name']
+            for tag in record.get('tags', []):
+                if tag.get('category'):
+                    wanted.setdefault(tag['category'], tag['category'])
+        return self._ensure(Category, wanted, lambda slug, name: Category(slug=slug, name=name))
+
+    def _tags(self, records, categories):
+        wanted = {}
+        for record in records:
+            for tag in record.get('tags', []):
+                wanted[tag['slug']] = tag
+        return self._ensure(
+            Tag, wanted,
+            lambda slug, tag: Tag(slug=slug, name=tag['name'], category_id=categories.get(tag.get('category'))),
+        )
+
+    def _ensure(self, model, wanted, build):
+        if not wanted:
+            return {}
+        existing = dict(model.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+        missing = [build(slug, value) for slug, value in wanted.items() if slug not in existing]
+        if missing:
+            model.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = dict(model.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+        return existing
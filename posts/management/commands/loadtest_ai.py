@@ -0,0 +1,257 @@
+import asyncio
+import json
+import secrets
+import time
+from collections import Counter
+
+import httpx
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from openai import AsyncOpenAI
+from rest_framework.authtoken.models import Token
+
+from posts import ai_agent
+from posts.management.commands.benchmark_api import SCENARIOS, percentile, peak_rss_mb
+from posts.models import Category, Post
+
+LOADTEST_USERNAME_PREFIX = 'ai-loadtest-'
+
+# name -> (path, JSON body); all go through the async AI views, bypassing the
+# completion cache so every call reaches the (simulated) AI API
+AI_SCENARIOS = {
+    'refine-text': ('/api/refine-text/', {'text_snippet': 'A sentence to rewrite.', 'command': 'simplify', 'cache': False}),
+    'generate-ai-content': ('/api/generate-ai-content/', {'requirement': 'A post about load testing', 'cache': False}),
+    'enhance-section': ('/api/enhance-section/', {'html_content': '<section><p>Hello</p></section>', 'cache': False}),
+}
+READ_SCENARIOS = sorted(name for name, (method, _, needs_token) in SCENARIOS.items() if method == 'GET' and not needs_token)
+
+# One reply that every AI view can parse
+FAKE_REPLY = 'TITLE: Load test\nEXCERPT: A simulated completion.\nCODE: <section><p>Simulated.</p></section>'
+
+# p95 differences below this are scheduling noise, not a regression
+NOISE_FLOOR_MS = 5
+
+
+class FakeLLM:
+    """httpx transport handler standing in for the AI API: waits, then returns FAKE_REPLY."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(200, json={
+            'id': f'loadtest-{self.calls}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': ai_agent.model_name,
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': FAKE_REPLY},
+            }],
+        })
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the async AI views through core.asgi in-process: measures read '
+        'endpoint latency on its own, then again while --ai-requests AI calls are '
+        'waiting on a simulated AI API (--llm-latency seconds each). Fails if reads '
+        'slow down by more than --tolerance or if the AI calls did not overlap.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ai-requests', type=int, default=200, help='AI calls kept in flight')
+        parser.add_argument('--ai-scenario', choices=sorted(AI_SCENARIOS), default='refine-text')
+        parser.add_argument('--llm-latency', type=float, default=5.0,
+                            help='Seconds the simulated AI API takes per completion')
+        parser.add_argument('--scenarios', nargs='+', choices=READ_SCENARIOS,
+                            default=['post-list', 'post-detail', 'categories'], help='Read endpoints to time')
+        parser.add_argument('--read-requests', type=int, default=200, help='Timed read requests per phase')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent read clients')
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help='Allowed relative p95 slowdown of reads under AI load')
+        parser.add_argument('--output', default='loadtest-ai-results.json')
+        parser.add_argument('--create-fixtures', action='store_true',
+                            help='Required: create a throwaway user and API token for the AI calls; '
+                                 'both are deleted when the run finishes')
+
+    def handle(self, *args, **options):
+        if not options['create_fixtures']:
+            raise CommandError('The AI views need a logged-in user; pass --create-fixtures to create a temporary one')
+        self.options = options
+        self.fixtures = self._fixtures()
+        fake = FakeLLM(options['llm_latency'])
+
+        saved = ai_agent.api_key, ai_agent.async_client
+        ai_agent.api_key = 'loadtest'
+        # One client is enough: everything below runs in a single event loop
+        loadtest_client = AsyncOpenAI(
+            api_key='loadtest', base_url=ai_agent.GROQ_BASE_URL, max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake), timeout=None),
+        )
+        ai_agent.async_client = lambda: loadtest_client
+        try:
+            # The simulated API has no rate limit, so neither does the client
+            with override_settings(AI_RATE_LIMIT_ENABLED=False):
+                report = asyncio.run(self._run(fake))
+        finally:
+            ai_agent.api_key, ai_agent.async_client = saved
+            self.fixtures['user'].delete()
+
+        with open(options['output'], 'w') as out:
+            json.dump(report, out, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        problems = self._check(report)
+        if problems:
+            raise CommandError('; '.join(problems))
+
+    # ── Setup ───────────────────────────────────────────────────────────────
+    def _fixtures(self):
+        slugs = list(
+            Post.objects.filter(status='published').order_by('-created_at').values_list('slug', flat=True)[:500]
+        )
+        if not slugs:
+            raise CommandError('No published posts; seed some first (e.g. manage.py generate_dataset)')
+        categories = list(Category.objects.values_list('slug', flat=True)) or ['none']
+        # Random name, unusable password; deleted (with its token) in handle()
+        user = User.objects.create_user(LOADTEST_USERNAME_PREFIX + secrets.token_hex(6))
+        token = Token.objects.create(user=user)
+        return {'slugs': slugs, 'categories': categories, 'user': user, 'token': token.key}
+
+    def _read_path(self, number):
+        names = self.options['scenarios']
+        _, template, _ = SCENARIOS[names[number % len(names)]]
+        return template.format(
+            slug=self.fixtures['slugs'][number % len(self.fixtures['slugs'])],
+            category=self.fixtures['categories'][number % len(self.fixtures['categories'])],
+        )
+
+    # ── Running ─────────────────────────────────────────────────────────────
+    async def _run(self, fake):
+        # Imported here so the ASGI application is built inside the running command
+        from core.asgi import application
+
+        options = self.options
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url='http://localhost', timeout=None) as http:
+            await self._reads(http, options['warmup'])
+            baseline = await self._reads(http, options['read_requests'])
+            self._print_row('reads (idle)', baseline)
+
+            started = time.perf_counter()
+            ai_calls = [asyncio.create_task(self._ai_call(http)) for _ in range(options['ai_requests'])]
+            # Wait (at most half the simulated latency) for the calls to reach the AI API
+            deadline = started + options['llm_latency'] / 2
+            while fake.in_flight < options['ai_requests'] and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            in_flight_at_start = fake.in_flight
+            loaded = await self._reads(http, options['read_requests'])
+            in_flight_at_end = fake.in_flight
+            self._print_row(f'reads ({in_flight_at_start} AI in flight)', loaded)
+
+            ai_results = await asyncio.gather(*ai_calls)
+            ai_elapsed = time.perf_counter() - started
+
+        statuses = Counter(str(status) for _, status in ai_results)
+        ai_latencies = sorted(seconds * 1000 for seconds, _ in ai_results)
+        ai = {
+            'scenario': options['ai_scenario'],
+            'requests': len(ai_results),
+            'status_codes': dict(statuses),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith('2')),
+            'p50_ms': round(percentile(ai_latencies, 50), 2) if ai_latencies else None,
+            'p95_ms': round(percentile(ai_latencies, 95), 2) if ai_latencies else None,
+            'wall_seconds': round(ai_elapsed, 2),
+            'peak_in_flight': fake.peak_in_flight,
+            'in_flight_at_read_start': in_flight_at_start,
+            'in_flight_at_read_end': in_flight_at_end,
+        }
+        self.stdout.write(
+            f"AI calls: {ai['requests']} in {ai['wall_seconds']}s (peak {ai['peak_in_flight']} in flight, "
+            f"p50 {ai['p50_ms'] or 0:.0f} ms, {ai['errors']} errors)"
+        )
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'llm_latency_seconds': options['llm_latency'],
+                'read_scenarios': options['scenarios'],
+                'concurrency': options['concurrency'],
+                'posts': len(self.fixtures['slugs']),
+                'peak_rss_mb': peak_rss_mb(),
+            },
+            'reads_idle': baseline,
+            'reads_under_ai_load': loaded,
+            'ai': ai,
+        }
+
+    async def _reads(self, http, total):
+        numbers = iter(range(total))
+        samples = []  # (seconds, status)
+
+        async def client():
+            for number in numbers:
+                started = time.perf_counter()
+                response = await http.get(self._read_path(number), headers={'Accept-Encoding': 'gzip'})
+                samples.append((time.perf_counter() - started, response.status_code))
+
+        await asyncio.gather(*[client() for _ in range(self.options['concurrency'])])
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        statuses = Counter(str(status) for _, status in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith(('2', '3'))),
+            'status_codes': dict(statuses),
+            'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        }
+
+    async def _ai_call(self, http):
+        path, body = AI_SCENARIOS[self.options['ai_scenario']]
+        started = time.perf_counter()
+        response = await http.post(path, json=body, headers={'Authorization': f'Token {self.fixtures["token"]}'})
+        return time.perf_counter() - started, response.status_code
+
+    # ── Reporting ───────────────────────────────────────────────────────────
+    def _print_row(self, label, result):
+        if not hasattr(self, '_header_printed'):
+            self._header_printed = True
+            self.stdout.write(f"{'phase':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        self.stdout.write(
+            f"{label:<28}{result['p50_ms'] or 0:>9.1f}{result['p95_ms'] or 0:>9.1f}"
+            f"{result['p99_ms'] or 0:>9.1f}{result['errors']:>8}"
+        )
+
+    def _check(self, report):
+        idle, loaded, ai = report['reads_idle'], report['reads_under_ai_load'], report['ai']
+        problems = []
+        if loaded['errors'] or idle['errors']:
+            problems.append(f"read errors: {idle['status_codes']} idle, {loaded['status_codes']} under load")
+        if ai['errors']:
+            problems.append(f"AI errors: {ai['status_codes']}")
+        if ai['in_flight_at_read_end'] < ai['requests']:
+            problems.append(
+                f"only {ai['in_flight_at_read_end']} of {ai['requests']} AI calls were still in flight when "
+                f"the reads finished; raise --llm-latency"
+            )
+        if idle['p95_ms'] is None or loaded['p95_ms'] is None:
+            return problems
+        allowed = max(idle['p95_ms'] * (1 + self.options['tolerance']), idle['p95_ms'] + NOISE_FLOOR_MS)
+        if loaded['p95_ms'] > allowed:
+            problems.append(f"read p95 {idle['p95_ms']} -> {loaded['p95_ms']} ms with AI calls in flight")
+        return problems
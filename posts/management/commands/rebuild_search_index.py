@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from posts.models import Post
+from posts.search import index_rows
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for every post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rows = (
+            Post.objects.order_by('pk')
+            .values_list('pk', 'title', 'excerpt', 'content')
+            .iterator(chunk_size=batch_size)
+        )
+        batch = []
+        total = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += index_rows(batch)
+                batch = []
+                self.stdout.write(f'Indexed {total} posts...')
+        total += index_rows(batch)
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {total} posts!'))
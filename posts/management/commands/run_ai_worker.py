@@ -0,0 +1,90 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from posts.ai_jobs import claim_job, prune_jobs, run_job
+
+DEFAULT_CONCURRENCY = 4
+# Seconds between prunes of old finished jobs
+PRUNE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued AI jobs (posts/ai_jobs.py) with a pool of worker threads. '
+        'Start as many processes as you like; they share the queue through the '
+        'database. SIGINT/SIGTERM stop claiming and wait for running jobs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            default=getattr(settings, 'AI_JOB_WORKERS', DEFAULT_CONCURRENCY),
+                            help='Jobs run at the same time (threads)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds an idle worker waits before checking the queue again')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is runnable instead of waiting for more')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.done = 0
+        self.last_prune = 0
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, self._request_stop)
+
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(target=self._work, args=(f'{prefix}:{n}', options), name=f'ai-worker-{n}')
+            for n in range(options['concurrency'])
+        ]
+        self.stdout.write(f'AI worker {prefix} started with {len(threads)} threads')
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS(f'AI worker stopped after {self.done} jobs'))
+
+    def _request_stop(self, signum, frame):
+        self.stdout.write('Stopping: finishing running jobs')
+        self.stop.set()
+
+    def _work(self, worker_id, options):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_job(worker_id)
+                if job is None:
+                    if options['burst']:
+                        return
+                    self._maybe_prune()
+                    self.stop.wait(options['poll_interval'])
+                    continue
+                started = time.perf_counter()
+                run_job(job)
+                job.refresh_from_db(fields=['status', 'error'])
+                with self.lock:
+                    self.done += 1
+                message = f'{job.kind} job {job.id}: {job.status} in {time.perf_counter() - started:.1f}s'
+                if job.status == 'failed':
+                    self.stderr.write(f'{message} ({job.error})')
+                else:
+                    self.stdout.write(message)
+        finally:
+            connection.close()
+
+    def _maybe_prune(self):
+        with self.lock:
+            if time.monotonic() - self.last_prune < PRUNE_INTERVAL and self.last_prune:
+                return
+            self.last_prune = time.monotonic()
+        pruned = prune_jobs()
+        if pruned:
+            self.stdout.write(f'Pruned {pruned} finished jobs')
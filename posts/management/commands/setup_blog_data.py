@@ -1,57 +1,34 @@
-from django.core.management.base import BaseCommand
-from posts.models import Category, Tag
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.taxonomy import DEFAULT_TAXONOMY_FILE, TaxonomyError, apply_sync, load_taxonomy, plan_sync
+
 
 class Command(BaseCommand):
-    help = 'Populates the database with initial Categories and Tags'
+    help = (
+        'Syncs Categories and Tags with declarative taxonomy files (default: settings.TAXONOMY_FILES). '
+        'Only rows that differ are written, so it is safe to run on every deploy.'
+    )
 
-    def handle(self, *args, **kwargs):
-        # Data Structure: { Category_Name: [List_of_Tags] }
-        blog_data = {
-            "Programming & Tech": [
-                "Python", "Django", "React", "Next.js", "Tailwind CSS", 
-                "API Development", "Database Management", "Frontend", "Backend", "JavaScript"
-            ],
-            "Artificial Intelligence": [
-                "Generative AI", "Gemini AI", "Machine Learning", "LLMs", "AI Agents", 
-                "Natural Language Processing", "Prompt Engineering", "Automation", "Future of Tech", "AI Tools"
-            ],
-            "Design & UI/UX": [
-                "Swiss Design", "Digital Minimalism", "Typography", "User Experience", "Responsive Design", 
-                "Modern UI", "Web Aesthetics", "Layout Design", "Tailwind Patterns", "Visual Hierarchy"
-            ],
-            "Software Engineering": [
-                "System Architecture", "Agile Methodology", "Code Review", "Open Source", "DevOps", 
-                "Testing", "Scalability", "Clean Code", "Version Control", "Security"
-            ],
-            "Digital Marketing & SEO": [
-                "Content Strategy", "SEO Tips", "Blogging Tips", "Growth Hacking", "Social Media", 
-                "Engagement", "Keywords", "Newsletter", "Monetization", "Analytics"
-            ]
-        }
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Taxonomy JSON files, merged in order')
+        parser.add_argument('--dry-run', action='store_true', help='Print the changes without writing them')
 
-        for cat_name, tags in blog_data.items():
-            # Create or get the Category
-            category, cat_created = Category.objects.get_or_create(name=cat_name)
-            if cat_created:
-                self.stdout.write(self.style.SUCCESS(f'Created Category: "{cat_name}"'))
-            else:
-                self.stdout.write(f'Category already exists: "{cat_name}"')
+    def handle(self, *args, **options):
+        try:
+            categories, tags = load_taxonomy(
+                options['files'] or getattr(settings, 'TAXONOMY_FILES', [DEFAULT_TAXONOMY_FILE])
+            )
+        except TaxonomyError as exc:
+            raise CommandError(str(exc))
 
-            for tag_name in tags:
-                # Create or get the Tag, and ensure it's linked to this category
-                tag, tag_created = Tag.objects.get_or_create(
-                    name=tag_name,
-                    defaults={'category': category}
-                )
-                if tag_created:
-                    self.stdout.write(self.style.SUCCESS(f'  - Created Tag: "{tag_name}"'))
-                else:
-                    # Update category if it was missing or different
-                    if tag.category != category:
-                        tag.category = category
-                        tag.save()
-                        self.stdout.write(f'  - Updated Tag: "{tag_name}" -> {cat_name}')
-                    else:
-                        self.stdout.write(f'  - Tag already exists: "{tag_name}"')
+        plan = plan_sync(categories, tags)
+        for line in plan.lines():
+            self.stdout.write(line)
 
-        self.stdout.write(self.style.SUCCESS('Successfully populated blog data!'))
\ No newline at end of file
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run, nothing written. {plan.summary()}'))
+        elif apply_sync(plan):
+            self.stdout.write(self.style.SUCCESS(f'Taxonomy synced. {plan.summary()}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Taxonomy already up to date. {plan.summary()}'))
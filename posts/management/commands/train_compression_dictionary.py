@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.compression import clear_dictionary_cache, compress, decompress, train_dictionary
+from posts.models import CompressionDictionary, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Trains a new zlib preset dictionary from recent posts for compressing '
+        'Post.content/graphical_content, and optionally recompresses existing posts with it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=500, help='Number of most recent posts to train on')
+        parser.add_argument('--recompress', action='store_true', help='Rewrite every post with the new dictionary')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rows = Post.objects.order_by('-pk').values_list('content', 'graphical_content')[:options['samples']]
+        samples = [decompress(value) for row in rows for value in row]
+        data = train_dictionary(samples)
+        if not data:
+            raise CommandError('Not enough repeated markup in the sampled posts to build a dictionary')
+
+        dictionary = CompressionDictionary.objects.create(data=data, sample_size=len(samples) // 2)
+        clear_dictionary_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained dictionary {dictionary.pk} ({len(data)} bytes) from {len(samples) // 2} posts'
+        ))
+
+        if options['recompress']:
+            self._recompress((dictionary.pk, data), options['batch_size'])
+
+    def _recompress(self, dictionary, batch_size):
+        total = 0
+        ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            # Raw stored bytes in and out: no signals, no updated_at bump
+            with transaction.atomic():
+                for pk, content, graphical in Post.objects.filter(pk__in=batch).values_list(
+                    'pk', 'content', 'graphical_content'
+                ):
+                    Post.objects.filter(pk=pk).update(
+                        content=compress(decompress(content), dictionary=dictionary),
+                        graphical_content=compress(decompress(graphical), dictionary=dictionary),
+                    )
+            total += len(batch)
+            self.stdout.write(f'Recompressed {total} posts...')
+        self.stdout.write(self.style.SUCCESS(f'Successfully recompressed {total} posts!'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.related import process_queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the related-posts lists of queued posts (published, edited or '
+        'deleted since the last run; posts/related.py). Run it from cron, or keep '
+        'it running with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Check the queue every this many seconds instead of draining it once')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            posts = lists = 0
+            while True:
+                batch_posts, batch_lists = process_queue()
+                if not batch_posts:
+                    break
+                posts += batch_posts
+                lists += batch_lists
+            if posts or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Related posts updated for {posts} posts ({lists} lists) in {time.perf_counter() - started:.2f}s'
+                ))
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.trending import update_trending
+from posts.view_counter import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the trending feed from time-bucketed views (posts/trending.py). '
+        'Run it from cron, or keep it running with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Repeat every this many seconds instead of running once')
+
+    def handle(self, *args, **options):
+        while True:
+            # Views buffered by this process (none unless it also served requests)
+            flush_view_counts()
+            started = time.perf_counter()
+            size = update_trending()
+            self.stdout.write(self.style.SUCCESS(
+                f'Trending feed updated: {size} posts in {time.perf_counter() - started:.2f}s'
+            ))
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,45 @@
+# posts/metrics.py
+# Minimal in-process metrics registry: counters and simple timing/size
+# distributions. Values are per worker process; MetricsView exposes them.
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_observations = {}
+
+
+def incr(name, amount=1):
+    """Increment a counter."""
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, value):
+    """Record one sample (latency, batch size, ratio...) for a distribution."""
+    with _lock:
+        stats = _observations.get(name)
+        if stats is None:
+            _observations[name] = {'count': 1, 'sum': value, 'min': value, 'max': value, 'last': value}
+            return
+        stats['count'] += 1
+        stats['sum'] += value
+        stats['min'] = min(stats['min'], value)
+        stats['max'] = max(stats['max'], value)
+        stats['last'] = value
+
+
+def snapshot():
+    """Return a JSON-serialisable copy of every counter and distribution."""
+    with _lock:
+        distributions = {}
+        for name, stats in _observations.items():
+            distributions[name] = dict(stats, avg=stats['sum'] / stats['count'])
+        return {'counters': dict(_counters), 'distributions': distributions}
+
+
+def reset():
+    """Clear all metrics (used by tests)."""
+    with _lock:
+        _counters.clear()
+        _observations.clear()
@@ -0,0 +1,229 @@
+# posts/middleware.py
+# Response compression (brotli or gzip, negotiated from Accept-Encoding).
+#
+# Post bodies and AI responses are whole HTML pages embedded in JSON, so they
+# compress very well. Small payloads are left alone (the headers would cost
+# more than they save), and the level drops as payloads grow so CPU time stays
+# bounded on the largest posts (RESPONSE_COMPRESSION_LEVELS).
+#
+# Streaming responses are compressed chunk by chunk and flushed after every
+# chunk, so server-sent events reach the client as they are produced.
+# brotli is optional: without the package only gzip is offered.
+#
+# BREACH: a compressed body that holds a secret next to attacker-chosen text
+# leaks the secret through its length, if the attacker can make the victim's
+# browser send the request with its credentials. Browsers attach cookies on
+# their own, not the Token header this API uses, so responses are sent
+# uncompressed when the request carries the session or CSRF cookie, when the
+# response sets a cookie, and under RESPONSE_COMPRESSION_EXCLUDED_PATHS (the
+# admin, and the auth endpoints whose bodies hold API tokens).
+#
+# The middleware is async-capable: a sync-only middleware would make Django run
+# every view under it in a thread under ASGI, async AI views included.
+import re
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIN_SIZE = 512
+DEFAULT_EXCLUDED_PATHS = ('/admin/', '/api/auth/')
+DEFAULT_LEVELS = {
+    # (minimum body size in bytes, level); the last matching row wins
+    'br': [(0, 5), (256 * 1024, 4), (2 * 1024 * 1024, 1)],
+    'gzip': [(0, 6), (256 * 1024, 4), (2 * 1024 * 1024, 1)],
+}
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+_accept_encoding_re = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Pick the best of `available` (in server preference order) for an Accept-Encoding header."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = _accept_encoding_re.fullmatch(part)
+        if not match:
+            continue
+        try:
+            weights[match.group(1).lower()] = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compression_level(encoding, size):
+    """Level for a body of `size` bytes; None (size unknown, i.e. streaming) uses the lightest level."""
+    levels = getattr(settings, 'RESPONSE_COMPRESSION_LEVELS', DEFAULT_LEVELS)[encoding]
+    if size is None:
+        return levels[-1][1]
+    level = levels[0][1]
+    for min_size, row_level in levels:
+        if size >= min_size:
+            level = row_level
+    return level
+
+
+class _Compressor:
+    """One streaming compressor: feed chunks, flush after each, finish once."""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._stream = brotli.Compressor(quality=level)
+        else:
+            # wbits 16+ writes a gzip header and trailer
+            self._stream = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data, flush=False):
+        if self.encoding == 'br':
+            out = self._stream.process(data)
+            return out + self._stream.flush() if flush else out
+        out = self._stream.compress(data)
+        return out + self._stream.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._stream.finish()
+        return self._stream.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip when the client accepts it.
+    Replaces django.middleware.gzip.GZipMiddleware; place it near the top of
+    MIDDLEWARE so it sees the final response body.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not self._should_compress(response):
+            return response
+        if self._may_hold_secrets(request, response):
+            metrics.incr('compression.skipped_sensitive')
+            return response
+
+        # The response varies on Accept-Encoding whether or not we compress this one
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(response.streaming_content, encoding)
+            else:
+                response.streaming_content = self._compress_stream(response.streaming_content, encoding)
+            del response.headers['Content-Length']
+        else:
+            body = response.content
+            if len(body) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE):
+                return response
+            started = time.process_time()
+            compressor = _Compressor(encoding, compression_level(encoding, len(body)))
+            compressed = compressor.compress(body) + compressor.finish()
+            self._record(encoding, len(body), len(compressed), time.process_time() - started)
+            if len(compressed) >= len(body):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A strong ETag no longer matches the bytes on the wire
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _should_compress(self, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _may_hold_secrets(self, request, response):
+        if response.cookies:
+            return True
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or settings.CSRF_COOKIE_NAME in request.COOKIES:
+            return True
+        excluded = getattr(settings, 'RESPONSE_COMPRESSION_EXCLUDED_PATHS', DEFAULT_EXCLUDED_PATHS)
+        return request.path.startswith(tuple(excluded))
+
+    def _compress_stream(self, chunks, encoding):
+        compressor = _Compressor(encoding, compression_level(encoding, None))
+        raw = compressed = 0
+        cpu = 0.0
+        for chunk in chunks:
+            started = time.process_time()
+            out = compressor.compress(chunk, flush=True)
+            cpu += time.process_time() - started
+            raw += len(chunk)
+            compressed += len(out)
+            if out:
+                yield out
+        out = compressor.finish()
+        compressed += len(out)
+        self._record(encoding, raw, compressed, cpu)
+        yield out
+
+    async def _compress_async(self, chunks, encoding):
+        compressor = _Compressor(encoding, compression_level(encoding, None))
+        raw = compressed = 0
+        cpu = 0.0
+        async for chunk in chunks:
+            started = time.process_time()
+            out = compressor.compress(chunk, flush=True)
+            cpu += time.process_time() - started
+            raw += len(chunk)
+            compressed += len(out)
+            if out:
+                yield out
+        out = compressor.finish()
+        compressed += len(out)
+        self._record(encoding, raw, compressed, cpu)
+        yield out
+
+    def _record(self, encoding, raw_size, compressed_size, cpu_seconds):
+        metrics.incr(f'compression.{encoding}.responses')
+        metrics.incr(f'compression.{encoding}.bytes_in', raw_size)
+        metrics.incr(f'compression.{encoding}.bytes_out', compressed_size)
+        metrics.observe(f'compression.{encoding}.cpu_seconds', cpu_seconds)
+        if compressed_size:
+            metrics.observe(f'compression.{encoding}.ratio', raw_size / compressed_size)
@@ -0,0 +1,120 @@
+# Generated by Django 6.0 on 2026-10-18 10:00
+
+from html.parser import HTMLParser
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 500
+FTS_TABLE = 'posts_post_fts'
+
+# Frozen copies of what posts/search.py did when this migration was written,
+# so later changes to the app code can't change what it does.
+
+
+class _TextExtractor(HTMLParser):
+    SKIP = {'script', 'style', 'head', 'noscript', 'svg'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _html_to_text(value):
+    if not value:
+        return ''
+    parser = _TextExtractor()
+    parser.feed(value)
+    parser.close()
+    return ' '.join(' '.join(parser.parts).split())
+
+
+def _index_rows(connection, rows):
+    # Content is still plain text here; compression arrives in 0010
+    documents = [(pk, title or '', excerpt or '', _html_to_text(content)) for pk, title, excerpt, content in rows]
+    if not documents:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Must match the configuration search queries use
+            config = getattr(settings, 'SEARCH_CONFIG', 'english')
+            cursor.executemany(
+                "UPDATE posts_post SET search_vector = "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C') "
+                "WHERE id = %s",
+                [(config, title, config, excerpt, config, body, pk) for pk, title, excerpt, body in documents],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)",
+                documents,
+            )
+
+
+def create_fts_table(apps, schema_editor):
+    # SQLite has no tsvector; search uses an FTS5 table there (the tests)
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(title, excerpt, body, tokenize='porter unicode61')"
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def index_existing_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    rows = (
+        Post.objects.using(schema_editor.connection.alias)
+        .order_by('pk')
+        .values_list('pk', 'title', 'excerpt', 'content')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            _index_rows(schema_editor.connection, batch)
+            batch = []
+    _index_rows(schema_editor.connection, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_author_category_tag_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='posts_post_search_vector_gin'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
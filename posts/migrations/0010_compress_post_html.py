@@ -0,0 +1,203 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+import re
+import struct
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+import posts.fields
+
+BATCH_SIZE = 200
+TRAINING_SAMPLE = 500
+COLUMNS = ('content', 'graphical_content')
+
+# Frozen copy of the stored format and dictionary training in
+# posts/compression.py as of this migration, so later changes to the app
+# code can't change what it writes or reads.
+MAGIC = b'\xff'
+ZLIB = b'z'
+ZLIB_DICT = b'd'
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+_TAG_RE = re.compile(r'<[^<>]{1,400}>')
+_CLASS_RE = re.compile(r"""class=(['"])([^'"]{4,300})\1""")
+
+
+def _compress(text, dictionary):
+    # `dictionary` is an (id, bytes) pair or None
+    if text is None:
+        return None
+    if not text:
+        return b''
+    data = text.encode('utf-8')
+    level = getattr(settings, 'POST_COMPRESSION_LEVEL', 6)
+    if dictionary:
+        dict_id, zdict = dictionary
+        compressor = zlib.compressobj(level, zdict=zdict)
+        return MAGIC + ZLIB_DICT + struct.pack('>I', dict_id) + compressor.compress(data) + compressor.flush()
+    return MAGIC + ZLIB + zlib.compress(data, level)
+
+
+def _decompress(value, dictionaries):
+    # `dictionaries` maps dictionary id -> bytes
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode('utf-8')
+    method = value[1:2]
+    if method == ZLIB:
+        return zlib.decompress(value[2:]).decode('utf-8')
+    if method == ZLIB_DICT:
+        (dict_id,) = struct.unpack('>I', value[2:6])
+        decompressor = zlib.decompressobj(zdict=dictionaries[dict_id])
+        return (decompressor.decompress(value[6:]) + decompressor.flush()).decode('utf-8')
+    raise ValueError(f"Unknown compression method {method!r}")
+
+
+def _train_dictionary(samples, size=MAX_DICTIONARY_SIZE):
+    counts = Counter()
+    for sample in samples:
+        if not sample:
+            continue
+        counts.update(_TAG_RE.findall(sample))
+        counts.update(match.group(2) for match in _CLASS_RE.finditer(sample))
+    candidates = [(count * len(piece), piece) for piece, count in counts.items() if count > 1]
+    candidates.sort(reverse=True)
+    chosen = []
+    used = 0
+    for _, piece in candidates:
+        encoded = piece.encode('utf-8')
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    chosen.reverse()
+    return b''.join(chosen)
+
+
+def _alter_column_types(schema_editor, to_binary):
+    # SQLite columns are untyped enough to hold either form; only PostgreSQL
+    # needs the column converted (USING keeps the bytes exactly UTF-8).
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in COLUMNS:
+        if to_binary:
+            schema_editor.execute(
+                f'ALTER TABLE posts_post ALTER COLUMN "{column}" TYPE bytea '
+                f'USING convert_to("{column}", \'UTF8\')'
+            )
+        else:
+            schema_editor.execute(
+                f'ALTER TABLE posts_post ALTER COLUMN "{column}" TYPE text '
+                f'USING convert_from("{column}", \'UTF8\')'
+            )
+
+
+def _rewrite_rows(schema_editor, transform):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT id FROM posts_post ORDER BY id')
+        ids = [row[0] for row in cursor.fetchall()]
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, content, graphical_content FROM posts_post WHERE id IN ({placeholders})',
+                batch,
+            )
+            rows = cursor.fetchall()
+            cursor.executemany(
+                'UPDATE posts_post SET content = %s, graphical_content = %s WHERE id = %s',
+                [(transform(content), transform(graphical), pk) for pk, content, graphical in rows],
+            )
+
+
+def compress_existing_posts(apps, schema_editor):
+    _alter_column_types(schema_editor, to_binary=True)
+
+    # Train the first dictionary on the posts we already have
+    CompressionDictionary = apps.get_model('posts', 'CompressionDictionary')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT content, graphical_content FROM posts_post ORDER BY id DESC LIMIT %s',
+            [TRAINING_SAMPLE],
+        )
+        samples = [_decompress(value, {}) for row in cursor.fetchall() for value in row]
+    dictionary = None
+    zdict = _train_dictionary(samples)
+    if zdict:
+        row = CompressionDictionary.objects.using(schema_editor.connection.alias).create(
+            data=zdict, sample_size=len(samples) // 2,
+        )
+        dictionary = (row.pk, zdict)
+
+    connection = schema_editor.connection
+
+    def transform(value):
+        stored = _compress(_decompress(value, {}), dictionary)
+        return connection.Database.Binary(stored) if stored is not None else None
+
+    _rewrite_rows(schema_editor, transform)
+
+
+def decompress_existing_posts(apps, schema_editor):
+    CompressionDictionary = apps.get_model('posts', 'CompressionDictionary')
+    dictionaries = {
+        pk: bytes(data)
+        for pk, data in CompressionDictionary.objects.using(schema_editor.connection.alias).values_list('pk', 'data')
+    }
+    connection = schema_editor.connection
+
+    def transform(value):
+        text = _decompress(value, dictionaries)
+        if text is None:
+            return None
+        # PostgreSQL columns are still bytea here; SQLite takes text directly
+        return connection.Database.Binary(text.encode('utf-8')) if connection.vendor == 'postgresql' else text
+
+    _rewrite_rows(schema_editor, transform)
+    _alter_column_types(schema_editor, to_binary=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('sample_size', models.PositiveIntegerField(default=0, help_text='Number of posts it was trained on')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Compression dictionaries',
+            },
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='content',
+                    field=posts.fields.CompressedTextField(),
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='graphical_content',
+                    field=posts.fields.CompressedTextField(blank=True, default='', help_text='HTML code for the graphical/infographic explanation (if any)'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(compress_existing_posts, decompress_existing_posts),
+            ],
+        ),
+    ]
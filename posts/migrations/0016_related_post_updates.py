@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 19:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_ai_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPostUpdate',
+            fields=[
+                ('post_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
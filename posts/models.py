@@ -1,4 +1,9 @@
+import uuid
+
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from .fields import CompressedTextField
 from django.utils.text import slugify
 from django.conf import settings
 from django.utils import timezone
@@ -16,6 +21,7 @@ class Author(models.Model):
     profile_picture = models.ImageField(upload_to='authors/', blank=True, null=True)
     website = models.URLField(blank=True)
     twitter_handle = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.get_full_name() or self.user.username
@@ -23,6 +29,7 @@ class Author(models.Model):
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -46,6 +53,7 @@ class Tag(models.Model):
         related_name='tags',
         help_text="Category this tag belongs to"
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -55,6 +63,22 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+class PostQuerySet(models.QuerySet):
+    # Full AI-generated HTML documents (tens of KB per row) and their search vector
+    LARGE_FIELDS = ('content', 'graphical_content', 'search_vector')
+
+    def summary(self):
+        """Skip loading the large HTML columns (for list/summary representations)."""
+        return self.defer(*self.LARGE_FIELDS)
+
+    def with_relations(self):
+        """Eager-load everything PostSerializer touches (author.user, category, tags)."""
+        # Tags in id order so every representation (incl. posts/fast_serializers.py) agrees
+        return self.select_related('author__user', 'category').prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.order_by('id'))
+        )
+
+
 class Post(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
@@ -82,8 +106,8 @@ class Post(models.Model):
     )
     tags = models.ManyToManyField(Tag, blank=True, related_name='posts')
 
-    # Content
-    content = models.TextField() 
+    # Content (stored zlib-compressed; see posts/compression.py)
+    content = CompressedTextField()
     excerpt = models.CharField(
         max_length=2000, 
         help_text="Short summary for SEO description"
@@ -92,7 +116,7 @@ class Post(models.Model):
         default=False, 
         help_text="Check if the content is in HTML format"
     )
-    graphical_content = models.TextField(
+    graphical_content = CompressedTextField(
         blank=True,
         default='',
         help_text="HTML code for the graphical/infographic explanation (if any)"
@@ -118,8 +142,33 @@ class Post(models.Model):
     # Metrics
     view_count = models.PositiveIntegerField(default=0)
 
+    # Full-text search (PostgreSQL tsvector, GIN-indexed; maintained by posts/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-published_at', '-created_at']
+        indexes = [
+            # PostListView / keyset pagination: published posts by (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='published'),
+                name='post_published_created_idx',
+            ),
+            # PostListView ?category=: one category's published posts by (created_at, id)
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                condition=models.Q(status='published'),
+                name='post_published_category_idx',
+            ),
+            # MyPostsView and PostListView ?author=: one author's posts by (created_at, id)
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+            # Meta.ordering and PostListView ?published_after=/?published_before=
+            models.Index(fields=['-published_at', '-created_at'], name='post_published_at_idx'),
+            # PostSearchView on PostgreSQL (a plain index elsewhere, where search uses FTS5)
+            GinIndex(fields=['search_vector'], name='posts_post_search_vector_gin'),
+        ]
 
     def save(self, *args, **kwargs):
         # Automatically generate slug from title if it doesn't exist
@@ -133,4 +182,160 @@ class Post(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class CompressionDictionary(models.Model):
+    """
+    A zlib preset dictionary trained on our posts (train_compression_dictionary).
+    Compressed rows reference one by id, so rows are never deleted.
+    """
+    data = models.BinaryField()
+    sample_size = models.PositiveIntegerField(default=0, help_text="Number of posts it was trained on")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Compression dictionaries"
+
+    def __str__(self):
+        return f"Dictionary #{self.pk} ({len(self.data)} bytes)"
+
+
+class RelatedPostsVocabulary(models.Model):
+    """
+    The TF-IDF vocabulary fitted by `manage.py build_related_posts`
+    (posts/related.py). Incremental updates vectorize edited posts with the
+    latest one; terms it has never seen are ignored until the next rebuild.
+    """
+    terms = models.TextField(help_text="Newline-separated terms; a term's line number is its column")
+    idf = models.BinaryField(help_text="float32 inverse document frequency per term")
+    document_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Related posts vocabularies"
+
+    def __str__(self):
+        return f"Vocabulary #{self.pk} ({self.document_count} posts)"
+
+
+class PostTermVector(models.Model):
+    """A published post's L2-normalized TF-IDF vector, truncated to its strongest terms."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='term_vector')
+    terms = models.BinaryField(help_text="int32 term columns followed by float32 weights")
+
+
+class RelatedPost(models.Model):
+    """Precomputed nearest neighbours of a post, best first (rank 0)."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_from')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='related_post_rank_unique'),
+        ]
+
+
+class RelatedPostUpdate(models.Model):
+    """
+    A post whose related-posts lists wait to be recomputed by `manage.py
+    update_related_posts` (posts/related.py). A plain id, not a foreign key:
+    the neighbours of a deleted post still need new lists.
+    """
+    post_id = models.BigIntegerField(primary_key=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+
+
+class PostViewBucket(models.Model):
+    """Views of a post within one TRENDING_BUCKET_SECONDS window (posts/trending.py)."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='view_buckets')
+    bucket_start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'bucket_start'], name='post_view_bucket_unique'),
+        ]
+        indexes = [
+            # Scoring reads (and pruning deletes) whole time ranges
+            models.Index(fields=['bucket_start'], name='post_view_bucket_start_idx'),
+        ]
+
+
+class TrendingPost(models.Model):
+    """The materialized trending feed: one row per position, rebuilt by `manage.py update_trending`."""
+    rank = models.PositiveIntegerField(primary_key=True)
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='trending')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+
+
+class AICompletion(models.Model):
+    """
+    A cached AI completion (posts/ai_cache.py), keyed by a SHA-256 of the
+    model, temperature and messages that produced it.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100)
+    content = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # LRU eviction walks entries by last use
+            models.Index(fields=['last_used_at'], name='ai_completion_last_used_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} completion {self.key[:12]} ({self.hits} hits)"
+
+
+class AIJob(models.Model):
+    """
+    An AI request run in the background by `manage.py run_ai_worker`
+    (posts/ai_jobs.py); clients submit it and poll for the result.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ai_jobs')
+    kind = models.CharField(max_length=30)
+    params = models.JSONField(default=dict)
+    request_key = models.CharField(max_length=100, null=True, blank=True,
+                                   help_text="Client-chosen idempotency key; unique per user")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'request_key'], name='ai_job_request_key_unique'),
+        ]
+        indexes = [
+            # Workers claim the oldest runnable job of a status
+            models.Index(fields=['status', 'run_after'], name='ai_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
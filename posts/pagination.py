@@ -0,0 +1,182 @@
+# posts/pagination.py
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Return an approximate row count for a queryset without running COUNT(*).
+
+    On PostgreSQL this reads the planner's row estimate from EXPLAIN, which
+    costs the same regardless of table size. Other backends have no cheap
+    estimate, so they fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def page_number_links(request, page, has_next):
+    """
+    (next, previous) URLs for views paginated with ?page=<n>. Page 1 is the
+    URL without ?page, so it matches the link a client started from.
+    """
+    url = request.build_absolute_uri()
+    next_link = replace_query_param(url, 'page', page + 1) if has_next else None
+    if page <= 1:
+        previous_link = None
+    elif page == 2:
+        previous_link = remove_query_param(url, 'page')
+    else:
+        previous_link = replace_query_param(url, 'page', page - 1)
+    return next_link, previous_link
+
+
+class PostCursorPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is a single indexed range scan: the cursor carries the
+    (created_at, id) of the row at the page boundary, so page N costs the
+    same as page 1 no matter how deep the client goes. Cursors are opaque
+    base64 tokens and stay valid while rows are inserted or deleted.
+    """
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    total_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.include_total = request.query_params.get(self.total_query_param) in ('1', 'true', 'yes')
+        self.total = estimate_count(queryset) if self.include_total else None
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        queryset = self.get_page_queryset(queryset, cursor, self.page_size)
+
+        rows = list(queryset)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_queryset(self, queryset, cursor, page_size):
+        """
+        Apply the keyset boundary and ordering for `cursor` (None for the first
+        page). Fetches one extra row to find out whether another page exists.
+        """
+        reverse = bool(cursor and cursor['reverse'])
+        if cursor:
+            created_at, pk = cursor['created_at'], cursor['id']
+            # Equivalent to (created_at, id) < (ts, pk); the leading range on
+            # created_at lets the planner use it as an index bound.
+            if reverse:
+                boundary = Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+            else:
+                boundary = Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+            queryset = queryset.filter(boundary)
+
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+        return queryset[:page_size + 1]
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'POSTS_PAGE_SIZE', 20)
+        max_page_size = getattr(settings, 'POSTS_MAX_PAGE_SIZE', 100)
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, TypeError, ValueError):
+            return default
+        if size <= 0:
+            return default
+        return min(size, max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8')
+            data = json.loads(raw)
+            return {
+                'created_at': datetime.fromisoformat(data['t']),
+                'id': int(data['i']),
+                'reverse': bool(data.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse=False):
+        # Pages hold model instances or .values() rows (posts/fast_serializers.py)
+        if isinstance(obj, dict):
+            created_at, pk = obj['created_at'], obj['id']
+        else:
+            created_at, pk = obj.created_at, obj.pk
+        data = {'t': created_at.isoformat(), 'i': pk}
+        if reverse:
+            data['r'] = 1
+        raw = json.dumps(data, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.include_total:
+            payload['approximate_count'] = self.total
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'approximate_count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,351 @@
+# posts/related.py
+# "Related reading": precomputed nearest neighbours by TF-IDF cosine similarity.
+#
+# `manage.py build_related_posts` fits a vocabulary over every published
+# post (title, excerpt and the visible text of the HTML body), stores each
+# post's L2-normalized vector truncated to its RELATED_POSTS_TERMS_PER_POST
+# strongest terms, and writes the top RELATED_POSTS_COUNT neighbours of
+# every post to RelatedPost. Similarities are sparse matrix products done
+# a block of rows at a time, so memory stays bounded on large corpora.
+#
+# Publishing, unpublishing or deleting a post, or editing the text of a
+# published one (posts/signals.py), queues it as a RelatedPostUpdate row in
+# the same transaction; other saves queue nothing. `manage.py
+# update_related_posts` drains the queue with update_related_posts(), which
+# re-vectorizes just those posts with the stored vocabulary, scores them
+# against every stored vector in one product, and rewrites only the lists that
+# change: their own, the ones they used to appear in, and the ones they now
+# beat the last entry of. That is O(corpus) work, so it never runs in a
+# request; requests only read RelatedPost rows.
+import html
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .compression import decompress
+from .models import Post, PostTermVector, RelatedPost, RelatedPostsVocabulary, RelatedPostUpdate
+
+# Tokenizing only needs the words, so tags are stripped with regexes rather
+# than search.html_to_text's HTMLParser (several times slower on large pages)
+_HIDDEN_RE = re.compile(r'<(script|style|head|noscript|svg)\b.*?</\1\s*>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]*>')
+_TOKEN_RE = re.compile(r'[a-z][a-z0-9+#]+')
+STOP_WORDS = frozenset("""
+    about above after again against all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here hers him his
+    how into its itself just more most much must not now off once only other our ours out over own same she
+    should some such than that the their theirs them then there these they this those through too under until
+    very was were what when where which while who whom why will with would you your yours
+""".split())
+
+DEFAULT_COUNT = 5
+DEFAULT_TERMS_PER_POST = 64
+DEFAULT_MAX_FEATURES = 50000
+DEFAULT_MIN_SCORE = 0.05
+BLOCK_SIZE = 256
+# Queued posts updated per update_related_posts() call
+QUEUE_BATCH = 500
+# What a post's vector depends on, and whether it is listed at all
+TRACKED_FIELDS = ('status', 'title', 'excerpt', 'content')
+
+_vocabularies = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def document_terms(title, excerpt, content):
+    """Term counts of a post; the title is counted twice so it outweighs body text."""
+    body = html.unescape(_TAG_RE.sub(' ', _HIDDEN_RE.sub(' ', decompress(content) or '')))
+    text = f"{title} {title} {excerpt} {body}".lower()
+    counts = Counter(_TOKEN_RE.findall(text))
+    for word in STOP_WORDS.intersection(counts):
+        del counts[word]
+    return counts
+
+
+def _published_terms(post_ids=None):
+    queryset = Post.objects.filter(status='published').order_by('pk')
+    if post_ids is not None:
+        queryset = queryset.filter(pk__in=post_ids)
+    for pk, title, excerpt, content in queryset.values_list('pk', 'title', 'excerpt', 'content').iterator(chunk_size=500):
+        yield pk, document_terms(title, excerpt, content)
+
+
+def _weigh(columns, tf, idf, terms_per_post):
+    """Sublinear-tf x idf weights for one document's known terms, truncated and L2-normalized."""
+    if not len(columns):
+        return columns.astype(np.int32), np.zeros(0, dtype=np.float32)
+    weights = (1 + np.log(tf)) * idf[columns]
+    if len(columns) > terms_per_post:
+        keep = np.argpartition(weights, -terms_per_post)[-terms_per_post:]
+        columns, weights = columns[keep], weights[keep]
+    order = np.argsort(columns)
+    columns, weights = columns[order], weights[order]
+    return columns.astype(np.int32), (weights / np.linalg.norm(weights)).astype(np.float32)
+
+
+def vectorize(counts, vocabulary, idf, terms_per_post):
+    """Vector of one document's term counts against a fitted vocabulary; unknown terms are dropped."""
+    counts = {term: count for term, count in counts.items() if term in vocabulary}
+    columns = np.fromiter((vocabulary[term] for term in counts), dtype=np.int64, count=len(counts))
+    tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return _weigh(columns, tf, idf, terms_per_post)
+
+
+def _matrix(vectors, width):
+    """Stack (columns, weights) pairs into a CSR matrix of shape (len(vectors), width)."""
+    indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(columns) for columns, _ in vectors])
+    indices = np.concatenate([columns for columns, _ in vectors]) if vectors else np.zeros(0, dtype=np.int32)
+    data = np.concatenate([weights for _, weights in vectors]) if vectors else np.zeros(0, dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(vectors), width))
+
+
+def pack_vector(columns, weights):
+    return columns.astype('<i4').tobytes() + weights.astype('<f4').tobytes()
+
+
+def unpack_vector(value):
+    value = bytes(value)
+    half = len(value) // 2
+    return np.frombuffer(value[:half], dtype='<i4'), np.frombuffer(value[half:], dtype='<f4')
+
+
+def _count_terms():
+    """
+    One pass over the published posts: their ids, per-post (term ids, counts)
+    arrays, and the term -> id index those refer to. Posts are tokenized once
+    and only their distinct-term counts are kept in memory.
+    """
+    index, post_ids, documents = {}, [], []
+    for pk, counts in _published_terms():
+        term_ids = np.fromiter((index.setdefault(term, len(index)) for term in counts), dtype=np.int64, count=len(counts))
+        post_ids.append(pk)
+        documents.append((term_ids, np.fromiter(counts.values(), dtype=np.float32, count=len(counts))))
+    return post_ids, documents, index
+
+
+def fit_vocabulary(documents, index, max_features):
+    """
+    Pick the vocabulary: terms found in at least two posts, the `max_features`
+    most widespread of them. Returns (terms in column order, idf, an array
+    mapping term ids to columns with -1 for dropped terms).
+    """
+    n = len(documents)
+    document_frequency = np.bincount(
+        np.concatenate([term_ids for term_ids, _ in documents]) if documents else np.zeros(0, dtype=np.int64),
+        minlength=len(index),
+    )
+    candidates = np.flatnonzero(document_frequency >= (2 if n > 2 else 1))
+    if len(candidates) > max_features:
+        candidates = candidates[np.argsort(-document_frequency[candidates], kind='stable')[:max_features]]
+    names = list(index)
+    kept = sorted(candidates.tolist(), key=names.__getitem__)
+    remap = np.full(len(index), -1, dtype=np.int64)
+    remap[kept] = np.arange(len(kept))
+    idf = (np.log((1 + n) / (1 + document_frequency[kept])) + 1).astype(np.float32)
+    return [names[term_id] for term_id in kept], idf, remap
+
+
+def current_vocabulary():
+    """The latest stored vocabulary as ({term: column}, idf), or None before the first build."""
+    # Keyed on created_at too: SQLite may hand a rebuilt vocabulary the old id
+    key = RelatedPostsVocabulary.objects.order_by('-pk').values_list('pk', 'created_at').first()
+    if key is None:
+        return None
+    if key not in _vocabularies:
+        row = RelatedPostsVocabulary.objects.get(pk=key[0])
+        terms = row.terms.split('\n') if row.terms else []
+        _vocabularies.clear()
+        _vocabularies[key] = (
+            {term: column for column, term in enumerate(terms)},
+            np.frombuffer(bytes(row.idf), dtype='<f4'),
+        )
+    return _vocabularies[key]
+
+
+def _neighbours(rows, positions, matrix, count, min_score):
+    """
+    Yield (position, [(neighbour position, score), ...]) for every row of `rows`
+    (whose own positions in `matrix` are `positions`), best first.
+    """
+    transposed = matrix.T.tocsr()
+    for start in range(0, rows.shape[0], BLOCK_SIZE):
+        scores = (rows[start:start + BLOCK_SIZE] @ transposed).toarray()
+        for offset, row_scores in enumerate(scores):
+            position = positions[start + offset]
+            row_scores[position] = 0
+            if len(row_scores) > count:
+                top = np.argpartition(row_scores, -count)[-count:]
+            else:
+                top = np.arange(len(row_scores))
+            top = top[np.argsort(-row_scores[top], kind='stable')]
+            yield position, [(int(j), float(row_scores[j])) for j in top if row_scores[j] >= min_score]
+
+
+def _links(post_ids, matrix, positions, count, min_score):
+    rows = matrix[positions] if len(positions) else matrix[:0]
+    return [
+        RelatedPost(post_id=int(post_ids[position]), related_id=int(post_ids[neighbour]), score=score, rank=rank)
+        for position, neighbours in _neighbours(rows, positions, matrix, count, min_score)
+        for rank, (neighbour, score) in enumerate(neighbours)
+    ]
+
+
+def rebuild_related_posts():
+    """Fit a new vocabulary over all published posts and recompute every list."""
+    count = _setting('RELATED_POSTS_COUNT', DEFAULT_COUNT)
+    terms_per_post = _setting('RELATED_POSTS_TERMS_PER_POST', DEFAULT_TERMS_PER_POST)
+    min_score = _setting('RELATED_POSTS_MIN_SCORE', DEFAULT_MIN_SCORE)
+
+    started = timezone.now()
+    post_ids, documents, index = _count_terms()
+    terms, idf, remap = fit_vocabulary(documents, index, _setting('RELATED_POSTS_MAX_FEATURES', DEFAULT_MAX_FEATURES))
+    vectors = []
+    for term_ids, tf in documents:
+        columns = remap[term_ids]
+        known = columns >= 0
+        vectors.append(_weigh(columns[known], tf[known], idf, terms_per_post))
+    del documents, index
+    matrix = _matrix(vectors, len(terms))
+    links = _links(post_ids, matrix, np.arange(len(post_ids)), count, min_score)
+
+    with transaction.atomic():
+        RelatedPostsVocabulary.objects.all().delete()
+        RelatedPostsVocabulary.objects.create(terms='\n'.join(terms), idf=idf.astype('<f4').tobytes(),
+                                              document_count=len(post_ids))
+        PostTermVector.objects.all().delete()
+        PostTermVector.objects.bulk_create(
+            [PostTermVector(post_id=pk, terms=pack_vector(*vector)) for pk, vector in zip(post_ids, vectors)],
+            batch_size=2000,
+        )
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(links, batch_size=2000)
+        # Everything queued before the build started is covered by it
+        RelatedPostUpdate.objects.filter(queued_at__lt=started).delete()
+    return {'posts': len(post_ids), 'terms': len(terms), 'links': len(links)}
+
+
+def _stored_matrix(width):
+    post_ids, vectors = [], []
+    for pk, value in PostTermVector.objects.order_by('pk').values_list('post_id', 'terms').iterator(chunk_size=2000):
+        post_ids.append(pk)
+        vectors.append(unpack_vector(value))
+    return np.array(post_ids, dtype=np.int64), _matrix(vectors, width)
+
+
+def update_related_posts(post_ids):
+    """
+    Bring the lists up to date after the posts in `post_ids` were saved,
+    unpublished or deleted. Does nothing before the first full build.
+    Returns the number of lists rewritten.
+    """
+    vocabulary = current_vocabulary()
+    if vocabulary is None or not post_ids:
+        return 0
+    vocabulary, idf = vocabulary
+    count = _setting('RELATED_POSTS_COUNT', DEFAULT_COUNT)
+    min_score = _setting('RELATED_POSTS_MIN_SCORE', DEFAULT_MIN_SCORE)
+    terms_per_post = _setting('RELATED_POSTS_TERMS_PER_POST', DEFAULT_TERMS_PER_POST)
+
+    post_ids = set(post_ids)
+    with transaction.atomic():
+        # One updater at a time (list rewrites of different posts overlap, and a
+        # rebuild replaces the vocabulary), and no edits to the source posts
+        # while their vectors are recomputed; both locked in a fixed order
+        list(RelatedPostsVocabulary.objects.select_for_update().values_list('pk', flat=True))
+        list(Post.objects.select_for_update().filter(pk__in=post_ids).order_by('pk').values_list('pk', flat=True))
+        changed = {
+            pk: vectorize(counts, vocabulary, idf, terms_per_post)
+            for pk, counts in _published_terms(post_ids)
+        }
+        removed = post_ids - changed.keys()
+
+        holders = set(RelatedPost.objects.filter(related_id__in=post_ids).values_list('post_id', flat=True))
+        PostTermVector.objects.filter(post_id__in=removed).delete()
+        RelatedPost.objects.filter(post_id__in=removed).delete()
+        PostTermVector.objects.bulk_create(
+            [PostTermVector(post_id=pk, terms=pack_vector(*vector)) for pk, vector in changed.items()],
+            update_conflicts=True, unique_fields=['post'], update_fields=['terms'],
+        )
+
+        ids, matrix = _stored_matrix(len(idf))
+        position = {pk: index for index, pk in enumerate(ids.tolist())}
+        affected = (holders - removed) | changed.keys()
+
+        # Lists the changed posts now make it into: score beats the current last entry
+        changed_positions = [position[pk] for pk in changed]
+        if changed_positions:
+            threshold = np.full(len(ids), min_score, dtype=np.float32)
+            for pk, score in RelatedPost.objects.filter(rank=count - 1).values_list('post_id', 'score'):
+                if pk in position:
+                    threshold[position[pk]] = max(score, min_score)
+            transposed = matrix.T.tocsr()
+            for start in range(0, len(changed_positions), BLOCK_SIZE):
+                scores = (matrix[changed_positions[start:start + BLOCK_SIZE]] @ transposed).toarray()
+                affected.update(ids[(scores > threshold).any(axis=0)].tolist())
+
+        positions = np.array(sorted(position[pk] for pk in affected if pk in position), dtype=np.int64)
+        RelatedPost.objects.filter(post_id__in=affected).delete()
+        RelatedPost.objects.bulk_create(_links(ids, matrix, positions, count, min_score), batch_size=2000)
+    return len(positions)
+
+
+def tracked_values(post):
+    """The TRACKED_FIELDS a Post instance holds (deferred, unloaded ones are absent)."""
+    return {name: post.__dict__[name] for name in TRACKED_FIELDS if name in post.__dict__}
+
+
+def needs_update(before, post, created, update_fields=None):
+    """
+    Whether saving `post` (loaded with tracked_values `before`) can change
+    any related-posts list: it was or is published, and its status or text
+    changed. Only the saved fields count (a post loaded with deferred fields
+    saves just the loaded ones); unknown values count as changed.
+    """
+    after = tracked_values(post)
+    if update_fields is not None:
+        after = {name: value for name, value in after.items() if name in update_fields}
+    if created:
+        return after.get('status') == 'published'
+    was_published = before.get('status', after.get('status', 'published')) == 'published'
+    is_published = after.get('status', before.get('status', 'published')) == 'published'
+    if not (was_published or is_published):
+        return False
+    for name, value in after.items():
+        if name not in before:
+            return True
+        # The body may be loaded as compressed bytes and read (decompressed) since
+        if value is not before[name] and decompress(value) != decompress(before[name]):
+            return True
+    return False
+
+
+def schedule_update(post_ids):
+    """Queue the posts for `manage.py update_related_posts`, in the current transaction."""
+    post_ids = set(post_ids)
+    if post_ids and _setting('RELATED_POSTS_UPDATE_ON_SAVE', True):
+        now = timezone.now()
+        # A post queued again moves its queued_at forward, so a run already working on it keeps it queued
+        RelatedPostUpdate.objects.bulk_create(
+            [RelatedPostUpdate(post_id=pk, queued_at=now) for pk in post_ids],
+            update_conflicts=True, unique_fields=['post_id'], update_fields=['queued_at'],
+        )
+
+
+def process_queue(batch_size=QUEUE_BATCH):
+    """Apply the oldest `batch_size` queued updates; returns (posts, lists rewritten)."""
+    started = timezone.now()
+    post_ids = list(RelatedPostUpdate.objects.order_by('queued_at').values_list('post_id', flat=True)[:batch_size])
+    if not post_ids:
+        return 0, 0
+    rewritten = update_related_posts(post_ids)
+    RelatedPostUpdate.objects.filter(post_id__in=post_ids, queued_at__lt=started).delete()
+    return len(post_ids), rewritten
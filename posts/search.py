@@ -0,0 +1,184 @@
+# posts/search.py
+# Full-text search over post title, excerpt and HTML-stripped content.
+#
+# PostgreSQL: a stored `search_vector` tsvector column on posts_post with a
+#   GIN index (declared on Post.Meta), weighted title (A) > excerpt (B) > body (C), ranked by ts_rank.
+# SQLite: an FTS5 table `posts_post_fts` keyed by post id, ranked by bm25,
+#   created by migration 0008. Used by the test environment.
+#
+# Both are kept up to date per post by the post_save/post_delete handlers in
+# posts/signals.py, and can be rebuilt with `manage.py rebuild_search_index`.
+import html
+import re
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.db import connection as default_connection
+
+from .compression import decompress
+
+FTS_TABLE = 'posts_post_fts'
+SNIPPET_LENGTH = 200
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class _TextExtractor(HTMLParser):
+    """Collect visible text, skipping <script>/<style>/<head> contents."""
+    SKIP = {'script', 'style', 'head', 'noscript', 'svg'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(value):
+    """Return the visible text of an HTML document with whitespace collapsed."""
+    if not value:
+        return ''
+    parser = _TextExtractor()
+    parser.feed(value)
+    parser.close()
+    return ' '.join(' '.join(parser.parts).split())
+
+
+def search_terms(query):
+    return [term.lower() for term in _TERM_RE.findall(query or '')]
+
+
+def _config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+# ── Index maintenance ──────────────────────────────────────────────────────
+def index_rows(rows, connection=default_connection):
+    """
+    (Re)index posts given as (id, title, excerpt, content) tuples; content
+    may be the stored compressed bytes. HTML is stripped in Python so both
+    backends index the same text.
+    """
+    documents = [
+        (pk, title or '', excerpt or '', html_to_text(decompress(content)))
+        for pk, title, excerpt, content in rows
+    ]
+    if not documents:
+        return 0
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            config = _config()
+            cursor.executemany(
+                "UPDATE posts_post SET search_vector = "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C') "
+                "WHERE id = %s",
+                [(config, title, config, excerpt, config, body, pk)
+                 for pk, title, excerpt, body in documents],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(pk,) for pk, _, _, _ in documents],
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)",
+                documents,
+            )
+    return len(documents)
+
+
+def index_post(post):
+    index_rows([(post.pk, post.title, post.excerpt, post.content)])
+
+
+def remove_post(post_id, connection=default_connection):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+    # PostgreSQL: the vector lives on the deleted row itself
+
+
+# ── Querying ───────────────────────────────────────────────────────────────
+def search_post_ids(query, limit, offset=0, connection=default_connection):
+    """
+    Return [(post_id, rank), ...] for published posts matching `query`,
+    best match first. Higher rank is better on every backend.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT id, ts_rank(search_vector, q) AS rank "
+                "FROM posts_post, websearch_to_tsquery(%s::regconfig, %s) AS q "
+                "WHERE status = 'published' AND search_vector @@ q "
+                "ORDER BY rank DESC, created_at DESC, id DESC "
+                "LIMIT %s OFFSET %s",
+                [_config(), query, limit, offset],
+            )
+            return [(pk, float(rank)) for pk, rank in cursor.fetchall()]
+
+        if connection.vendor == 'sqlite':
+            # Quote every term so user input can't inject FTS5 query syntax
+            match = ' '.join(f'"{term}"' for term in terms)
+            cursor.execute(
+                f"SELECT p.id, bm25({FTS_TABLE}, 10.0, 5.0, 1.0) AS rank "
+                f"FROM {FTS_TABLE} JOIN posts_post p ON p.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND p.status = 'published' "
+                "ORDER BY rank, p.created_at DESC, p.id DESC "
+                "LIMIT %s OFFSET %s",
+                [match, limit, offset],
+            )
+            # bm25 is lower-is-better; negate so callers can treat rank uniformly
+            return [(pk, -float(rank)) for pk, rank in cursor.fetchall()]
+
+    raise NotImplementedError(f"Full-text search is not supported on {connection.vendor}")
+
+
+def make_snippet(text, query, length=SNIPPET_LENGTH):
+    """
+    Return an HTML-escaped excerpt of `text` around the first query match,
+    with matching words wrapped in <mark>.
+    """
+    if not text:
+        return ''
+    terms = search_terms(query)
+    pattern = None
+    start = 0
+    if terms:
+        pattern = re.compile(r'\b(?:%s)\w*' % '|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+        match = pattern.search(text)
+        if match:
+            start = max(0, match.start() - length // 4)
+    window = text[start:start + length]
+
+    parts = []
+    last = 0
+    for match in (pattern.finditer(window) if pattern else ()):
+        parts.append(html.escape(window[last:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        last = match.end()
+    parts.append(html.escape(window[last:]))
+
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '…' + snippet
+    if start + length < len(text):
+        snippet += '…'
+    return snippet
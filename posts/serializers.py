@@ -1,6 +1,15 @@
 # posts/serializers.py
+import operator
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
 from rest_framework import serializers
-from .models import Post, Category, Tag, Author
+from .models import AIJob, Post, Category, Tag, Author
+from . import related, search
+from .cache import bump_post_list_version, bump_taxonomy_version
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -25,6 +34,105 @@ class AuthorSummarySerializer(serializers.ModelSerializer):
             return f"{obj.user.first_name} {obj.user.last_name}"
         return obj.user.username
 
+class PostSummarySerializer(serializers.ModelSerializer):
+    """
+    Read-only listing representation. Omits `content` and `graphical_content`;
+    pair it with `Post.objects.summary()` so those columns are never loaded.
+    The full body is served by PostDetailView.
+    """
+    author = AuthorSummarySerializer(read_only=True)
+    category = CategorySerializer(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'slug', 'excerpt', 'is_html', 'cover_image',
+                  'created_at', 'updated_at', 'published_at',
+                  'author', 'category', 'tags', 'status']
+        read_only_fields = fields
+
+def _int_ids(values):
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+def unique_slugs(titles):
+    """
+    Slugify `titles`, suffixing -2, -3, ... where a slug is already taken by a
+    post or by an earlier title in the list. Two queries however many titles.
+    """
+    max_length = Post._meta.get_field('slug').max_length
+    # Leave room for a "-<n>" suffix
+    bases = [slugify(title)[:max_length - 8].strip('-') or 'post' for title in titles]
+    taken = set(Post.objects.filter(slug__in=set(bases)).values_list('slug', flat=True))
+    if taken:
+        numbered = reduce(operator.or_, (Q(slug__startswith=f'{base}-') for base in taken))
+        taken.update(Post.objects.filter(numbered).values_list('slug', flat=True))
+
+    slugs = []
+    for base in bases:
+        slug, n = base, 1
+        while slug in taken:
+            n += 1
+            slug = f'{base}-{n}'
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+class BulkPostListSerializer(serializers.ListSerializer):
+    """
+    `PostSerializer(data=[...], many=True)`: checks every category_id/tag_ids
+    with one query each (instead of one per post), then creates all posts and
+    their tag links with bulk_create. Errors are reported per item by
+    position. Call save() inside a transaction.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, dict)]
+            category_ids = _int_ids(item.get('category_id') for item in items)
+            tag_ids = _int_ids(tag for item in items if isinstance(item.get('tag_ids'), list) for tag in item['tag_ids'])
+            self.context['known_category_ids'] = set(
+                Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True)
+            )
+            self.context['known_tag_ids'] = set(Tag.objects.filter(pk__in=tag_ids).values_list('pk', flat=True))
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        now = timezone.now()
+        slugs = unique_slugs([item['title'] for item in validated_data])
+        posts = []
+        tag_ids = []
+        for item, slug in zip(validated_data, slugs):
+            item = dict(item)
+            tag_ids.append(item.pop('tag_ids', []))
+            post = Post(slug=slug, **item)
+            if post.status == 'published' and not post.published_at:
+                post.published_at = now
+            posts.append(post)
+        posts = Post.objects.bulk_create(posts)
+
+        through = Post.tags.through
+        through.objects.bulk_create(
+            [through(post_id=post.pk, tag_id=tag_id) for post, ids in zip(posts, tag_ids) for tag_id in set(ids)]
+        )
+
+        # bulk_create sends no post_save/m2m_changed: do what the signal handlers would
+        search.index_rows([(post.pk, post.title, post.excerpt, post.content) for post in posts])
+        related.schedule_update([post.pk for post in posts if post.status == 'published'])
+        # PostBulkCreateView runs this in a transaction: a bump before the commit
+        # would let a concurrent read cache the old tree under the new version
+        transaction.on_commit(bump_taxonomy_version)
+        transaction.on_commit(bump_post_list_version)
+        return posts
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = AuthorSummarySerializer(read_only=True)
     category = CategorySerializer(read_only=True)
@@ -43,6 +151,25 @@ class PostSerializer(serializers.ModelSerializer):
                   'cover_image', 'created_at', 'author', 'category', 'tags',
                   'category_id', 'tag_ids', 'status']
         read_only_fields = ['slug', 'created_at', 'author']
+        list_serializer_class = BulkPostListSerializer
+
+    def validate_category_id(self, value):
+        if value is None:
+            return value
+        known = self.context.get('known_category_ids')
+        exists = value in known if known is not None else Category.objects.filter(pk=value).exists()
+        if not exists:
+            raise serializers.ValidationError(f"Category {value} does not exist.")
+        return value
+
+    def validate_tag_ids(self, value):
+        known = self.context.get('known_tag_ids')
+        if known is None:
+            known = set(Tag.objects.filter(pk__in=value).values_list('pk', flat=True))
+        missing = sorted(set(value) - known)
+        if missing:
+            raise serializers.ValidationError(f"Tags do not exist: {', '.join(map(str, missing))}.")
+        return value
     
     def create(self, validated_data):
         # Extract tag_ids and category_id
@@ -60,4 +187,14 @@ class PostSerializer(serializers.ModelSerializer):
         if tag_ids:
             post.tags.set(tag_ids)
         
-        return post
\ No newline at end of file
+        return post
+
+
+class AIJobSerializer(serializers.ModelSerializer):
+    """Status of a background AI job (posts/ai_jobs.py); `result` is set once it succeeded."""
+
+    class Meta:
+        model = AIJob
+        fields = ['id', 'kind', 'status', 'request_key', 'result', 'error', 'attempts',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
@@ -1,7 +1,13 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, post_init, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Author
+from django.utils import timezone
+from .models import Author, Category, Tag, Post, RelatedPost
+from .cache import bump_post_list_version, bump_taxonomy_version, invalidate_post_details
+from . import related, search
 
 
 @receiver(post_save, sender=User)
@@ -20,3 +26,139 @@ def save_author_profile(sender, instance, **kwargs):
     """
     if hasattr(instance, 'author_profile'):
         instance.author_profile.save()
+
+
+# ── Post detail cache invalidation ─────────────────────────────────────────
+# Entries are dropped once the transaction commits: dropping them earlier lets
+# a concurrent read cache the old rows again before the new ones are visible.
+def drop_post_details_on_commit(slugs):
+    """Collect `slugs` now (pre_delete rows are about to go) and drop their entries on commit."""
+    transaction.on_commit(partial(invalidate_post_details, list(slugs)))
+
+
+@receiver(post_init, sender=Post)
+def remember_post_slug(sender, instance, **kwargs):
+    """Keep the slug the post was loaded with so a rename also drops the old cache entry."""
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_detail(sender, instance, **kwargs):
+    drop_post_details_on_commit({instance.slug, getattr(instance, '_loaded_slug', None)})
+    instance._loaded_slug = instance.slug
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Tags are part of a post's representation: drop the cached detail and bump
+    updated_at so ETag/Last-Modified validators change too.
+    """
+    if not reverse:
+        post_ids = [instance.pk] if action in ('post_add', 'post_remove', 'post_clear') else []
+    elif action == 'pre_clear':
+        # tag.posts.clear(): pk_set is empty, so collect the posts before they are unlinked
+        post_ids = list(instance.posts.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        post_ids = list(pk_set or ())
+    else:
+        post_ids = []
+    if not post_ids:
+        return
+    posts = Post.objects.filter(pk__in=post_ids)
+    drop_post_details_on_commit(posts.values_list('slug', flat=True))
+    posts.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Author)
+@receiver(pre_delete, sender=Author)
+def invalidate_author_post_details(sender, instance, **kwargs):
+    drop_post_details_on_commit(Post.objects.filter(author=instance).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_post_details(sender, instance, **kwargs):
+    drop_post_details_on_commit(Post.objects.filter(category=instance).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag_post_details(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    drop_post_details_on_commit(Post.objects.filter(tags=instance).values_list('slug', flat=True))
+
+
+# ── Taxonomy tree cache ────────────────────────────────────────────────────
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_taxonomy_tree(sender, **kwargs):
+    """The tree embeds per-tag published-post counts, so post changes count too."""
+    transaction.on_commit(bump_taxonomy_version)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_taxonomy_tree_on_tagging(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_taxonomy_version)
+
+
+# ── Post list validators ───────────────────────────────────────────────────
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_post_lists(sender, **kwargs):
+    """List pages embed authors, categories and tags, so any of them changing moves the ETag."""
+    transaction.on_commit(bump_post_list_version)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_lists_on_tagging(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_post_list_version)
+
+
+# ── Full-text search index maintenance ─────────────────────────────────────
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+# ── Related posts ──────────────────────────────────────────────────────────
+@receiver(post_init, sender=Post)
+def remember_related_fields(sender, instance, **kwargs):
+    instance._related_fields = related.tracked_values(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_related_posts(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Queue the post if the save can change a related-posts list (drafts and view-only saves can't)."""
+    if raw:
+        return
+    if related.needs_update(getattr(instance, '_related_fields', {}), instance, created, update_fields):
+        related.schedule_update([instance.pk])
+    instance._related_fields = related.tracked_values(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def refill_related_posts(sender, instance, **kwargs):
+    """The posts listing this one lose an entry once it is gone; recompute their lists."""
+    related.schedule_update(RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True))
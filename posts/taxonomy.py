@@ -0,0 +1,159 @@
+# posts/taxonomy.py
+# Declarative category/tag sync used by `manage.py setup_blog_data`.
+#
+# A taxonomy file is JSON:
+#
+#   {"categories": [
+#       {"name": "Programming & Tech", "slug": "optional", "tags": ["Python", {"name": "Next.js", "slug": "nextjs"}]}
+#   ]}
+#
+# Rows are matched on slug (slugify(name) unless given). plan_sync() reads the
+# declared slugs back in two queries and works out what differs; apply_sync()
+# writes only the differing rows with bulk_create(update_conflicts=True), so a
+# run against an up-to-date database is two SELECTs and no writes. Rows that
+# exist in the database but not in the file are left alone.
+import json
+from functools import partial
+from pathlib import Path
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .cache import bump_post_list_version, bump_taxonomy_version, invalidate_post_details
+from .models import Category, Post, Tag
+
+DEFAULT_TAXONOMY_FILE = Path(__file__).resolve().parent / 'taxonomies' / 'blog.json'
+
+
+class TaxonomyError(ValueError):
+    pass
+
+
+def load_taxonomy(paths):
+    """Merge taxonomy files into ({category_slug: name}, {tag_slug: (name, category_slug)})."""
+    categories, tags = {}, {}
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise TaxonomyError(f'{path}: {exc}')
+        for entry in data.get('categories', []):
+            if not entry.get('name'):
+                raise TaxonomyError(f'{path}: every category needs a name')
+            category_slug = entry.get('slug') or slugify(entry['name'])
+            if category_slug in categories:
+                raise TaxonomyError(f'{path}: category "{category_slug}" is declared twice')
+            categories[category_slug] = entry['name']
+            for tag in entry.get('tags', []):
+                name, slug = (tag, None) if isinstance(tag, str) else (tag.get('name'), tag.get('slug'))
+                if not name:
+                    raise TaxonomyError(f'{path}: tag without a name in "{category_slug}"')
+                slug = slug or slugify(name)
+                if slug in tags:
+                    raise TaxonomyError(
+                        f'{path}: tag "{slug}" is declared under both "{tags[slug][1]}" and "{category_slug}"'
+                    )
+                tags[slug] = (name, category_slug)
+    return categories, tags
+
+
+class SyncPlan:
+    """Differences between a loaded taxonomy and the database."""
+
+    def __init__(self):
+        self.categories = []  # (action, slug, name, old_name); action is 'create' | 'update'
+        self.tags = []  # (action, slug, name, category_slug, old_name, old_category_slug)
+        self.unchanged_categories = 0
+        self.unchanged_tags = 0
+
+    @property
+    def has_changes(self):
+        return bool(self.categories or self.tags)
+
+    def lines(self):
+        """Human-readable diff, one line per changed row."""
+        for action, slug, name, old_name in self.categories:
+            if action == 'create':
+                yield f'+ category {slug} "{name}"'
+            else:
+                yield f'~ category {slug}: "{old_name}" -> "{name}"'
+        for action, slug, name, category, old_name, old_category in self.tags:
+            if action == 'create':
+                yield f'+ tag {slug} "{name}" in {category}'
+                continue
+            changes = []
+            if name != old_name:
+                changes.append(f'"{old_name}" -> "{name}"')
+            if category != old_category:
+                changes.append(f'category {old_category or "-"} -> {category}')
+            yield f'~ tag {slug}: ' + ', '.join(changes)
+
+    def summary(self):
+        def count(rows, action):
+            return sum(1 for row in rows if row[0] == action)
+        return (
+            f'Categories: {count(self.categories, "create")} created, {count(self.categories, "update")} updated, '
+            f'{self.unchanged_categories} unchanged. '
+            f'Tags: {count(self.tags, "create")} created, {count(self.tags, "update")} updated, '
+            f'{self.unchanged_tags} unchanged.'
+        )
+
+
+def plan_sync(categories, tags):
+    """Compare the declared taxonomy with the database (two queries)."""
+    plan = SyncPlan()
+    existing = dict(Category.objects.filter(slug__in=categories).values_list('slug', 'name'))
+    for slug, name in categories.items():
+        if slug not in existing:
+            plan.categories.append(('create', slug, name, None))
+        elif existing[slug] != name:
+            plan.categories.append(('update', slug, name, existing[slug]))
+        else:
+            plan.unchanged_categories += 1
+
+    existing = {
+        slug: (name, category)
+        for slug, name, category in Tag.objects.filter(slug__in=tags).values_list('slug', 'name', 'category__slug')
+    }
+    for slug, (name, category) in tags.items():
+        if slug not in existing:
+            plan.tags.append(('create', slug, name, category, None, None))
+        elif existing[slug] != (name, category):
+            plan.tags.append(('update', slug, name, category, *existing[slug]))
+        else:
+            plan.unchanged_tags += 1
+    return plan
+
+
+def apply_sync(plan):
+    """Write the plan's changed rows; returns False when there was nothing to do."""
+    if not plan.has_changes:
+        return False
+    with transaction.atomic():
+        if plan.categories:
+            Category.objects.bulk_create(
+                [Category(slug=slug, name=name) for _, slug, name, _ in plan.categories],
+                update_conflicts=True, unique_fields=['slug'], update_fields=['name', 'updated_at'],
+            )
+        if plan.tags:
+            wanted = {row[3] for row in plan.tags}
+            category_ids = dict(Category.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+            Tag.objects.bulk_create(
+                [Tag(slug=slug, name=name, category_id=category_ids[category]) for _, slug, name, category, _, _ in plan.tags],
+                update_conflicts=True, unique_fields=['slug'], update_fields=['name', 'category', 'updated_at'],
+            )
+        # Bulk writes send no post_save signals: do what the Category/Tag handlers would.
+        # Cached post details embed category and tag names.
+        updated_categories = [slug for action, slug, *_ in plan.categories if action == 'update']
+        updated_tags = [slug for action, slug, *_ in plan.tags if action == 'update']
+        if updated_categories or updated_tags:
+            slugs = list(
+                Post.objects.filter(Q(category__slug__in=updated_categories) | Q(tags__slug__in=updated_tags))
+                .order_by().values_list('slug', flat=True).distinct()
+            )
+            transaction.on_commit(partial(invalidate_post_details, slugs))
+        transaction.on_commit(bump_taxonomy_version)
+        transaction.on_commit(bump_post_list_version)
+    return True
@@ -1,3 +1,1617 @@
-from django.test import TestCase
+import gzip
+import io
+import itertools
+import json
+import os
+import tempfile
+import unittest
+import uuid
+import time
+import zlib
+import datetime
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import openai
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from . import ai_agent, ai_cache, ai_jobs, ai_ratelimit, ai_stream, compression, metrics, related, trending
+from .cache import get_taxonomy_version
+from .fast_serializers import post_values, serialize_posts
+from .middleware import CompressionMiddleware, brotli, negotiate_encoding
+from .models import (
+    AICompletion, AIJob, Category, CompressionDictionary, Post, PostViewBucket, RelatedPostUpdate, Tag, TrendingPost,
+)
+from .serializers import PostSerializer, PostSummarySerializer
+from .view_counter import view_counter
+
+
+_post_numbers = itertools.count()
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_COUNT_FLUSH_THRESHOLD=10 ** 6)
+class PostsAPITestCase(APITestCase):
+    """
+    Starts every test with an empty cache, metrics registry, view-count
+    buffer and AI rate-limit budget. Buffered views are only flushed when a
+    test asks for it, so query counts stay deterministic.
+    """
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        ai_ratelimit.limiter.reset()
+        view_counter.discard()
+        self.addCleanup(view_counter.discard)
+
+
+def make_posts(author, count, status='published', same_timestamp=False):
+    """Create `count` posts with distinct (or deliberately identical) created_at values."""
+    now = timezone.now()
+    posts = []
+    for i in range(count):
+        post = Post.objects.create(
+            title=f"Post {author.user.username} {next(_post_numbers)}",
+            content=f"<p>Body {i}</p>",
+            excerpt=f"Excerpt {i}",
+            author=author,
+            status=status,
+        )
+        created_at = now if same_timestamp else now - timedelta(minutes=i)
+        Post.objects.filter(pk=post.pk).update(created_at=created_at)
+        posts.append(post)
+    return posts
+
+
+class PostCursorPaginationTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='writer', password='pass12345')
+        self.author = self.user.author_profile
+
+    def _collect(self, url, params=None):
+        seen = []
+        response = self.client.get(url, params or {})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return seen, response
+            response = self.client.get(response.data['next'])
+
+    def test_pages_cover_every_post_once_in_order(self):
+        make_posts(self.author, 7)
+        ids, _ = self._collect(reverse('post-list'), {'page_size': 3})
+        expected = list(
+            Post.objects.filter(status='published')
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        make_posts(self.author, 5, same_timestamp=True)
+        ids, _ = self._collect(reverse('post-list'), {'page_size': 2})
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_previous_link_returns_prior_page(self):
+        make_posts(self.author, 5)
+        first = self.client.get(reverse('post-list'), {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [p['id'] for p in back.data['results']],
+            [p['id'] for p in first.data['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_page_size_is_capped(self):
+        make_posts(self.author, 3)
+        with self.settings(POSTS_MAX_PAGE_SIZE=2):
+            response = self.client.get(reverse('post-list'), {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('post-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_approximate_count_is_opt_in(self):
+        make_posts(self.author, 4)
+        response = self.client.get(reverse('post-list'))
+        self.assertNotIn('approximate_count', response.data)
+        response = self.client.get(reverse('post-list'), {'include_total': '1'})
+        self.assertEqual(response.data['approximate_count'], 4)
+
+    def test_my_posts_is_paginated(self):
+        make_posts(self.author, 3, status='draft')
+        self.client.force_authenticate(self.user)
+        ids, _ = self._collect(reverse('my-posts'), {'page_size': 2})
+        self.assertEqual(len(ids), 3)
+
+
+class PostSummaryModeTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='writer', password='pass12345')
+        self.author = self.user.author_profile
+        make_posts(self.author, 3)
+        Post.objects.update(content='<p>' + 'x' * 5000 + '</p>', graphical_content='<div>chart</div>')
+
+    def test_list_omits_html_bodies(self):
+        response = self.client.get(reverse('post-list'))
+        item = response.data['results'][0]
+        self.assertNotIn('content', item)
+        self.assertNotIn('graphical_content', item)
+        for field in ('title', 'slug', 'excerpt', 'cover_image', 'author',
+                      'category', 'tags', 'created_at', 'updated_at'):
+            self.assertIn(field, item)
+
+    def test_list_does_not_select_html_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('post-list'))
+        post_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "posts_post"' in q['sql']]
+        self.assertTrue(post_queries)
+        for sql in post_queries:
+            self.assertNotIn('"posts_post"."content"', sql)
+            self.assertNotIn('"posts_post"."graphical_content"', sql)
+
+    def test_full_mode_and_detail_keep_body(self):
+        response = self.client.get(reverse('post-list'), {'mode': 'full'})
+        self.assertIn('content', response.data['results'][0])
+        slug = response.data['results'][0]['slug']
+        detail = self.client.get(reverse('post-detail', args=[slug]))
+        self.assertTrue(detail.data['content'].startswith('<p>xxx'))
+
+
+class PostQueryBudgetTests(PostsAPITestCase):
+    """
+    Each post endpoint must run a fixed number of queries regardless of how
+    many posts, tags or authors are involved. A failure here means an N+1
+    has crept back into a serializer or queryset.
+    """
+    DATASET_SIZES = (1, 5, 20)
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='writer', password='pass12345', first_name='Ada', last_name='Lovelace',
+        )
+        self.author = self.user.author_profile
+        self.category = Category.objects.create(name='Tech')
+        self.tags = [Tag.objects.create(name=f'Tag {i}', category=self.category) for i in range(3)]
+
+    def _seed(self, count, status='published'):
+        Post.objects.all().delete()
+        posts = make_posts(self.author, count, status=status)
+        for post in posts:
+            post.category = self.category
+            post.save()
+            post.tags.set(self.tags)
+        return posts
+
+    def test_post_list_query_count_is_constant(self):
+        for size in self.DATASET_SIZES:
+            self._seed(size)
+            for params in ({}, {'mode': 'full'}):
+                # posts + tags prefetch; the validators come from the cached list version
+                with self.subTest(size=size, **params), self.assertNumQueries(2):
+                    response = self.client.get(reverse('post-list'), {'page_size': 50, **params})
+                self.assertEqual(len(response.data['results']), size)
+
+    def test_post_detail_query_count_is_constant(self):
+        for size in self.DATASET_SIZES:
+            posts = self._seed(size)
+            # cold cache: post (with its validator timestamps) + tags
+            with self.subTest(size=size), self.assertNumQueries(2):
+                response = self.client.get(reverse('post-detail', args=[posts[-1].slug]))
+            self.assertEqual(len(response.data['tags']), len(self.tags))
+
+    def test_my_posts_query_count_is_constant(self):
+        self.client.force_authenticate(self.user)
+        for size in self.DATASET_SIZES:
+            self._seed(size, status='draft')
+            # posts + tags prefetch; author_profile is already cached on the forced user
+            with self.subTest(size=size), self.assertNumQueries(2):
+                response = self.client.get(reverse('my-posts'), {'page_size': 50})
+            self.assertEqual(len(response.data['results']), size)
+
+
+class PostDetailCacheTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='writer', password='pass12345')
+        self.author = self.user.author_profile
+        self.category = Category.objects.create(name='Tech')
+        self.tag = Tag.objects.create(name='Python', category=self.category)
+        self.post = make_posts(self.author, 1)[0]
+        self.post.category = self.category
+        self.post.save()
+        self.post.tags.add(self.tag)
+        self.url = reverse('post-detail', args=[self.post.slug])
+
+    def _get(self):
+        return self.client.get(self.url)
+
+    def test_warm_read_runs_no_queries(self):
+        self.assertEqual(self._get()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self._get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['post_detail_cache.hits'], 1)
+        self.assertEqual(counters['post_detail_cache.misses'], 1)
+
+    def test_post_save_invalidates(self):
+        self._get()
+        self.post.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        response = self._get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Renamed')
+
+    def test_slug_change_drops_old_entry(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.slug = 'new-slug'
+            self.post.save()
+            # Entries are only dropped once the change commits
+            self.assertEqual(self._get()['X-Cache'], 'HIT')
+        self.assertEqual(self._get().status_code, 404)
+
+    def test_related_changes_invalidate(self):
+        changes = [
+            lambda: self.post.tags.remove(self.tag),
+            lambda: self.tag.posts.add(self.post),
+            lambda: Tag.objects.get(pk=self.tag.pk).save(),
+            lambda: Category.objects.get(pk=self.category.pk).save(),
+            lambda: User.objects.get(pk=self.user.pk).save(),
+        ]
+        for change in changes:
+            self._get()
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertEqual(self._get()['X-Cache'], 'MISS')
+
+    def test_category_delete_invalidates(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        response = self._get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIsNone(response.data['category'])
+
+
+class ConditionalGetTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='writer', password='pass12345')
+        self.author = self.user.author_profile
+        self.category = Category.objects.create(name='Tech')
+        self.tag = Tag.objects.create(name='Python', category=self.category)
+        self.post = make_posts(self.author, 1)[0]
+        self.post.tags.add(self.tag)
+
+    def _revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_detail_returns_304_for_matching_etag(self):
+        url = reverse('post-detail', args=[self.post.slug])
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._revalidate(url, first).status_code, 304)
+        cache.clear()
+        # Cold cache: the post row and its tags are loaded (the validators are
+        # computed from them) and cached, so the next revalidation is free again
+        with self.assertNumQueries(2):
+            self.assertEqual(self._revalidate(url, first).status_code, 304)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._revalidate(url, first).status_code, 304)
+
+    def test_detail_etag_changes_with_related_objects(self):
+        url = reverse('post-detail', args=[self.post.slug])
+        first = self.client.get(url)
+        self.tag.name = 'Python 3'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.save()
+        response = self._revalidate(url, first)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_list_returns_304_until_a_post_changes(self):
+        url = reverse('post-list')
+        first = self.client.get(url)
+        self.assertNotIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._revalidate(url, first).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_posts(self.author, 1)
+        self.assertEqual(self._revalidate(url, first).status_code, 200)
+
+    def test_list_etag_changes_when_a_post_is_unpublished(self):
+        url = reverse('post-list')
+        first = self.client.get(url)
+        self.post.status = 'draft'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertEqual(self._revalidate(url, first).status_code, 200)
+
+    def test_list_etag_depends_on_query_string(self):
+        url = reverse('post-list')
+        first = self.client.get(url)
+        self.assertEqual(self._revalidate(url, first, mode='full').status_code, 200)
+
+    def test_if_modified_since(self):
+        url = reverse('category-list')
+        first = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_taxonomy_lists_revalidate(self):
+        for url in (reverse('category-list'), reverse('tag-list')):
+            first = self.client.get(url)
+            self.assertEqual(self._revalidate(url, first).status_code, 304)
+        first = self.client.get(reverse('tag-list'))
+        Tag.objects.create(name='Django', category=self.category)
+        self.assertEqual(self._revalidate(reverse('tag-list'), first).status_code, 200)
+
+
+class ViewCounterTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='writer', password='pass12345')
+        self.posts = make_posts(self.user.author_profile, 2)
+
+    def test_detail_reads_are_buffered_then_flushed_in_bulk(self):
+        post = self.posts[0]
+        before = Post.objects.get(pk=post.pk).updated_at
+        for _ in range(3):
+            self.client.get(reverse('post-detail', args=[post.slug]))
+        self.assertEqual(Post.objects.get(pk=post.pk).view_count, 0)
+        self.assertEqual(view_counter.pending(), {post.pk: 3})
+
+        with CaptureQueriesContext(connection) as ctx:
+            view_counter.flush()
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        refreshed = Post.objects.get(pk=post.pk)
+        self.assertEqual(refreshed.view_count, 3)
+        self.assertEqual(refreshed.updated_at, before)
+        self.assertEqual(view_counter.pending(), {})
+
+    def test_flush_groups_posts_by_increment(self):
+        first, second = self.posts
+        view_counter.record(first.pk, 2)
+        view_counter.record(second.pk, 5)
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'view_count')),
+            {first.pk: 2, second.pk: 5},
+        )
+        stats = metrics.snapshot()
+        self.assertEqual(stats['counters']['view_counter.views_flushed'], 7)
+        self.assertEqual(stats['distributions']['view_counter.batch_posts']['last'], 2)
+
+    def test_threshold_triggers_flush(self):
+        with self.settings(VIEW_COUNT_FLUSH_THRESHOLD=2):
+            view_counter.record(self.posts[0].pk)
+            view_counter.record(self.posts[0].pk)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).view_count, 2)
+
+    def test_failed_flush_keeps_views_and_still_answers_the_read(self):
+        post = self.posts[0]
+        with self.settings(VIEW_COUNT_FLUSH_THRESHOLD=1), \
+                mock.patch('posts.trending.record_bucket_views', side_effect=DatabaseError('down')), \
+                self.assertLogs('posts.view_counter', 'ERROR'):
+            response = self.client.get(reverse('post-detail', args=[post.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(view_counter.pending(), {post.pk: 1})
+        self.assertEqual(metrics.snapshot()['counters']['view_counter.flush_errors'], 1)
+
+        view_counter.flush()
+        self.assertEqual(Post.objects.get(pk=post.pk).view_count, 1)
+
+
+class SystemCheckTests(SimpleTestCase):
+    def test_project_settings_pass_system_checks(self):
+        # e.g. SearchVectorField needs django.contrib.postgres installed (postgres.E005)
+        call_command('check', stdout=io.StringIO())
+
+
+class PostSearchTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='writer', password='pass12345').author_profile
+        self.django_post = Post.objects.create(
+            title='Scaling Django', excerpt='Notes on databases', author=self.author, status='published',
+            content=(
+                "<html><head><script>var django = 1;</script></head>"
+                "<body><p class='text-lg'>Connection pooling &amp; indexes keep Django fast.</p></body></html>"
+            ),
+        )
+        self.react_post = Post.objects.create(
+            title='React hooks', excerpt='Frontend state', author=self.author, status='published',
+            content="<p>useEffect and useState explained for Django developers.</p>",
+        )
+        self.draft = Post.objects.create(
+            title='Django draft', excerpt='Unpublished', author=self.author, status='draft',
+            content="<p>Django</p>",
+        )
+
+    def _search(self, **params):
+        response = self.client.get(reverse('post-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_ranks_title_matches_first_and_skips_drafts(self):
+        ids = [item['id'] for item in self._search(q='django').data['results']]
+        self.assertEqual(ids, [self.django_post.pk, self.react_post.pk])
+
+    def test_markup_and_scripts_are_not_indexed(self):
+        self.assertEqual(self._search(q='class').data['results'], [])
+        self.assertEqual(self._search(q='var').data['results'], [])
+        self.assertEqual(len(self._search(q='pooling').data['results']), 1)
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        item = self._search(q='pooling').data['results'][0]
+        self.assertIn('<mark>pooling</mark>', item['snippet'])
+        self.assertIn('&amp;', item['snippet'])
+        self.assertNotIn('content', item)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.react_post.content = '<p>Vue components</p>'
+        self.react_post.save()
+        self.assertEqual(len(self._search(q='useEffect').data['results']), 0)
+        self.assertEqual(len(self._search(q='vue').data['results']), 1)
+        self.django_post.delete()
+        self.assertEqual(self._search(q='pooling').data['results'], [])
+
+    def test_paginates(self):
+        first = self._search(q='django', page_size=1)
+        self.assertEqual(len(first.data['results']), 1)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(second.data['results'][0]['id'], self.react_post.pk)
+        self.assertIsNone(second.data['next'])
+
+    def test_query_is_required_and_syntax_is_inert(self):
+        self.assertEqual(self.client.get(reverse('post-search')).status_code, 400)
+        self.assertEqual(self._search(q='django" OR NEAR(').status_code, 200)
+
+
+class FastSerializerParityTests(PostsAPITestCase):
+    """posts/fast_serializers.py must render byte-for-byte what the DRF serializers render."""
+
+    def setUp(self):
+        super().setUp()
+        named = User.objects.create_user(
+            username='ada', password='pass12345', first_name='Ada', last_name='Lovelace',
+        ).author_profile
+        named.profile_picture = 'authors/ada.png'
+        named.save()
+        plain = User.objects.create_user(username='plain', password='pass12345', first_name='Only').author_profile
+        category = Category.objects.create(name='Tech')
+        tags = [Tag.objects.create(name=f'Tag {i}', category=category if i else None) for i in range(3)]
+
+        make_posts(named, 2)
+        make_posts(plain, 2, status='draft')
+        posts = list(Post.objects.order_by('id'))
+        posts[0].category = category
+        posts[0].cover_image = 'blog_images/2026/01/01/cover é.jpg'
+        posts[0].content = '<p>Ünïcödé “quotes” & <b>tags</b></p>'
+        posts[0].save()
+        posts[0].tags.set([tags[2], tags[0]])
+        posts[1].tags.set([tags[1]])
+        Post.objects.create(title='Orphan', content='', excerpt='', author=None, status='published')
+
+    def _assert_same_json(self, serializer_class, summary, request):
+        renderer = JSONRenderer()
+        queryset = Post.objects.with_relations().order_by('id')
+        expected = serializer_class(queryset, many=True, context={'request': request}).data
+        actual = serialize_posts(post_values(queryset, summary=summary), request=request, summary=summary)
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_full_representation_matches(self):
+        self._assert_same_json(PostSerializer, False, RequestFactory().get('/api/posts/'))
+        self._assert_same_json(PostSerializer, False, None)
+
+    def test_summary_representation_matches(self):
+        self._assert_same_json(PostSummarySerializer, True, RequestFactory().get('/api/posts/'))
+        self._assert_same_json(PostSummarySerializer, True, None)
+
+    def test_endpoint_payload_matches_serializer(self):
+        post = Post.objects.order_by('id').first()
+        response = self.client.get(reverse('post-detail', args=[post.slug]))
+        request = response.wsgi_request
+        expected = PostSerializer(Post.objects.with_relations().get(pk=post.pk), context={'request': request}).data
+        self.assertEqual(JSONRenderer().render(response.data), JSONRenderer().render(expected))
+
+
+class CompressedContentTests(PostsAPITestCase):
+    BODY = "<section class='max-w-3xl mx-auto px-6'><p class='text-lg text-gray-700'>Ünïcödé body</p></section>" * 30
+
+    def setUp(self):
+        super().setUp()
+        compression.clear_dictionary_cache()
+        self.addCleanup(compression.clear_dictionary_cache)
+        self.author = User.objects.create_user(username='zipper', password='pass12345').author_profile
+
+    def _stored(self, post, column='content'):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {column} FROM posts_post WHERE id = %s', [post.pk])
+            return bytes(cursor.fetchone()[0])
+
+    def test_round_trip_is_stored_compressed(self):
+        post = Post.objects.create(title='Zip', content=self.BODY, graphical_content='', author=self.author)
+        stored = self._stored(post)
+        self.assertTrue(stored.startswith(compression.MAGIC))
+        self.assertLess(len(stored), len(self.BODY.encode('utf-8')) // 5)
+        self.assertEqual(Post.objects.get(pk=post.pk).content, self.BODY)
+        self.assertEqual(Post.objects.get(pk=post.pk).graphical_content, '')
+
+    def test_decompresses_only_on_access(self):
+        post = Post.objects.create(title='Lazy', content=self.BODY, author=self.author)
+        loaded = Post.objects.get(pk=post.pk)
+        self.assertIsInstance(loaded.__dict__['content'], bytes)
+        self.assertEqual(loaded.content, self.BODY)
+        self.assertEqual(loaded.__dict__['content'], self.BODY)
+
+        # Saving without reading the body writes the stored bytes back untouched,
+        # even once a dictionary exists that a recompression would pick up
+        stored = self._stored(post)
+        CompressionDictionary.objects.create(data=compression.train_dictionary([self.BODY] * 2), sample_size=2)
+        compression.clear_dictionary_cache()
+        untouched = Post.objects.get(pk=post.pk)
+        untouched.title = 'Renamed'
+        untouched.save()
+        self.assertEqual(self._stored(post), stored)
+        self.assertEqual(Post.objects.get(pk=post.pk).content, self.BODY)
+
+    def test_trained_dictionary_shrinks_and_round_trips(self):
+        plain = compression.compress(self.BODY, dictionary=False)
+        zdict = compression.train_dictionary([self.BODY, self.BODY.replace('body', 'text')])
+        CompressionDictionary.objects.create(data=zdict, sample_size=2)
+        compression.clear_dictionary_cache()
+
+        post = Post.objects.create(title='Dict', content=self.BODY, author=self.author)
+        stored = self._stored(post)
+        self.assertEqual(stored[:2], compression.MAGIC + compression.ZLIB_DICT)
+        self.assertLess(len(stored), len(plain))
+        compression.clear_dictionary_cache()
+        self.assertEqual(Post.objects.get(pk=post.pk).content, self.BODY)
+
+    def test_legacy_uncompressed_rows_still_read(self):
+        post = Post.objects.create(title='Legacy', content='x', author=self.author)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE posts_post SET content = %s WHERE id = %s', ['<p>Old</p>'.encode('utf-8'), post.pk])
+        self.assertEqual(Post.objects.get(pk=post.pk).content, '<p>Old</p>')
+        self.assertEqual(compression.decompress('<p>Text</p>'), '<p>Text</p>')
+
+
+class CompressionMiddlewareTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create_user(username='long', password='pass12345').author_profile
+        self.post = Post.objects.create(
+            title='Long', content="<div class='p-4 text-gray-700'>Paragraph</div>" * 2000,
+            author=author, status='published',
+        )
+
+    def test_negotiation_respects_q_values(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate, br', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0, *;q=0.1', ('gzip',)), None)
+        self.assertEqual(negotiate_encoding('identity', ('br', 'gzip')), None)
+
+    def test_large_json_is_gzipped(self):
+        url = reverse('post-detail', args=[self.post.slug])
+        plain = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) // 10)
+        self.assertEqual(metrics.snapshot()['counters']['compression.gzip.responses'], 1)
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_is_preferred(self):
+        url = reverse('post-detail', args=[self.post.slug])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.client.get(url).content)
+
+    def test_small_and_uncompressible_responses_are_untouched(self):
+        middleware = CompressionMiddleware(lambda request: HttpResponse('{"ok": true}', content_type='application/json'))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+        middleware = CompressionMiddleware(lambda request: HttpResponse(b'\x89PNG' * 1000, content_type='image/png'))
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+    def test_responses_that_may_hold_secrets_are_not_compressed(self):
+        body = '{"token": "%s"}' % ('x' * 2000)
+
+        def view(request):
+            response = HttpResponse(body, content_type='application/json')
+            if request.GET.get('set_cookie'):
+                response.set_cookie('sessionid', 'abc')
+            return response
+
+        middleware = CompressionMiddleware(view)
+        factory = RequestFactory(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(middleware(factory.get('/api/posts/'))['Content-Encoding'], 'gzip')
+        with_cookie = factory.get('/api/posts/')
+        with_cookie.COOKIES['sessionid'] = 'abc'
+        for request in (with_cookie, factory.get('/api/posts/', {'set_cookie': 1}),
+                        factory.get('/api/auth/login/'), factory.get('/admin/')):
+            with self.subTest(path=request.get_full_path()):
+                self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+    def test_streaming_response_is_flushed_per_chunk(self):
+        chunks = [f'data: event {i}\n\n'.encode() for i in range(3)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks), content_type='text/event-stream')
+        )
+        response = middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        streamed = response.streaming_content
+        # Each event must be decodable as soon as its chunk is sent
+        for chunk in chunks:
+            self.assertEqual(decompressor.decompress(next(streamed)), chunk)
+        decompressor.decompress(b''.join(streamed))
+        self.assertTrue(decompressor.eof)
+
+
+class TaxonomyTreeTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('taxonomy')
+        author = User.objects.create_user(username='tax', password='pass12345').author_profile
+        self.tech = Category.objects.create(name='Tech')
+        Category.objects.create(name='Empty')
+        self.python = Tag.objects.create(name='Python', category=self.tech)
+        self.django = Tag.objects.create(name='Django', category=self.tech)
+        Tag.objects.create(name='Loose')
+        published, = make_posts(author, 1)
+        draft, = make_posts(author, 1, status='draft')
+        published.tags.set([self.python, self.django])
+        draft.tags.set([self.python])
+
+    def test_tree_nests_tags_with_published_counts(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['name'] for c in response.data], ['Empty', 'Tech'])
+        self.assertEqual(response.data[0]['tags'], [])
+        tags = {t['name']: t['published_posts'] for t in response.data[1]['tags']}
+        self.assertEqual(tags, {'Django': 1, 'Python': 1})
+
+    def test_warm_requests_run_no_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            warm = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(warm['X-Cache'], 'HIT')
+        self.assertEqual(warm.data, first.data)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_changes_bump_the_version(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Rust', category=self.tech)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertIn('Rust', [t['name'] for t in response.data[1]['tags']])
+
+        draft = Post.objects.get(status='draft')
+        draft.status = 'published'
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.save()
+        tags = {t['name']: t['published_posts'] for t in self.client.get(self.url).data[1]['tags']}
+        self.assertEqual(tags['Python'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.posts.clear()
+        tags = {t['name']: t['published_posts'] for t in self.client.get(self.url).data[1]['tags']}
+        self.assertEqual(tags['Django'], 0)
+
+
+class PostFilterTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('post-list')
+        self.ada = User.objects.create_user(username='ada', password='pass12345').author_profile
+        self.bob = User.objects.create_user(username='bob', password='pass12345').author_profile
+        self.tech = Category.objects.create(name='Tech')
+        self.life = Category.objects.create(name='Life')
+        self.python = Tag.objects.create(name='Python', category=self.tech)
+        self.django = Tag.objects.create(name='Django', category=self.tech)
+
+        self.p1, self.p2 = make_posts(self.ada, 2)
+        self.p3, = make_posts(self.bob, 1)
+        make_posts(self.ada, 1, status='draft')
+        Post.objects.filter(pk__in=[self.p1.pk, self.p2.pk]).update(category=self.tech)
+        Post.objects.filter(pk=self.p3.pk).update(category=self.life)
+        Post.objects.filter(pk=self.p1.pk).update(published_at=timezone.make_aware(timezone.datetime(2026, 1, 10)))
+        Post.objects.filter(pk=self.p2.pk).update(published_at=timezone.make_aware(timezone.datetime(2026, 2, 10)))
+        Post.objects.filter(pk=self.p3.pk).update(published_at=timezone.make_aware(timezone.datetime(2026, 3, 10)))
+        self.p1.tags.set([self.python, self.django])
+        self.p2.tags.set([self.python])
+
+    def _ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def test_filters(self):
+        self.assertEqual(self._ids({'category': 'tech'}), {self.p1.pk, self.p2.pk})
+        self.assertEqual(self._ids({'author': 'bob'}), {self.p3.pk})
+        self.assertEqual(self._ids({'tags': 'python,django'}), {self.p1.pk, self.p2.pk})
+        self.assertEqual(self._ids({'tags': 'python,django', 'tags_match': 'all'}), {self.p1.pk})
+        self.assertEqual(
+            self._ids({'published_after': '2026-02-01', 'published_before': '2026-03-10T00:00:00'}),
+            {self.p2.pk},
+        )
+        self.assertEqual(self._ids({'category': 'tech', 'author': 'bob'}), set())
+
+    def test_invalid_parameters_are_rejected(self):
+        response = self.client.get(self.url, {'published_after': 'last tuesday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+        self.assertEqual(self.client.get(self.url, {'tags': 'python', 'tags_match': 'some'}).status_code, 400)
+
+    def test_facets_follow_the_filter_in_one_query(self):
+        self.client.get(self.url, {'author': 'ada'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'author': 'ada', 'facets': 'true'})
+        facet_queries = [q for q in queries.captured_queries if 'UNION' in q['sql']]
+        self.assertEqual(len(facet_queries), 1)
+        facets = response.data['facets']
+        self.assertEqual(facets['categories'], [{'id': self.tech.pk, 'slug': 'tech', 'name': 'Tech', 'count': 2}])
+        self.assertEqual(
+            [(tag['slug'], tag['count']) for tag in facets['tags']],
+            [('python', 2), ('django', 1)],
+        )
+        self.assertNotIn('facets', self.client.get(self.url).data)
+
+
+class PostBulkCreateTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('post-bulk-create')
+        self.user = User.objects.create_user(username='importer', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Tech')
+        self.tags = [Tag.objects.create(name=f'Tag {i}', category=self.category) for i in range(3)]
+        Post.objects.create(title='Hello world', content='x', excerpt='', author=self.user.author_profile)
+
+    def _item(self, title, **extra):
+        return dict({'title': title, 'content': f'<p>{title}</p>', 'excerpt': 'e'}, **extra)
+
+    def test_creates_posts_tags_and_unique_slugs_in_fixed_queries(self):
+        tag_ids = [tag.pk for tag in self.tags]
+        payload = [
+            self._item('Hello world', category_id=self.category.pk, tag_ids=tag_ids[:2], status='published'),
+            self._item('Hello world', tag_ids=[tag_ids[2]]),
+        ] + [self._item(f'Imported {i}', tag_ids=tag_ids, status='published') for i in range(20)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 22)
+        # Reference checks, slugs, posts, tag links, search index, related-posts queue, savepoints: not per post
+        self.assertLessEqual(len(queries), 11)
+        self.assertEqual(RelatedPostUpdate.objects.count(), 21)
+
+        first, second = response.data['results'][:2]
+        self.assertEqual((first['slug'], second['slug']), ('hello-world-2', 'hello-world-3'))
+        post = Post.objects.get(pk=first['id'])
+        self.assertEqual(post.category, self.category)
+        self.assertEqual(sorted(post.tags.values_list('pk', flat=True)), tag_ids[:2])
+        self.assertIsNotNone(post.published_at)
+        self.assertEqual(Post.objects.get(pk=second['id']).status, 'draft')
+        self.assertEqual(Post.objects.filter(tags=self.tags[0]).count(), 21)
+
+        # Indexed for search even though no post_save signal fired
+        search = self.client.get(reverse('post-search'), {'q': 'imported', 'page_size': 50})
+        self.assertEqual(len(search.data['results']), 20)
+
+    def test_invalid_items_are_reported_by_position_and_nothing_is_written(self):
+        payload = [
+            self._item('Fine'),
+            self._item('Bad category', category_id=999999),
+            self._item('Bad tags', tag_ids=[self.tags[0].pk, 888888]),
+            {'content': 'no title'},
+        ]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('category_id', errors[1])
+        self.assertIn('888888', str(errors[2]['tag_ids']))
+        self.assertIn('title', errors[3])
+        self.assertFalse(Post.objects.filter(title='Fine').exists())
+
+    def test_bulk_route_does_not_shadow_a_post_slugged_bulk(self):
+        post = Post.objects.create(title='Bulk', content='x', excerpt='e', author=self.user.author_profile,
+                                   status='published')
+        self.assertEqual(self.client.get(reverse('post-detail', args=[post.slug])).data['title'], 'Bulk')
+
+    def test_taxonomy_version_moves_only_once_the_posts_commit(self):
+        version = get_taxonomy_version()
+        payload = [self._item('Tagged', tag_ids=[self.tags[0].pk], status='published')]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 201)
+            self.assertEqual(get_taxonomy_version(), version)
+        self.assertNotEqual(get_taxonomy_version(), version)
+
+    def test_rejects_non_list_and_single_create_checks_references(self):
+        self.assertEqual(self.client.post(self.url, self._item('x'), format='json').status_code, 400)
+        response = self.client.post(reverse('post-list'), self._item('Single', category_id=999999), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category_id', response.data)
+
+
+class ExportImportTests(PostsAPITestCase):
+    def test_round_trip_through_jsonl(self):
+        author = User.objects.create_user(username='exporter', password='pass12345').author_profile
+        category = Category.objects.create(name='Tech')
+        tag = Tag.objects.create(name='Python', category=category)
+        posts = make_posts(author, 3)
+        Post.objects.filter(pk=posts[0].pk).update(category=category)
+        posts[0].tags.set([tag])
+        Post.objects.filter(pk=posts[1].pk).update(content='<p>Ünïcödé</p>')
+
+        path = os.path.join(tempfile.mkdtemp(), 'posts.jsonl.gz')
+        self.addCleanup(os.remove, path)
+        call_command('export_posts', path, chunk_size=2, stderr=io.StringIO())
+        with gzip.open(path, 'rt', encoding='utf-8') as exported:
+            records = [json.loads(line) for line in exported]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]['tags'], [{'slug': 'python', 'name': 'Python', 'category': 'tech'}])
+        self.assertEqual(records[1]['content'], '<p>Ünïcödé</p>')
+
+        before = list(Post.objects.order_by('pk').values('slug', 'title', 'created_at', 'published_at', 'category__slug'))
+        Post.objects.all().delete()
+        Category.objects.all().delete()
+        call_command('import_posts', path, batch_size=2, stdout=io.StringIO())
+        call_command('import_posts', path, batch_size=2, stdout=io.StringIO())  # re-import updates in place
+
+        after = list(Post.objects.order_by('pk').values('slug', 'title', 'created_at', 'published_at', 'category__slug'))
+        self.assertEqual(after, before)
+        imported = Post.objects.get(slug=records[0]['slug'])
+        self.assertEqual(list(imported.tags.values_list('slug', flat=True)), ['python'])
+        self.assertEqual(imported.author, author)
+        self.assertEqual(Post.objects.get(slug=records[1]['slug']).content, '<p>Ünïcödé</p>')
+
+        # Cached details are dropped once each batch commits, not before
+        url = reverse('post-detail', args=[records[0]['slug']])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_posts', path, batch_size=2, stdout=io.StringIO())
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+
+class GenerateDatasetTests(PostsAPITestCase):
+    def test_seeded_runs_are_reproducible(self):
+        def generate(prefix):
+            call_command(
+                'generate_dataset', users=3, posts=40, batch_size=15, distinct_bodies=4, body_kb=2,
+                prefix=prefix, until=datetime.date(2026, 1, 31), stdout=io.StringIO(),
+            )
+            posts = Post.objects.filter(slug__startswith=f'{prefix}-').order_by('slug')
+            return [
+                (p.slug.split('-', 1)[1], p.title, p.status, p.created_at, p.content, sorted(t.name for t in p.tags.all()))
+                for p in posts.prefetch_related('tags')
+            ]
+
+        first = generate('one')
+        self.assertEqual(len(first), 40)
+        self.assertEqual(first, generate('two'))
+        self.assertTrue(all(row[3].date() <= datetime.date(2026, 1, 31) for row in first))
+        self.assertEqual(User.objects.filter(username__startswith='one-').count(), 3)
+        self.assertTrue(all(post.author_id for post in Post.objects.all()))
+        # Posts created afterwards in the same process still get stamped with now()
+        before = timezone.now()
+        later = Post.objects.create(title='Later', content='<p>Hi</p>', author=Post.objects.first().author)
+        self.assertGreaterEqual(later.created_at, before)
+
+
+class BenchmarkAPITests(APITransactionTestCase):
+    # Worker threads use their own connections, so the data has to be committed
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        view_counter.discard()
+
+    def test_reports_and_flags_regressions_against_baseline(self):
+        make_posts(User.objects.create_user('bench', password='pw').author_profile, 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            results = os.path.join(tmp, 'results.json')
+            call_command(
+                'benchmark_api', scenarios=['post-list', 'post-detail'], requests=5, warmup=1,
+                concurrency=1, output=results, stdout=io.StringIO(),
+            )
+            with open(results) as f:
+                report = json.load(f)
+            detail = report['scenarios']['post-detail']
+            self.assertEqual(detail['requests'], 5)
+            self.assertEqual(detail['errors'], 0)
+            self.assertLessEqual(detail['p50_ms'], detail['p99_ms'])
+            self.assertGreater(detail['queries_per_request'], 0)
+
+            # A baseline that was much faster and used fewer queries
+            for result in report['scenarios'].values():
+                result.update(p95_ms=0.001, queries_per_request=0)
+            baseline = os.path.join(tmp, 'baseline.json')
+            with open(baseline, 'w') as f:
+                json.dump(report, f)
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark_api', scenarios=['post-detail'], requests=3, warmup=0, concurrency=1,
+                    output=results, baseline=baseline, fail_on_regression=True, stdout=io.StringIO(),
+                )
+
+            # A run with no samples reports empty stats instead of crashing
+            call_command(
+                'benchmark_api', scenarios=['post-detail'], requests=0, warmup=0, concurrency=1,
+                output=results, baseline=baseline, fail_on_regression=True, stdout=io.StringIO(),
+            )
+            with open(results) as f:
+                empty = json.load(f)['scenarios']['post-detail']
+            self.assertEqual((empty['requests'], empty['p95_ms'], empty['throughput_rps']), (0, None, None))
+
+    def test_login_fixtures_are_opt_in_and_removed_afterwards(self):
+        make_posts(User.objects.create_user('bench', password='pw').author_profile, 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            results = os.path.join(tmp, 'results.json')
+            with self.assertRaises(CommandError):
+                call_command('benchmark_api', scenarios=['auth-login'], output=results, stdout=io.StringIO())
+
+            call_command(
+                'benchmark_api', scenarios=['auth-login', 'my-posts'], requests=2, warmup=0, concurrency=1,
+                output=results, create_fixtures=True, stdout=io.StringIO(),
+            )
+            with open(results) as f:
+                scenarios = json.load(f)['scenarios']
+        self.assertEqual(scenarios['auth-login']['status_codes'], {'200': 2})
+        self.assertEqual(scenarios['my-posts']['status_codes'], {'200': 2})
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['bench'])
+        self.assertFalse(Token.objects.exists())
+
+
+class TaxonomySyncTests(PostsAPITestCase):
+    def write_taxonomy(self, data):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w') as f:
+            json.dump(data, f)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_sync_creates_updates_and_is_idempotent(self):
+        design = Category.objects.create(name='Design')
+        Tag.objects.create(name='python', category=design)
+        Tag.objects.create(name='Untouched')
+        path = self.write_taxonomy({'categories': [
+            {'name': 'Programming', 'tags': ['Python', {'name': 'Next.js', 'slug': 'nextjs'}]},
+            {'name': 'Design', 'tags': ['Typography']},
+        ]})
+
+        out = io.StringIO()
+        call_command('setup_blog_data', path, dry_run=True, stdout=out)
+        self.assertIn('+ category programming "Programming"', out.getvalue())
+        self.assertIn('~ tag python: "python" -> "Python", category design -> programming', out.getvalue())
+        self.assertFalse(Category.objects.filter(slug='programming').exists())
+
+        version = get_taxonomy_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('setup_blog_data', path, stdout=io.StringIO())
+            # Bumped on commit, so no read can cache the old tree under the new version
+            self.assertEqual(get_taxonomy_version(), version)
+        self.assertNotEqual(get_taxonomy_version(), version)
+        python = Tag.objects.get(slug='python')
+        self.assertEqual((python.name, python.category.slug), ('Python', 'programming'))
+        self.assertEqual(Tag.objects.get(slug='nextjs').category.slug, 'programming')
+        self.assertEqual(Tag.objects.get(slug='typography').category_id, design.pk)
+        self.assertTrue(Tag.objects.filter(slug='untouched').exists())
+
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('setup_blog_data', path, stdout=out)
+        self.assertEqual(len(queries), 2)
+        self.assertIn('already up to date', out.getvalue())
+
+    def test_renames_drop_cached_post_details(self):
+        design = Category.objects.create(name='design')
+        author = User.objects.create_user('writer', password='pw').author_profile
+        post = Post.objects.create(title='Fonts', content='x', excerpt='e', author=author,
+                                   category=design, status='published')
+        post.tags.add(Tag.objects.create(name='typography', category=design))
+        url = reverse('post-detail', args=[post.slug])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        path = self.write_taxonomy({'categories': [{'name': 'Design', 'tags': ['Typography']}]})
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('setup_blog_data', path, stdout=io.StringIO())
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['category']['name'], 'Design')
+        self.assertEqual([tag['name'] for tag in response.json()['tags']], ['Typography'])
+
+    def test_duplicate_tag_is_rejected(self):
+        path = self.write_taxonomy({'categories': [
+            {'name': 'One', 'tags': ['Python']}, {'name': 'Two', 'tags': ['Python']},
+        ]})
+        with self.assertRaises(CommandError):
+            call_command('setup_blog_data', path, stdout=io.StringIO())
+
+    def test_default_files_load(self):
+        call_command('setup_blog_data', stdout=io.StringIO())
+        self.assertEqual(Category.objects.count(), 5)
+        self.assertEqual(Tag.objects.count(), 50)
+
+
+class RelatedPostsTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user('writer', password='pw').author_profile
+        topics = {
+            'django-orm': 'Django ORM queries and database indexes',
+            'django-cache': 'Caching Django querysets and database indexes',
+            'pasta': 'Fresh pasta recipes with tomato sauce',
+            'pizza': 'Pizza dough recipes and tomato sauce',
+        }
+        self.posts = {}
+        for slug, title in topics.items():
+            self.posts[slug] = Post.objects.create(
+                title=title, slug=slug, excerpt=title, content=f'<h1>{title}</h1><p>{title}</p>',
+                author=self.author, status='published',
+            )
+        Post.objects.create(title='Django database draft', slug='draft', excerpt='Django database',
+                            content='<p>Django database indexes</p>', author=self.author)
+
+    def related_slugs(self, slug):
+        response = self.client.get(reverse('post-related', args=[slug]))
+        self.assertEqual(response.status_code, 200)
+        return [item['slug'] for item in response.json()['results']]
+
+    def test_endpoint_serves_precomputed_neighbours(self):
+        related.rebuild_related_posts()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.related_slugs('django-orm')[0], 'django-cache')
+        self.assertEqual(self.related_slugs('pasta')[0], 'pizza')
+        self.assertNotIn('draft', self.related_slugs('django-cache'))
+        self.assertEqual(self.client.get(reverse('post-related', args=['missing'])).status_code, 404)
+
+    def queued(self):
+        return set(RelatedPostUpdate.objects.values_list('post_id', flat=True))
+
+    def test_saving_a_post_queues_updates_for_the_worker(self):
+        related.rebuild_related_posts()
+        post = Post.objects.create(
+            title='Django ORM database indexes', slug='django-indexes', excerpt='Django ORM database indexes',
+            content='<p>Django ORM queries database indexes</p>', author=self.author, status='published',
+        )
+        self.assertEqual(self.queued(), {post.pk})
+        call_command('update_related_posts', stdout=io.StringIO())
+        self.assertEqual(self.queued(), set())
+        self.assertIn('django-indexes', self.related_slugs('django-orm'))
+        self.assertEqual(self.related_slugs('django-indexes')[0], 'django-orm')
+
+        self.posts['pizza'].delete()
+        related.process_queue()
+        self.assertNotIn('pizza', self.related_slugs('pasta'))
+
+    def test_only_saves_that_can_change_a_list_are_queued(self):
+        RelatedPostUpdate.objects.all().delete()
+        draft = Post.objects.get(slug='draft')
+        draft.content = '<p>Rewritten draft</p>'
+        draft.save()
+        post = Post.objects.get(pk=self.posts['pasta'].pk)
+        post.content  # decompressed by the read; still unchanged
+        post.view_count = 10
+        post.save()
+        Post.objects.summary().get(pk=post.pk).save()
+        self.assertEqual(self.queued(), set())
+
+        post.excerpt = 'Fresh pasta'
+        post.save()
+        draft.status = 'published'
+        draft.save()
+        self.assertEqual(self.queued(), {post.pk, draft.pk})
+
+
+class TrendingPostsTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create_user('writer', password='pw').author_profile
+        self.old_hit, self.fresh, self.draft = make_posts(author, 3)
+        Post.objects.filter(pk=self.draft.pk).update(status='draft')
+        self.now = timezone.now()
+
+    def add_views(self, post, views, hours_ago):
+        PostViewBucket.objects.create(
+            post=post, views=views, bucket_start=trending.bucket_start(self.now - timedelta(hours=hours_ago)),
+        )
+
+    def test_feed_does_not_shadow_a_post_slugged_trending(self):
+        post = make_posts(self.old_hit.author, 1)[0]
+        Post.objects.filter(pk=post.pk).update(slug='trending')
+        self.assertEqual(self.client.get(reverse('post-detail', args=['trending'])).data['id'], post.pk)
+
+    def test_flushed_views_accumulate_in_the_current_bucket(self):
+        view_counter.record(self.fresh.pk, 2)
+        view_counter.flush()
+        view_counter.record(self.fresh.pk, 3)
+        view_counter.flush()
+        self.assertEqual(
+            list(PostViewBucket.objects.values_list('post_id', 'views')), [(self.fresh.pk, 5)],
+        )
+
+        # Views of a post deleted before the flush are dropped, not retried forever
+        view_counter.record(self.draft.pk)
+        self.draft.delete()
+        view_counter.flush()
+        self.assertEqual(view_counter.pending(), {})
+
+    def test_scores_decay_and_feed_is_materialized(self):
+        self.add_views(self.old_hit, 20, hours_ago=72)
+        self.add_views(self.fresh, 5, hours_ago=1)
+        self.add_views(self.draft, 100, hours_ago=1)
+        self.add_views(self.fresh, 1000, hours_ago=24 * 30)  # outside the window
+
+        self.assertEqual(trending.update_trending(self.now), 2)
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('rank', 'post_id')),
+            [(1, self.fresh.pk), (2, self.old_hit.pk)],
+        )
+        self.assertFalse(PostViewBucket.objects.filter(views=1000).exists())
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('post-trending'), {'page_size': 1})
+        body = response.json()
+        self.assertEqual([item['slug'] for item in body['results']], [self.fresh.slug])
+        self.assertGreater(body['results'][0]['score'], 4)
+        self.assertIsNotNone(body['next'])
+        page_two = self.client.get(body['next']).json()
+        self.assertEqual([item['slug'] for item in page_two['results']], [self.old_hit.slug])
+        self.assertIsNone(page_two['next'])
+
+
+def fake_async_client(reply=None, error=None, deltas=None):
+    """Stand-in for ai_agent.async_client() that answers (or fails) without a network call."""
+    async def stream():
+        for delta in deltas:
+            if isinstance(delta, Exception):
+                raise delta
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def create(**kwargs):
+        if error is not None:
+            raise error
+        if kwargs.get('stream'):
+            return stream()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def rate_limit_error(**headers):
+    """The openai.RateLimitError a 429 from the AI API raises (header names with _ for -)."""
+    request = httpx.Request('POST', ai_agent.GROQ_BASE_URL + '/chat/completions')
+    response = httpx.Response(429, request=request, headers={k.replace('_', '-'): v for k, v in headers.items()})
+    return openai.RateLimitError('Error code: 429 - Rate limit reached', response=response, body=None)
+
+
+def parse_sse(body):
+    """[(event, data)] from a text/event-stream body."""
+    events = []
+    for block in body.decode('utf-8').strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class AsyncAIViewTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('writer', password='pw')
+        patcher = mock.patch.object(ai_agent, 'api_key', 'test-key')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_client(self, **kwargs):
+        patcher = mock.patch.object(ai_agent, 'async_client', lambda: fake_async_client(**kwargs))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_event_loop_gets_its_own_async_client(self):
+        # Under WSGI every async view call runs in a new loop (async_to_sync)
+        async def clients():
+            return ai_agent.async_client(), ai_agent.async_client()
+
+        first, again = async_to_sync(clients)()
+        self.assertIs(first, again)
+        second, _ = async_to_sync(clients)()
+        self.assertIsNot(first, second)
+
+    def test_generate_parses_the_async_completion(self):
+        self.use_client(reply='TITLE: Space\nEXCERPT: Stars.\nCODE: <section><p>Hi</p></section>')
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('generate-ai-content'), {'requirement': 'space'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Space')
+        self.assertEqual(response.json()['generated_code'], '<section><p>Hi</p></section>')
+
+        response = self.client.post(reverse('refine-text'), {'text_snippet': 'x', 'command': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.client.get(reverse('refine-text')).status_code, 200)
+
+    def test_errors_and_authentication(self):
+        self.use_client(error=rate_limit_error(retry_after='7'))
+        body = {'text_snippet': 'Some text', 'command': 'simplify'}
+        self.assertEqual(self.client.post(reverse('refine-text'), body, format='json').status_code, 401)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('refine-text'), body, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['retry_after_seconds'], 7)
+        self.assertEqual(response['Retry-After'], '7')
+
+
+class AIStreamTests(PostsAPITestCase):
+    reply = 'TITLE: Space\nEXCERPT: Stars and more.\nCODE:\n<section class="h-screen"><p>Hi</p></section>'
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=User.objects.create_user('writer', password='pw'))
+        patcher = mock.patch.object(ai_agent, 'api_key', 'test-key')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def stream(self, deltas=None, error=None):
+        # The async client consumes the event stream the way an ASGI server does
+        with mock.patch.object(ai_agent, 'async_client', lambda: fake_async_client(deltas=deltas, error=error)):
+            response = await self.async_client.post(
+                reverse('generate-ai-content') + '?stream=true', {'requirement': 'space'},
+                content_type='application/json', headers={'Authorization': f'Token {self.token.key}'},
+            )
+            if response.streaming:
+                response.body = b''.join([chunk async for chunk in response])
+        return response
+
+    def test_parser_emits_each_part_as_soon_as_it_is_complete(self):
+        parser = ai_stream.BlogStreamParser()
+        events = [[event for event, _ in parser.feed(ch)] for ch in self.reply]
+        # The title goes out on the last character of "EXCERPT:", the excerpt on the ":" of "CODE:"
+        self.assertEqual(events[self.reply.index('EXCERPT:') + 7], ['title'])
+        self.assertEqual(events[self.reply.index('CODE:') + 4], ['excerpt'])
+        self.assertEqual(events[self.reply.index('<')], ['html'])
+        self.assertEqual(sum(1 for e in events if e == ['html']), len(self.reply) - self.reply.index('<'))
+
+    async def test_streams_sse_events_then_the_sanitized_document(self):
+        deltas = [self.reply[i:i + 7] for i in range(0, len(self.reply), 7)]
+        response = await self.stream(deltas)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = parse_sse(response.body)
+        self.assertEqual(events[0], ('title', {'title': 'Space'}))
+        self.assertEqual(events[1], ('excerpt', {'excerpt': 'Stars and more.'}))
+        html = ''.join(data['chunk'] for event, data in events if event == 'html')
+        self.assertEqual(html, '<section class="h-screen"><p>Hi</p></section>')
+        self.assertEqual(events[-1], ('done', {
+            'title': 'Space', 'excerpt': 'Stars and more.',
+            'generated_code': '<section class=""><p>Hi</p></section>',
+        }))
+
+    async def test_errors_before_and_during_the_stream(self):
+        response = await self.stream(error=rate_limit_error())
+        self.assertEqual(response.status_code, 429)
+
+        response = await self.stream(['TITLE: Space\nEXCERPT: x', Exception('connection reset')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(parse_sse(response.body)[-1], ('error', {'error': 'connection reset'}))
+
+
+class AICompletionCacheTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+
+        def create(**kwargs):
+            self.calls.append(kwargs)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f'reply {len(self.calls)}'))])
+
+        for patcher in (
+            mock.patch.object(ai_agent, 'api_key', 'test-key'),
+            mock.patch.object(ai_agent, 'client', SimpleNamespace(
+                chat=SimpleNamespace(completions=SimpleNamespace(create=create)),
+            )),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        self.assertEqual(ai_agent.refine_text_snippet('Some text', 'simplify'), 'reply 1')
+        with self.assertNumQueries(2):
+            self.assertEqual(ai_agent.refine_text_snippet('Some text', 'simplify'), 'reply 1')
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(AICompletion.objects.get().hits, 1)
+
+        # Any change to the messages is a different key; cache=False always goes upstream
+        self.assertEqual(ai_agent.refine_text_snippet('Some text', 'professional'), 'reply 2')
+        self.assertEqual(ai_agent.refine_text_snippet('Some text', 'simplify', cache=False), 'reply 3')
+        counters = metrics.snapshot()['counters']
+        self.assertEqual((counters['ai_cache.hits'], counters['ai_cache.misses']), (1, 2))
+
+        with override_settings(AI_CACHE_ENABLED=False):
+            ai_agent.refine_text_snippet('Some text', 'simplify')
+        self.assertEqual(len(self.calls), 4)
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=2, AI_CACHE_TTL=3600)
+    def test_entries_expire_and_least_recently_used_are_evicted(self):
+        now = timezone.now()
+        for i, key in enumerate(['old', 'used', 'new']):
+            ai_cache.set_completion(key, 'model', key)
+            AICompletion.objects.filter(key=key).update(last_used_at=now + timedelta(seconds=i))
+        self.assertEqual(set(AICompletion.objects.values_list('key', flat=True)), {'used', 'new'})
+
+        AICompletion.objects.filter(key='used').update(created_at=now - timedelta(hours=2))
+        self.assertIsNone(ai_cache.get_completion('used'))
+        self.assertEqual(ai_cache.get_completion('new'), 'new')
+        self.assertEqual(ai_cache.evict(), 1)
+        self.assertEqual(list(AICompletion.objects.values_list('key', flat=True)), ['new'])
+
+    def test_views_can_opt_out(self):
+        self.client.force_authenticate(User.objects.create_user('writer', password='pw'))
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='Simpler.'))])
+
+        fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        body = {'text_snippet': 'Some text', 'command': 'simplify'}
+        with mock.patch.object(ai_agent, 'async_client', lambda: fake):
+            for extra in ({}, {}, {'cache': False}):
+                response = self.client.post(reverse('refine-text'), dict(body, **extra), format='json')
+                self.assertEqual(response.json()['refined_text'], 'Simpler.')
+        self.assertEqual(len(calls), 2)
+
+
+def fake_sync_client(*replies):
+    """Stand-in for ai_agent.client; each call returns (or raises) the next reply."""
+    replies = list(replies)
+
+    def create(**kwargs):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@override_settings(AI_CACHE_ENABLED=False, AI_JOB_MAX_ATTEMPTS=2)
+class AIJobTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('writer', password='pw')
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch.object(ai_agent, 'api_key', 'test-key')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, **body):
+        return self.client.post(reverse('ai-job-create'), body, format='json')
+
+    def work(self, *replies):
+        with mock.patch.object(ai_agent, 'client', fake_sync_client(*replies)):
+            job = ai_jobs.claim_job('test-worker')
+            ai_jobs.run_job(job)
+        return job
+
+    def test_submit_is_validated_and_idempotent_by_request_key(self):
+        self.assertEqual(self.submit(kind='translate').status_code, 400)
+        self.assertEqual(self.submit(kind='refine', text_snippet='Hi').status_code, 400)
+
+        first = self.submit(kind='refine', text_snippet=' Hi ', command='simplify', request_key='k1')
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.json()['status'], 'queued')
+        self.assertTrue(first['Location'].endswith(reverse('ai-job-detail', args=[first.json()['id']])))
+        again = self.client.post(
+            reverse('ai-job-create'), {'kind': 'refine', 'text_snippet': 'Hi', 'command': 'simplify'},
+            format='json', headers={'Idempotency-Key': 'k1'},
+        )
+        self.assertEqual((again.status_code, again.json()['id']), (200, first.json()['id']))
+        self.assertEqual(AIJob.objects.get().params, {'text_snippet': 'Hi', 'command': 'simplify'})
+
+        # Keys are per user, and other users cannot see the job
+        self.client.force_authenticate(User.objects.create_user('other', password='pw'))
+        self.assertEqual(self.client.get(first['Location']).status_code, 404)
+        self.assertEqual(self.submit(kind='refine', text_snippet='Hi', command='simplify', request_key='k1').status_code, 202)
+
+    def test_malformed_submissions_are_rejected(self):
+        url = reverse('ai-job-create')
+        self.assertEqual(self.client.post(url, [{'kind': 'refine'}], format='json').status_code, 400)
+        self.assertEqual(self.submit(kind=['refine'], text_snippet='Hi', command='simplify').status_code, 400)
+        self.assertEqual(self.submit(kind='refine', text_snippet=['Hi'], command='simplify').status_code, 400)
+        self.assertFalse(AIJob.objects.exists())
+
+    def test_worker_runs_job_and_result_can_be_polled(self):
+        job_id = self.submit(kind='generate', requirement='space').json()['id']
+        self.work('TITLE: Space\nEXCERPT: Stars.\nCODE: <p>Hi</p>')
+        body = self.client.get(reverse('ai-job-detail', args=[job_id])).json()
+        self.assertEqual(body['status'], 'succeeded')
+        self.assertEqual(body['result'], {'title': 'Space', 'excerpt': 'Stars.', 'generated_code': '<p>Hi</p>'})
+        self.assertEqual(body['attempts'], 1)
+        self.assertIsNone(ai_jobs.claim_job('test-worker'))
+
+    def test_rate_limited_jobs_are_retried_then_failed(self):
+        job_id = self.submit(kind='refine', text_snippet='Hi', command='simplify').json()['id']
+        self.work(rate_limit_error(retry_after='30'))
+        job = AIJob.objects.get(id=job_id)
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        self.assertIsNone(ai_jobs.claim_job('test-worker'))
+
+        AIJob.objects.filter(id=job_id).update(run_after=timezone.now())
+        self.work(rate_limit_error())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIn('429', job.error)
+
+    def test_jobs_abandoned_by_a_dead_worker_are_claimed_again(self):
+        job_id = self.submit(kind='refine', text_snippet='Hi', command='simplify').json()['id']
+        self.assertIsNotNone(ai_jobs.claim_job('dead-worker'))
+        self.assertIsNone(ai_jobs.claim_job('test-worker'))
+
+        later = timezone.now() + timedelta(seconds=ai_jobs.DEFAULT_LEASE_SECONDS + 1)
+        job = ai_jobs.claim_job('test-worker', now=later)
+        self.assertEqual((job.id, job.attempts, job.locked_by), (uuid.UUID(job_id), 2, 'test-worker'))
+        # The dead worker's late result is discarded
+        stale = AIJob(id=job.id, locked_by='dead-worker')
+        self.assertEqual(ai_jobs._finish(stale, status='succeeded'), 0)
+
+
+class AIWorkerCommandTests(APITransactionTestCase):
+    # Worker threads use their own connections, so the data has to be committed
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        ai_ratelimit.limiter.reset()
+
+    @override_settings(AI_CACHE_ENABLED=False)
+    def test_burst_mode_drains_the_queue(self):
+        user = User.objects.create_user('writer', password='pw')
+        for i in range(5):
+            ai_jobs.submit_job(user, 'refine', {'text_snippet': f'Text {i}', 'command': 'simplify'})
+        with mock.patch.object(ai_agent, 'api_key', 'test-key'), \
+                mock.patch.object(ai_agent, 'client', fake_sync_client(*['Done.'] * 5)):
+            call_command('run_ai_worker', concurrency=3, burst=True, stdout=io.StringIO())
+        self.assertEqual(set(AIJob.objects.values_list('status', flat=True)), {'succeeded'})
+        self.assertEqual(metrics.snapshot()['counters']['ai_jobs.succeeded'], 5)
+
+
+class LoadTestAITests(APITransactionTestCase):
+    # The ASGI app runs sync views in other threads, so the data has to be committed
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        view_counter.discard()
+
+    def test_reads_are_timed_while_ai_calls_are_in_flight(self):
+        make_posts(User.objects.create_user('bench', password='pw').author_profile, 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            results = os.path.join(tmp, 'results.json')
+            with self.assertRaises(CommandError):
+                call_command('loadtest_ai', output=results, stdout=io.StringIO())
+            call_command(
+                'loadtest_ai', ai_requests=20, llm_latency=2, read_requests=10, warmup=2,
+                scenarios=['post-detail'], tolerance=100, output=results, create_fixtures=True,
+                stdout=io.StringIO(),
+            )
+            with open(results) as f:
+                report = json.load(f)
+        self.assertEqual(report['ai']['status_codes'], {'200': 20})
+        self.assertEqual(report['ai']['peak_in_flight'], 20)
+        self.assertEqual(report['reads_under_ai_load']['requests'], 10)
+        self.assertEqual(report['reads_under_ai_load']['errors'], 0)
+        # The temporary user and its token are gone
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['bench'])
+        self.assertFalse(Token.objects.exists())
+
+
+@override_settings(AI_CACHE_ENABLED=False, AI_RATE_LIMIT_RPM=None, AI_RATE_LIMIT_TPM=600,
+                   AI_RATE_LIMIT_MAX_WAIT=2, AI_RATE_LIMIT_COMPLETION_TOKENS=0)
+class AIRateLimiterTests(PostsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.limiter = ai_ratelimit.limiter
+        patcher = mock.patch.object(ai_agent, 'api_key', 'test-key')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_calls_wait_briefly_for_budget_and_longer_waits_are_refused(self):
+        # 600 tokens per minute refill at 10 per second
+        self.assertEqual(self.limiter.acquire(600), 0)
+        started = time.monotonic()
+        self.assertEqual(self.limiter.acquire(5), 0)
+        self.assertGreater(time.monotonic() - started, 0.4)
+        self.assertEqual(metrics.snapshot()['counters']['ai_ratelimit.waits'], 1)
+
+        started = time.monotonic()
+        self.assertAlmostEqual(self.limiter.acquire(600), 60, delta=1)
+        self.assertLess(time.monotonic() - started, 0.1)
+
+        # Refused calls never reach the API and carry the wait as retry_after
+        fake = fake_sync_client()
+        with mock.patch.object(ai_agent, 'client', fake), \
+                self.assertRaises(ai_agent.AIAgentRateLimitError) as raised:
+            ai_agent.refine_text_snippet('x' * 4000, 'simplify')
+        self.assertGreater(raised.exception.retry_after, 50)
+
+    def test_usage_replaces_the_estimate(self):
+        self.assertEqual(self.limiter.acquire(500), 0)
+        self.limiter.settle(500, 20, time.time())
+        self.assertEqual(self.limiter.acquire(550), 0)
+
+        # Unless a remaining-tokens header has already accounted for the call
+        started = time.time()
+        self.limiter.observe({'x-ratelimit-remaining-tokens': '10'})
+        self.limiter.settle(550, 20, started)
+        self.assertGreater(self.limiter.acquire(100), 5)
+
+    def test_limits_are_learned_from_response_headers(self):
+        self.assertEqual(ai_ratelimit.parse_duration('2m59.5s'), 179.5)
+        self.assertEqual(ai_ratelimit.parse_duration('120ms'), 0.12)
+        self.assertEqual(ai_ratelimit.parse_duration('7'), 7)
+
+        self.limiter.observe({'x-ratelimit-limit-tokens': '120', 'x-ratelimit-remaining-tokens': '100'})
+        self.assertEqual(self.limiter.acquire(100), 0)
+        # 120 per minute now, so the next 60 tokens are 30 seconds away
+        self.assertAlmostEqual(self.limiter.acquire(60), 30, delta=1)
+
+        self.limiter.reset()
+        self.limiter.observe({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '1m30s'})
+        self.assertAlmostEqual(self.limiter.acquire(1), 90, delta=1)
+
+    def test_upstream_429_returns_structured_retry_after(self):
+        self.client.force_authenticate(User.objects.create_user('writer', password='pw'))
+        error = rate_limit_error(x_ratelimit_remaining_tokens='0', x_ratelimit_reset_tokens='7.66s')
+        with mock.patch.object(ai_agent, 'async_client', lambda: fake_async_client(error=error)):
+            response = self.client.post(
+                reverse('refine-text'), {'text_snippet': 'Some text', 'command': 'simplify'}, format='json',
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['retry_after_seconds'], 8)
+        self.assertEqual(response['Retry-After'], '8')
+        self.assertEqual(metrics.snapshot()['counters']['ai_ratelimit.upstream_429'], 1)
+
+    @override_settings(AI_RATE_LIMIT_SHARED=True, AI_RATE_LIMIT_RPM=1)
+    def test_shared_budget_spans_limiters(self):
+        # Two limiters stand in for two worker processes using the same cache
+        other = ai_ratelimit.TokenBucketLimiter()
+        self.assertEqual(self.limiter.acquire(1), 0)
+        self.assertAlmostEqual(other.acquire(1), 60, delta=1)
@@ -0,0 +1,57 @@
+# posts/transfer.py
+# Shared pieces of the export_posts / import_posts JSONL format.
+#
+# One JSON object per line, one post per object:
+#   {"slug", "title", "content", "excerpt", "is_html", "graphical_content",
+#    "cover_image", "status", "created_at", "updated_at", "published_at",
+#    "view_count",
+#    "author": "<username>" | null,
+#    "category": {"slug", "name"} | null,
+#    "tags": [{"slug", "name", "category": "<category slug>" | null}, ...]}
+# HTML bodies are written decompressed, so files are portable between
+# databases and compression settings. Paths ending in .gz are gzipped.
+import contextlib
+import gzip
+import time
+
+POST_FIELDS = (
+    'slug', 'title', 'content', 'excerpt', 'is_html', 'graphical_content', 'cover_image',
+    'status', 'created_at', 'updated_at', 'published_at', 'view_count',
+)
+
+
+def open_stream(path, mode, standard_stream):
+    """
+    Open `path` for text reading ('r') or writing ('w'). '-' means
+    `standard_stream` (the command's stdin/stdout), which is left open.
+    """
+    if path == '-':
+        return contextlib.nullcontext(standard_stream)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Progress:
+    """Prints "<verb> N posts (X rows/s)" at most every `interval` seconds, plus a final line."""
+
+    def __init__(self, write, verb, interval=2.0):
+        self.write = write
+        self.verb = verb
+        self.interval = interval
+        self.count = 0
+        self.started = self._last = time.perf_counter()
+
+    def add(self, count):
+        self.count += count
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.write(f'{self.verb} {self.count} posts ({self.rate():.0f} rows/s)')
+
+    def rate(self):
+        return self.count / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return f'{self.verb} {self.count} posts in {elapsed:.1f}s ({self.rate():.0f} rows/s)'
@@ -0,0 +1,107 @@
+# posts/trending.py
+# Trending posts: time-bucketed views, decayed scores, a materialized feed.
+#
+# Post.view_count is an all-time total, so the view counter also adds every
+# flushed batch to PostViewBucket rows (one per post per
+# TRENDING_BUCKET_SECONDS window) with a single upserting statement.
+#
+# `manage.py update_trending` runs periodically. It scores every post viewed
+# within TRENDING_WINDOW_HOURS as the sum of its bucket views, each halved
+# for every TRENDING_HALF_LIFE_HOURS of age, in one grouped query (the
+# per-bucket weights are constants in a CASE), writes the best
+# TRENDING_SIZE to TrendingPost by rank, and drops buckets older than the
+# window. TrendingPostsView then reads one page of TrendingPost by rank, so a
+# request never sorts posts.
+import datetime
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from . import metrics
+from .models import Post, PostViewBucket, TrendingPost
+
+DEFAULT_BUCKET_SECONDS = 60 * 60
+DEFAULT_HALF_LIFE_HOURS = 24
+DEFAULT_WINDOW_HOURS = 24 * 7
+DEFAULT_SIZE = 200
+
+
+def _bucket_seconds():
+    return getattr(settings, 'TRENDING_BUCKET_SECONDS', DEFAULT_BUCKET_SECONDS)
+
+
+def bucket_start(moment):
+    """Start of the bucket `moment` falls in (buckets are aligned to the Unix epoch)."""
+    seconds = _bucket_seconds()
+    timestamp = int(moment.timestamp()) // seconds * seconds
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def record_bucket_views(counts, moment=None):
+    """Add {post_id: views} to the current bucket of each post."""
+    if not counts:
+        return
+    bucket = connection.ops.adapt_datetimefield_value(bucket_start(moment or timezone.now()))
+    table = PostViewBucket._meta.db_table
+    # Same ON CONFLICT syntax on PostgreSQL and SQLite; bulk_create(update_conflicts=True)
+    # could only overwrite `views`, not add to it. Selecting from posts_post skips
+    # posts deleted since they were viewed instead of failing the whole flush.
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (post_id, bucket_start, views) "
+            f"SELECT id, %s, %s FROM {Post._meta.db_table} WHERE id = %s "
+            f"ON CONFLICT (post_id, bucket_start) DO UPDATE SET views = {table}.views + excluded.views",
+            [(bucket, views, post_id) for post_id, views in counts.items()],
+        )
+
+
+def bucket_weights(now):
+    """{bucket_start: decay factor} for every bucket in the window, weighed at its midpoint."""
+    seconds = _bucket_seconds()
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS) * 3600
+    window = getattr(settings, 'TRENDING_WINDOW_HOURS', DEFAULT_WINDOW_HOURS) * 3600
+    newest = bucket_start(now)
+    weights = {}
+    for age in range(0, window + seconds, seconds):
+        start = newest - datetime.timedelta(seconds=age)
+        midpoint_age = max((now - start).total_seconds() - seconds / 2, 0)
+        weights[start] = 0.5 ** (midpoint_age / half_life)
+    return weights
+
+
+def trending_scores(now=None, limit=None):
+    """[(post_id, score)] for published posts viewed within the window, best first."""
+    now = now or timezone.now()
+    weights = bucket_weights(now)
+    decay = Case(
+        *[When(bucket_start=start, then=Value(weight)) for start, weight in weights.items()],
+        default=Value(0.0), output_field=FloatField(),
+    )
+    rows = (
+        PostViewBucket.objects
+        .filter(bucket_start__gte=min(weights), post__status='published')
+        .values('post_id')
+        .annotate(score=Sum(F('views') * decay, output_field=FloatField()))
+        .order_by('-score', 'post_id')
+        .values_list('post_id', 'score')
+    )
+    return list(rows[:limit] if limit else rows)
+
+
+def update_trending(now=None):
+    """Recompute the materialized feed and prune expired buckets. Returns the feed size."""
+    now = now or timezone.now()
+    started = time.perf_counter()
+    scores = trending_scores(now, limit=getattr(settings, 'TRENDING_SIZE', DEFAULT_SIZE))
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create([
+            TrendingPost(rank=rank, post_id=post_id, score=score, computed_at=now)
+            for rank, (post_id, score) in enumerate(scores, start=1)
+        ])
+        PostViewBucket.objects.filter(bucket_start__lt=min(bucket_weights(now))).delete()
+    metrics.observe('trending.update_seconds', time.perf_counter() - started)
+    return len(scores)
@@ -1,8 +1,10 @@
 # posts/urls.py
 from django.urls import path
 from .views import (
-    PostListView, PostDetailView, ImageUploadView, AIAgentView,
-    GraphicalAIView, RefineTextView, EnhanceDesignView, EnhanceSectionView, MyPostsView, CategoryListView, TagListView
+    PostListView, PostBulkCreateView, PostDetailView, ImageUploadView, AIAgentView,
+    GraphicalAIView, RefineTextView, EnhanceDesignView, EnhanceSectionView, MyPostsView, CategoryListView, TagListView,
+    MetricsView, PostSearchView, TaxonomyView, PostRelatedView,
+    TrendingPostsView, AIJobCreateView, AIJobDetailView
 )
 from .auth_views import (
     UserRegistrationView,
@@ -16,7 +18,12 @@ from .auth_views import (
 urlpatterns = [
     # Post endpoints
     path('posts/', PostListView.as_view(), name='post-list'),
+    # Kept out of posts/<slug>/ so no post slug ("bulk", "trending") can be shadowed
+    path('posts-bulk/', PostBulkCreateView.as_view(), name='post-bulk-create'),
+    path('trending/', TrendingPostsView.as_view(), name='post-trending'),
+    path('search/', PostSearchView.as_view(), name='post-search'),
     path('posts/<slug:slug>/', PostDetailView.as_view(), name='post-detail'),
+    path('posts/<slug:slug>/related/', PostRelatedView.as_view(), name='post-related'),
     path('my-posts/', MyPostsView.as_view(), name='my-posts'),
     path('upload-image/', ImageUploadView.as_view(), name='upload-image'),
     path('generate-ai-content/', AIAgentView.as_view(), name='generate-ai-content'),
@@ -24,10 +31,16 @@ urlpatterns = [
     path('refine-text/', RefineTextView.as_view(), name='refine-text'),
     path('enhance-design/', EnhanceDesignView.as_view(), name='enhance-design'),
     path('enhance-section/', EnhanceSectionView.as_view(), name='enhance-section'),
+    path('ai-jobs/', AIJobCreateView.as_view(), name='ai-job-create'),
+    path('ai-jobs/<uuid:pk>/', AIJobDetailView.as_view(), name='ai-job-detail'),
     
     # Category and Tag endpoints
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('tags/', TagListView.as_view(), name='tag-list'),
+    path('taxonomy/', TaxonomyView.as_view(), name='taxonomy'),
+    
+    # Operational metrics (staff only)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     
     # Authentication endpoints
     path('auth/register/', UserRegistrationView.as_view(), name='user-register'),
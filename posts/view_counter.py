@@ -0,0 +1,127 @@
+# posts/view_counter.py
+# Write-behind counter for Post.view_count.
+#
+# Reads only bump an in-process buffer. The buffer is flushed in bulk with
+# `UPDATE ... SET view_count = view_count + n` (QuerySet.update, so auto_now
+# on updated_at is not triggered and no row is locked per read). A flush
+# happens when the buffer is older than VIEW_COUNT_FLUSH_INTERVAL seconds or
+# holds VIEW_COUNT_FLUSH_THRESHOLD views, and again at interpreter exit, so a
+# crashed worker loses at most one interval's worth of views. A flush that
+# fails (database down, lock timeout) is logged and its views are kept for
+# the next one; the read that triggered it is still answered.
+#
+# Each flush also adds the batch to the current PostViewBucket rows, which
+# feed the trending scores (posts/trending.py).
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10)
+
+    @property
+    def flush_threshold(self):
+        return getattr(settings, 'VIEW_COUNT_FLUSH_THRESHOLD', 500)
+
+    def record(self, post_id, amount=1):
+        """Buffer `amount` views of `post_id`, flushing if the buffer is due."""
+        with self._lock:
+            self._pending[post_id] += amount
+            self._buffered += amount
+            due = (
+                self._buffered >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # flush() has put the views back; the next due flush retries them
+                logger.exception('View count flush failed; keeping %d posts for the next flush', len(self.pending()))
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def discard(self):
+        """Drop buffered views without writing them (used by tests)."""
+        with self._lock:
+            self._pending.clear()
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write every buffered increment to the database. Returns the number of posts updated."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        # One UPDATE per distinct increment: most posts in a window share
+        # small counts, so this is a handful of statements per flush.
+        by_amount = defaultdict(list)
+        for post_id, amount in batch.items():
+            by_amount[amount].append(post_id)
+
+        from .models import Post
+        from .trending import record_bucket_views
+
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for amount, post_ids in by_amount.items():
+                    Post.objects.filter(pk__in=post_ids).update(view_count=F('view_count') + amount)
+                # Time-bucketed copy for the trending feed (posts/trending.py)
+                record_bucket_views(batch)
+        except Exception:
+            # Put the views back so the next flush retries them
+            with self._lock:
+                self._pending.update(batch)
+                self._buffered += sum(batch.values())
+            metrics.incr('view_counter.flush_errors')
+            raise
+
+        metrics.observe('view_counter.flush_seconds', time.perf_counter() - started)
+        metrics.observe('view_counter.batch_posts', len(batch))
+        metrics.incr('view_counter.views_flushed', sum(batch.values()))
+        return len(batch)
+
+
+view_counter = ViewCounter()
+
+
+def record_view(post_id):
+    view_counter.record(post_id)
+
+
+def flush_view_counts():
+    return view_counter.flush()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('View count flush on exit failed')
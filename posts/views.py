@@ -1,86 +1,78 @@
 # posts/views.py
-import re
 from rest_framework import generics, status
-from .models import Post, Category, Tag
-from .serializers import PostSerializer, CategorySerializer, TagSerializer
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from .models import AIJob, Post, Category, Tag
+from .serializers import PostSerializer, PostSummarySerializer, CategorySerializer, TagSerializer, AIJobSerializer
+from .pagination import PostCursorPagination, page_number_links
+from .filters import PostFilterBackend, facet_counts
+from .conditional import (
+    ConditionalGetMixin, make_validators, not_modified_response, set_validator_headers,
+)
+from . import cache as post_cache
+from . import ai_jobs
+from . import metrics
+from .view_counter import record_view
+from .search import search_post_ids, html_to_text, make_snippet
+from .fast_serializers import post_values, serialize_posts
+from .compression import decompress
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.urls import reverse
 from django.core.files.storage import default_storage
+from .async_views import AsyncAPIView
+from .ai_stream import stream_blog_response
 from .ai_agent import (
-    generate_blog_content,
-    generate_graphical_content,
-    refine_text_snippet,
-    enhance_blog_design,
-    enhance_section_design,
+    agenerate_blog_content,
+    agenerate_graphical_content,
+    arefine_text_snippet,
+    aenhance_blog_design,
+    aenhance_section_design,
+    parse_blog_response,
+    parse_graphical_response,
     REFINE_COMMANDS,
     AIAgentRateLimitError,
     AIAgentError,
 )
 
 
-def _extract_html(text):
-    """Extract HTML from AI response, handling missing markers."""
-    text = text.replace("```html", "").replace("```", "").strip()
-    # Try to find the HTML document
-    match = re.search(r'(<!DOCTYPE html[\s\S]*</html>)', text, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    # Fallback: find any block starting with <html or <body or <div
-    match = re.search(r'(<(?:html|body|div|section)[\s\S]*)', text, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return text
+def _rate_limited_response(exc, message):
+    """429 for an AIAgentRateLimitError, with Retry-After when the wait is known."""
+    payload = {"error": message, "detail": str(exc)}
+    if exc.retry_after is None:
+        return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    payload["retry_after_seconds"] = exc.retry_after
+    return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(exc.retry_after)})
+
+
+def _use_ai_cache(request):
+    """AI views reuse cached completions unless the body says "cache": false (e.g. "regenerate")."""
+    return request.data.get('cache', True) not in (False, 'false', '0')
 
 
 # posts/views.py
-class AIAgentView(APIView):
+# ?stream=true answers with server-sent events instead (posts/ai_stream.py)
+class AIAgentView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
+    stream_query_param = 'stream'
     
-    def post(self, request):
+    async def post(self, request):
         requirement = request.data.get('requirement')
         if not requirement:
             return Response({"error": "Requirement is required"}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            raw_ai_response = generate_blog_content(requirement)
-            
-            # Robust Parsing
-            title = ""
-            excerpt = ""
-            html_code = ""
-
-            # Extract Title
-            if "TITLE:" in raw_ai_response:
-                title_block = raw_ai_response.split("TITLE:")[1]
-                if "EXCERPT:" in title_block:
-                    title = title_block.split("EXCERPT:")[0].strip()
-                elif "CODE:" in title_block:
-                    title = title_block.split("CODE:")[0].strip()
-                else:
-                    # Title goes up to first newline or HTML tag
-                    title = re.split(r'\n|<', title_block)[0].strip()
-            
-            # Extract Excerpt
-            if "EXCERPT:" in raw_ai_response:
-                excerpt_block = raw_ai_response.split("EXCERPT:")[1]
-                if "CODE:" in excerpt_block:
-                    excerpt = excerpt_block.split("CODE:")[0].strip()
-                else:
-                    excerpt = re.split(r'\n\n|<', excerpt_block)[0].strip()
-            
-            if "CODE:" in raw_ai_response:
-                html_code = raw_ai_response.split("CODE:")[1].strip()
-            
-            # Fallback: if no html_code was extracted, detect HTML in full response
-            if not html_code:
-                html_code = _extract_html(raw_ai_response)
-                # If title grabbed the HTML, clean it
-                if title and '<!DOCTYPE' in title:
-                    title = re.split(r'\n|<!', title)[0].strip()
+            if request.query_params.get(self.stream_query_param) in ('1', 'true'):
+                return await stream_blog_response(requirement, cache=_use_ai_cache(request))
+
+            raw_ai_response = await agenerate_blog_content(requirement, cache=_use_ai_cache(request))
             
-            html_code = html_code.replace("```html", "").replace("```", "").strip()
+            title, excerpt, html_code = parse_blog_response(raw_ai_response)
 
             return Response({
                 "title": title,
@@ -89,63 +81,24 @@ class AIAgentView(APIView):
             }, status=status.HTTP_200_OK)
             
         except AIAgentRateLimitError as exc:
-            detail = str(exc)
-            retry_after = None
-
-            if "||retry_after=" in detail:
-                detail, retry_raw = detail.split("||retry_after=", 1)
-                try:
-                    retry_after = int(retry_raw)
-                except ValueError:
-                    retry_after = None
-
-            payload = {
-                "error": "AI service is currently rate limited. Please wait a moment and try again.",
-                "detail": detail,
-            }
-            if retry_after is not None:
-                payload["retry_after_seconds"] = retry_after
-
-            return Response(
-                payload,
-                status=status.HTTP_429_TOO_MANY_REQUESTS,
-            )
+            return _rate_limited_response(exc, "AI service is currently rate limited. Please wait a moment and try again.")
         except AIAgentError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class GraphicalAIView(APIView):
+class GraphicalAIView(AsyncAPIView):
     """Generate graphical/infographic HTML from a user prompt."""
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         requirement = request.data.get('requirement')
         if not requirement:
             return Response({"error": "Requirement is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            raw_ai_response = generate_graphical_content(requirement)
-
-            title = ""
-            html_code = ""
+            raw_ai_response = await agenerate_graphical_content(requirement, cache=_use_ai_cache(request))
 
-            if "TITLE:" in raw_ai_response:
-                title_block = raw_ai_response.split("TITLE:")[1]
-                if "CODE:" in title_block:
-                    title = title_block.split("CODE:")[0].strip()
-                else:
-                    title = re.split(r'\n|<', title_block)[0].strip()
-
-            if "CODE:" in raw_ai_response:
-                html_code = raw_ai_response.split("CODE:")[1].strip()
-
-            # Fallback: if no html_code was extracted, detect HTML in full response
-            if not html_code:
-                html_code = _extract_html(raw_ai_response)
-                if title and '<!DOCTYPE' in title:
-                    title = re.split(r'\n|<!', title)[0].strip()
-
-            html_code = html_code.replace("```html", "").replace("```", "").strip()
+            title, html_code = parse_graphical_response(raw_ai_response)
 
             return Response({
                 "title": title,
@@ -153,21 +106,7 @@ class GraphicalAIView(APIView):
             }, status=status.HTTP_200_OK)
 
         except AIAgentRateLimitError as exc:
-            detail = str(exc)
-            retry_after = None
-            if "||retry_after=" in detail:
-                detail, retry_raw = detail.split("||retry_after=", 1)
-                try:
-                    retry_after = int(retry_raw)
-                except ValueError:
-                    retry_after = None
-            payload = {
-                "error": "AI service is currently rate limited. Please wait a moment and try again.",
-                "detail": detail,
-            }
-            if retry_after is not None:
-                payload["retry_after_seconds"] = retry_after
-            return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return _rate_limited_response(exc, "AI service is currently rate limited. Please wait a moment and try again.")
         except AIAgentError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -182,11 +121,70 @@ class ImageUploadView(APIView):
         file_url = request.build_absolute_uri(default_storage.url(file_name))
         
         return Response({'url': file_url})
-# List all published posts
-class PostListView(generics.ListCreateAPIView):
-    queryset = Post.objects.filter(status='published').order_by('-created_at')
+class PostListModeMixin:
+    """
+    List endpoints return the lightweight summary representation by default
+    and never load the HTML body columns. Pass ?mode=full for the complete
+    PostSerializer payload.
+
+    Reads go through the .values()-based fast path in posts/fast_serializers.py;
+    get_serializer_class() still drives writes and the browsable API forms.
+    """
+    mode_query_param = 'mode'
+
+    def is_summary_mode(self):
+        return (
+            self.request.method == 'GET'
+            and self.request.query_params.get(self.mode_query_param) != 'full'
+        )
+
+    def get_serializer_class(self):
+        if self.is_summary_mode():
+            return PostSummarySerializer
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.is_summary_mode():
+            queryset = queryset.summary()
+        else:
+            queryset = queryset.defer('search_vector')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        summary = self.is_summary_mode()
+        rows = post_values(self.filter_queryset(self.get_queryset()), summary=summary)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            page = rows
+        data = serialize_posts(page, request=request, summary=summary)
+        if self.paginator is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+# List all published posts — filterable by category, tags, author and
+# published date (posts/filters.py); ?facets=true adds facet counts
+class PostListView(ConditionalGetMixin, PostListModeMixin, generics.ListCreateAPIView):
+    queryset = Post.objects.with_relations().filter(status='published').order_by('-created_at')
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+    filter_backends = [PostFilterBackend]
     lookup_field = 'slug'
+    facets_query_param = 'facets'
+
+    def get_validators(self):
+        # One version for every list (posts/cache.py), bumped on commit by any post,
+        # author, category or tag change, so validating costs a cache read. No
+        # Last-Modified: nothing cheap tracks when a post left the filtered set.
+        etag, _ = make_validators(self.request.build_absolute_uri(), post_cache.get_post_list_version())
+        return etag, None
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get(self.facets_query_param) in ('1', 'true'):
+            response.data['facets'] = facet_counts(self.filter_queryset(self.get_queryset()))
+        return response
     
     def perform_create(self, serializer):
         # Automatically set the author to the logged-in user
@@ -196,32 +194,248 @@ class PostListView(generics.ListCreateAPIView):
         else:
             serializer.save()
 
+# Create many posts in one request (e.g. CMS imports) — body is a JSON array
+class PostBulkCreateView(APIView):
+    """
+    All-or-nothing: every item is validated first (see BulkPostListSerializer
+    for the bulk checks); if any fails, nothing is written and `errors` lists
+    each item's errors by position. Unlike PostListView, each item keeps its
+    own status (default draft), so drafts can be imported too.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a JSON array of posts"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = PostSerializer(
+            data=request.data, many=True, allow_empty=False,
+            max_length=getattr(settings, 'POSTS_BULK_CREATE_MAX', 1000),
+            context={'request': request},
+        )
+        if not serializer.is_valid():
+            return Response(
+                {"error": "No posts were created", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            posts = serializer.save(author=request.user.author_profile)
+        return Response({
+            "created": len(posts),
+            "results": [{"id": post.pk, "slug": post.slug, "title": post.title} for post in posts],
+        }, status=status.HTTP_201_CREATED)
+
+
 # Get a single post by slug
 class PostDetailView(generics.RetrieveAPIView):
-    queryset = Post.objects.all()
+    """
+    Serves the rendered payload from the per-slug cache (posts/cache.py) so a
+    warm read is one cache lookup. The payload is cached with relative media
+    URLs and made absolute for the current request on the way out.
+
+    The cache entry also carries the ETag/Last-Modified validators, so warm
+    conditional requests need no queries. On a miss both are computed from
+    the row that was serialized (its timestamps are read in the same query),
+    so the cached validators always describe the cached body.
+    """
+    queryset = Post.objects.with_relations().defer('search_vector')
     serializer_class = PostSerializer
     lookup_field = 'slug'
 
+    def load_entry(self, slug):
+        """Return the cache entry ({'data', 'etag', 'last_modified'}) for `slug`, or None."""
+        newest_tag = Tag.objects.filter(posts=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+        queryset = self.get_queryset().filter(slug=slug).annotate(tags_updated_at=Subquery(newest_tag))
+        rows = list(post_values(
+            queryset, extra=('updated_at', 'author__updated_at', 'category__updated_at', 'tags_updated_at'),
+        ))
+        if not rows:
+            return None
+        row = rows[0]
+        # No request: media URLs stay relative and host-independent
+        data = serialize_posts(rows)[0]
+        etag, last_modified = make_validators(
+            data, row['updated_at'], row['author__updated_at'], row['category__updated_at'], row['tags_updated_at'],
+        )
+        return {'data': data, 'etag': etag, 'last_modified': last_modified}
+
+    def retrieve(self, request, *args, **kwargs):
+        slug = kwargs[self.lookup_field]
+        entry = post_cache.get_post_detail(slug)
+        cache_status = 'HIT'
+        if entry is None:
+            cache_status = 'MISS'
+            entry = self.load_entry(slug)
+            if entry is None:
+                raise Http404
+            post_cache.set_post_detail(slug, entry)
+
+        response = not_modified_response(request, entry['etag'], entry['last_modified'])
+        if response is not None:
+            return response
+
+        # Buffered; written in bulk by posts/view_counter.py
+        record_view(entry['data']['id'])
+
+        response = Response(_absolute_media_urls(entry['data'], request))
+        set_validator_headers(response, entry['etag'], entry['last_modified'])
+        response['X-Cache'] = cache_status
+        return response
+
+
+def _absolute_media_urls(data, request):
+    """Return a copy of a cached post payload with absolute cover/profile image URLs."""
+    data = dict(data)
+    if data.get('cover_image'):
+        data['cover_image'] = request.build_absolute_uri(data['cover_image'])
+    author = data.get('author')
+    if author and author.get('profile_picture'):
+        data['author'] = dict(author, profile_picture=request.build_absolute_uri(author['profile_picture']))
+    return data
+
+
+# Precomputed "related reading" for a post (posts/related.py) — best match first
+class PostRelatedView(APIView):
+    def get(self, request, slug):
+        queryset = (
+            Post.objects.filter(status='published', related_from__post__slug=slug)
+            .annotate(related_score=F('related_from__score'), related_rank=F('related_from__rank'))
+            .order_by('related_rank')
+        )
+        rows = list(post_values(queryset, summary=True, extra=('related_score',)))
+        if not rows and not Post.objects.filter(slug=slug).exists():
+            raise Http404
+
+        results = serialize_posts(rows, request=request, summary=True)
+        for row, data in zip(rows, results):
+            data['score'] = round(row['related_score'], 4)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+# Trending feed — ?page=<n>&page_size=<n>, read from the table `update_trending` materializes
+class TrendingPostsView(APIView):
+    def get(self, request):
+        page_size = min(
+            _positive_int(request.query_params.get('page_size'), settings.POSTS_PAGE_SIZE),
+            settings.POSTS_MAX_PAGE_SIZE,
+        )
+        page = _positive_int(request.query_params.get('page'), 1)
+
+        # TrendingPost holds at most TRENDING_SIZE rows, so a page costs the same however many
+        # posts exist; one extra row tells us whether there is a next page
+        queryset = (
+            Post.objects.filter(status='published', trending__isnull=False)
+            .annotate(trending_rank=F('trending__rank'), trending_score=F('trending__score'))
+            .order_by('trending_rank')
+        )
+        offset = (page - 1) * page_size
+        rows = list(post_values(queryset, summary=True, extra=('trending_rank', 'trending_score'))[offset:offset + page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        results = serialize_posts(rows, request=request, summary=True)
+        for row, data in zip(rows, results):
+            data['score'] = round(row['trending_score'], 4)
+
+        next_link, previous_link = page_number_links(request, page, has_next)
+
+        return Response({
+            "next": next_link,
+            "previous": previous_link,
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
 
 # Get user's own posts
-class MyPostsView(generics.ListAPIView):
+class MyPostsView(PostListModeMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PostCursorPagination
     
     def get_queryset(self):
-        return Post.objects.filter(author=self.request.user.author_profile).order_by('-created_at')
+        return (
+            Post.objects.with_relations()
+            .filter(author=self.request.user.author_profile)
+            .order_by('-created_at')
+        )
+
+
+# Full-text search over published posts — ?q=<query>&page=<n>&page_size=<n>
+class PostSearchView(APIView):
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        page_size = min(
+            _positive_int(request.query_params.get('page_size'), settings.POSTS_PAGE_SIZE),
+            settings.POSTS_MAX_PAGE_SIZE,
+        )
+        page = _positive_int(request.query_params.get('page'), 1)
+
+        # One extra row tells us whether there is a next page without a COUNT
+        ranked = search_post_ids(query, limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(ranked) > page_size
+        ranked = ranked[:page_size]
+
+        # Hydrate only the page: summary fields plus content for the snippet
+        rows = post_values(
+            Post.objects.filter(pk__in=[pk for pk, _ in ranked]), summary=True, extra=('content',)
+        )
+        rows_by_id = {row['id']: row for row in rows}
+        page_rows = [rows_by_id[pk] for pk, _ in ranked if pk in rows_by_id]
+        ranks = dict(ranked)
+
+        results = []
+        for row, data in zip(page_rows, serialize_posts(page_rows, request=request, summary=True)):
+            data['rank'] = ranks[row['id']]
+            data['snippet'] = make_snippet(html_to_text(decompress(row['content'])), query) or make_snippet(row['excerpt'], query)
+            results.append(data)
+
+        next_link, previous_link = page_number_links(request, page, has_next)
+
+        return Response({
+            "next": next_link,
+            "previous": previous_link,
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
+def _positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+# Per-process cache/counter metrics (staff only)
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)
 
 
 # Category list view
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ConditionalGetMixin, generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    def get_validators(self):
+        agg = Category.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        return make_validators(agg['count'], agg['latest'])
+
 
 # Tag list view — supports ?category=<id> filtering
-class TagListView(generics.ListAPIView):
+class TagListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = TagSerializer
 
+    def get_validators(self):
+        agg = self.get_queryset().order_by().aggregate(count=Count('id'), latest=Max('updated_at'))
+        return make_validators(self.request.query_params.get('category'), agg['count'], agg['latest'])
+
     def get_queryset(self):
         qs = Tag.objects.all()
         category_id = self.request.query_params.get('category')
@@ -230,11 +444,69 @@ class TagListView(generics.ListAPIView):
         return qs
 
 
+# Category -> tag tree for navigation menus, with per-tag published-post counts
+class TaxonomyView(APIView):
+    """
+    Replaces CategoryListView + one TagListView?category= call per category.
+    The tree is built from a single grouped query and cached under the
+    taxonomy version (posts/cache.py), which Category/Tag/Post signals bump,
+    so warm requests - including conditional ones - run no queries.
+    Tags without a category are not part of the tree.
+    """
+
+    def get(self, request):
+        version = post_cache.get_taxonomy_version()
+        entry = post_cache.get_taxonomy_tree(version)
+        cache_status = 'HIT'
+        if entry is None:
+            cache_status = 'MISS'
+            data, last_modified = _build_taxonomy_tree()
+            etag, _ = make_validators(version)
+            entry = {'data': data, 'etag': etag, 'last_modified': last_modified}
+            post_cache.set_taxonomy_tree(version, entry)
+
+        response = not_modified_response(request, entry['etag'], entry['last_modified'])
+        if response is None:
+            response = Response(entry['data'], status=status.HTTP_200_OK)
+            set_validator_headers(response, entry['etag'], entry['last_modified'])
+        response['X-Cache'] = cache_status
+        return response
+
+
+def _build_taxonomy_tree():
+    """Return (categories with nested tags, newest updated_at) from one query."""
+    rows = (
+        Category.objects
+        .values('id', 'name', 'slug', 'updated_at',
+                'tags__id', 'tags__name', 'tags__slug', 'tags__updated_at')
+        .annotate(published_posts=Count('tags__posts', filter=Q(tags__posts__status='published')))
+        .order_by('name', 'id', 'tags__name', 'tags__id')
+    )
+    categories = {}
+    timestamps = []
+    for row in rows:
+        category = categories.get(row['id'])
+        if category is None:
+            category = categories[row['id']] = {
+                'id': row['id'], 'name': row['name'], 'slug': row['slug'], 'tags': [],
+            }
+            timestamps.append(row['updated_at'])
+        if row['tags__id'] is not None:
+            category['tags'].append({
+                'id': row['tags__id'],
+                'name': row['tags__name'],
+                'slug': row['tags__slug'],
+                'published_posts': row['published_posts'],
+            })
+            timestamps.append(row['tags__updated_at'])
+    return list(categories.values()), max(timestamps, default=None)
+
+
 # AI Refine Text — accepts text_snippet + command, returns refined text
-class EnhanceDesignView(APIView):
+class EnhanceDesignView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         html_content = request.data.get('html_content', '').strip()
         if not html_content:
             return Response({"error": "html_content is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -242,35 +514,23 @@ class EnhanceDesignView(APIView):
         content_type = request.data.get('content_type', 'blog').strip()
 
         try:
-            enhanced = enhance_blog_design(html_content, content_type=content_type)
+            enhanced = await aenhance_blog_design(
+                html_content, content_type=content_type, cache=_use_ai_cache(request),
+            )
             return Response({
                 "enhanced_code": enhanced,
             }, status=status.HTTP_200_OK)
 
         except AIAgentRateLimitError as exc:
-            detail = str(exc)
-            retry_after = None
-            if "||retry_after=" in detail:
-                detail, retry_raw = detail.split("||retry_after=", 1)
-                try:
-                    retry_after = int(retry_raw)
-                except ValueError:
-                    retry_after = None
-            payload = {
-                "error": "AI service rate limited. Please wait and try again.",
-                "detail": detail,
-            }
-            if retry_after is not None:
-                payload["retry_after_seconds"] = retry_after
-            return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return _rate_limited_response(exc, "AI service rate limited. Please wait and try again.")
         except AIAgentError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class EnhanceSectionView(APIView):
+class EnhanceSectionView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         html_section = request.data.get('html_content', '').strip()
         if not html_section:
             return Response({"error": "html_content is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -279,35 +539,23 @@ class EnhanceSectionView(APIView):
         content_type = request.data.get('content_type', 'blog').strip()
 
         try:
-            enhanced = enhance_section_design(html_section, instructions=instructions, content_type=content_type)
+            enhanced = await aenhance_section_design(
+                html_section, instructions=instructions, content_type=content_type, cache=_use_ai_cache(request),
+            )
             return Response({
                 "enhanced_code": enhanced,
             }, status=status.HTTP_200_OK)
 
         except AIAgentRateLimitError as exc:
-            detail = str(exc)
-            retry_after = None
-            if "||retry_after=" in detail:
-                detail, retry_raw = detail.split("||retry_after=", 1)
-                try:
-                    retry_after = int(retry_raw)
-                except ValueError:
-                    retry_after = None
-            payload = {
-                "error": "AI service rate limited. Please wait and try again.",
-                "detail": detail,
-            }
-            if retry_after is not None:
-                payload["retry_after_seconds"] = retry_after
-            return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return _rate_limited_response(exc, "AI service rate limited. Please wait and try again.")
         except AIAgentError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class RefineTextView(APIView):
+class RefineTextView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         """Return available refine commands."""
         commands = [
             {"key": k, "label": k.replace("_", " ").title()}
@@ -315,7 +563,7 @@ class RefineTextView(APIView):
         ]
         return Response({"commands": commands}, status=status.HTTP_200_OK)
 
-    def post(self, request):
+    async def post(self, request):
         text_snippet = request.data.get('text_snippet', '').strip()
         command = request.data.get('command', '').strip()
 
@@ -325,7 +573,7 @@ class RefineTextView(APIView):
             return Response({"error": "command is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            refined = refine_text_snippet(text_snippet, command)
+            refined = await arefine_text_snippet(text_snippet, command, cache=_use_ai_cache(request))
             return Response({
                 "original": text_snippet,
                 "command": command,
@@ -333,21 +581,43 @@ class RefineTextView(APIView):
             }, status=status.HTTP_200_OK)
 
         except AIAgentRateLimitError as exc:
-            detail = str(exc)
-            retry_after = None
-            if "||retry_after=" in detail:
-                detail, retry_raw = detail.split("||retry_after=", 1)
-                try:
-                    retry_after = int(retry_raw)
-                except ValueError:
-                    retry_after = None
-            payload = {
-                "error": "AI service rate limited. Please wait and try again.",
-                "detail": detail,
-            }
-            if retry_after is not None:
-                payload["retry_after_seconds"] = retry_after
-            return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return _rate_limited_response(exc, "AI service rate limited. Please wait and try again.")
         except AIAgentError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+# Background AI jobs (posts/ai_jobs.py): submit here, then poll the job URL
+# while `manage.py run_ai_worker` runs it.
+class AIJobCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+        kind = request.data.get('kind', '')
+        params, error = ai_jobs.job_params(kind, request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        if not _use_ai_cache(request):
+            params['cache'] = False
+
+        request_key = request.headers.get('Idempotency-Key') or request.data.get('request_key')
+        request_key = str(request_key) if request_key else None
+        if request_key and len(request_key) > 100:
+            return Response({"error": "request_key must be at most 100 characters"}, status=status.HTTP_400_BAD_REQUEST)
+
+        job, created = ai_jobs.submit_job(request.user, kind, params, request_key=request_key)
+        response = Response(
+            AIJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+        response['Location'] = request.build_absolute_uri(reverse('ai-job-detail', args=[job.id]))
+        return response
+
+
+class AIJobDetailView(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = AIJobSerializer
+
+    def get_queryset(self):
+        return AIJob.objects.filter(user=self.request.user)